@@ -14,7 +14,7 @@
 
 import logging
  
-from collections import defaultdict
+from collections import defaultdict, deque
 
 import adsk.core, adsk.fusion
 import math
@@ -23,22 +23,46 @@ import os
 import json
 
 import time
+import cProfile
+import functools
+import io
+import pstats
 from . import dbutils as dbUtils
+from . import dbplanner as dbPlanner
+from . import dbgeom as dbGeom
+from . import dblogging as dbLogging
+from . import dbattributes as dbAttributes
 from math import sqrt as sqrt
 
-#constants - to keep attribute group and names consistent
-DOGBONEGROUP = 'dogBoneGroup'
-FACE_ID = 'faceID'
-REV_ID = 'revId'
-ID = 'id'
 DEBUGLEVEL = logging.NOTSET
+PROFILE_TOP = 40  # functions listed in the profile summary
 
 
 
 # Generate an edgeId or faceId from object
 calcId = lambda x: str(x.tempId) + ':' + x.assemblyContext.name.split(':')[-1] if x.assemblyContext else str(x.tempId) + ':' + x.body.name
 makeNative = lambda x: x.nativeObject if x.nativeObject else x
-reValidateFace = lambda comp, x: comp.findBRepUsingPoint(x, adsk.fusion.BRepEntityTypes.BRepFaceEntityType,-1.0 ,False ).item(0)
+
+def profiled(method):
+    '''
+    DogboneCommand method decorator - with the Profile option on, the method runs under the command's cProfile profiler,
+    which is saved once the command is over (see finishProfile). Calls made from inside a profiled method are
+    already being profiled. With the option off, the method is just called.
+    '''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.profile or self.profiling:
+            return method(self, *args, **kwargs)
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+        self.profiling = True
+        self.profiler.enable()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.profiler.disable()
+            self.profiling = False
+    return wrapper
 
 class SelectedEdge:
     def __init__(self, edge, edgeId, activeEdgeName, tempId, selectedFace):
@@ -48,82 +72,206 @@ class SelectedEdge:
         self.tempId = tempId
         self.selected = True
         self.selectedFace = selectedFace
+        self.token = None  # entity token of the native edge - taken when its corner is collected (see faceCorners), for reValidateEdge
 
     def select(self, selection = True):
+        if selection != self.selected:
+            self.selectedFace.dog.selectionState.edgeCount += 1 if selection else -1
+            self.selectedFace.dog.overlay.markDirty(self.selectedFace.faceId)
         self.selected = selection
 
 
 class SelectedFace:
-    def __init__(self, dog, face, faceId, tempId, occurrenceName, refPoint, commandInputsEdgeSelect):
+    def __init__(self, dog, face, faceId, tempId, occurrenceName, refPoint, commandInputsEdgeSelect, cornerEdges = None):
         self.dog = dog
         self.face = face # BrepFace
         self.faceId = faceId
         self.tempId = tempId
         self.occurrenceName = occurrenceName
         self.refPoint = refPoint
+        self.faceToken = dbUtils.entityResolver.track(makeNative(face))  # to re-find the face - see reValidateFace
         self.commandInputsEdgeSelect = commandInputsEdgeSelect
         self.selected = True
         self.selectedEdges = {} # Keyed with edge
-        self.brepEdges = [] # used for quick checking if an edge is already included (below)
-
         #==============================================================================
         #             this is where inside corner edges, dropping down from the face are processed
         #==============================================================================
-        faceNormal = dbUtils.getFaceNormal(face)
+        self.topology = dbUtils.getTopologyIndex(face.body)
 
-        for edge in self.face.body.edges:
-                if edge.isDegenerate:
-                    continue
-                if edge in self.brepEdges:
-                    continue
+        if cornerEdges is None:  # unless they've already been found (see dbUtils.findDogboneFaces)
+            cornerEdges = dog.cornerEdgeCache.cornerEdges(face, self.topology, dog.loopWalk, dog.headless)
+        else:
+            dog.cornerEdgeCache.store(face, cornerEdges, dog.loopWalk)
+        for edge in cornerEdges:
                 try:
-                    if edge.geometry.curveType != adsk.core.Curve3DTypes.Line3DCurveType:
-                        continue
-                    vector = edge.startVertex.geometry.vectorTo(edge.endVertex.geometry)
-                    if vector.isPerpendicularTo(faceNormal):
-                        continue
-                    if edge.faces.item(0).geometry.objectType != adsk.core.Plane.classType():
-                        continue
-                    if edge.faces.item(1).geometry.objectType != adsk.core.Plane.classType():
-                        continue              
-                    if edge.startVertex not in face.vertices:
-                        if edge.endVertex not in face.vertices:
-                            continue
-                        else:
-                            vector = edge.endVertex.geometry.vectorTo(edge.startVertex.geometry)
-                    if vector.dotProduct(faceNormal) >= 0:
-                        continue
-                    if dbUtils.getAngleBetweenFaces(edge) > math.pi:
-                        continue
-
                     activeEdgeName = edge.assemblyContext.name.split(':')[-1] if edge.assemblyContext else edge.body.name
                     edgeId = str(edge.tempId)+':'+ activeEdgeName
                     self.selectedEdges[edgeId] = SelectedEdge(edge, edgeId, activeEdgeName, edge.tempId, self)
-                    self.brepEdges.append(edge)
-                    dog.addingEdges = True
-                    self.commandInputsEdgeSelect.addSelection(edge)
-                    dog.addingEdges = False
+                    dog.selectionState.edgeCount += 1
                     
                     dog.selectedEdges[edgeId] = self.selectedEdges[edgeId] # can be used for reverse lookup of edge to face
                 except:
-                    dbUtils.messageBox('Failed at edge:\n{}'.format(traceback.format_exc()))
+                    dbUtils.reportError('Failed at edge', dog.headless)
+
+        self.pushSelections(self.selectedEdges.values())
+        dog.overlay.markDirty(faceId)
+
+    def pushSelections(self, selectedEdges, selection = True, reAdding = False):
+        '''
+        adds (or removes) the edges of selectedEdges to/from the edge selection in one pass.
+        Handler work is suppressed (dog.addingEdges) for the whole batch rather than toggled per edge.
+        commandInputsEdgeSelect.addSelection doesn't work for re-adding, so reAdding - or the API rejecting an edge - falls back to ui.activeSelections
+        Nothing to do without commandInputsEdgeSelect - faces added by DogboneBatch have no dialog
+        '''
+        if not self.commandInputsEdgeSelect:
+            return
+        activeSelections = self.dog.ui.activeSelections
+        self.dog.addingEdges = True
+        try:
+            for selectedEdge in selectedEdges:
+                if not selection:
+                    activeSelections.removeByEntity(selectedEdge.edge)
+                    continue
+                if not reAdding:
+                    try:
+                        if self.commandInputsEdgeSelect.addSelection(selectedEdge.edge):
+                            continue
+                    except:
+                        pass
+                activeSelections.add(selectedEdge.edge)
+        finally:
+            self.dog.addingEdges = False
 
     def selectAll(self, selection = True):
+        if selection != self.selected:
+            self.dog.selectionState.faceCount += 1 if selection else -1
+            self.dog.overlay.markDirty(self.faceId)
         self.selected = selection
-        dog.addingEdges = True
-        for edgeId, selectedEdge in self.selectedEdges.items():
+        for selectedEdge in self.selectedEdges.values():
             selectedEdge.select(selection)
-            if selection:
-                #commandInputsEdgeSelect.addSelection(edge.edge) # Not working for re-adding.
-                dog.ui.activeSelections.add(selectedEdge.edge)
- 
+        self.pushSelections(self.selectedEdges.values(), selection, reAdding = True)
+
+
+class SelectionState:
+    '''
+    Selection bookkeeping, kept up to date incrementally so that onChange and onFaceSelect don't have to rescan the selections.
+    Precomputed lookups for onFaceSelect, which is called with every mouse movement, are
+    only refreshed from onChange, when the face selection changes, so that hovering is a couple of dictionary lookups.
+    '''
+    def __init__(self):
+        self.primaryNormals = {}  # occurrence (or root body) name: normal of the primary (1st selected) face, None if all faces are deselected
+        self.componentIds = set()  # ids of the components that already have faces selected in one of their occurrences
+        self.selectable = {}  # (face tempId, occurrence or body name): isSelectable memo
+        self.faceCount = 0  # number of selected SelectedFaces - maintained by SelectedFace.selectAll
+        self.edgeCount = 0  # number of selected SelectedEdges - maintained by SelectedEdge.select
+        self.unselected = defaultdict(list)  # selection input id: [faceId or edgeId, ...] reported by the unselect event since the last onChange
+
+    def popUnselected(self, inputId):
+        return self.unselected.pop(inputId, [])
+
+    def refresh(self, selectedOccurrences):
+        self.primaryNormals = {}
+        self.componentIds = set()
+        for occurrenceName, faces in selectedOccurrences.items():
+            if faces[0].face.assemblyContext:
+                self.componentIds.add(faces[0].face.assemblyContext.component.id)
+            for face in faces:
+                if face.selected:
+                    self.primaryNormals[occurrenceName] = dbUtils.getFaceNormal(face.face)
+                    break
             else:
-                dog.ui.activeSelections.removeByEntity(selectedEdge.edge)
-        dog.addingEdges = False
+                self.primaryNormals[occurrenceName] = None
+        self.selectable.clear()
+
+    def isFaceSelectable(self, entity):
+        occurrence = entity.assemblyContext
+        key = (entity.tempId, occurrence.name if occurrence else entity.body.name)
+        isSelectable = self.selectable.get(key)
+        if isSelectable is None:
+            isSelectable = self.selectable[key] = self._isFaceSelectable(entity, key[1], occurrence)
+        return isSelectable
+
+    def _isFaceSelectable(self, entity, occurrenceName, occurrence):
+        if not self.primaryNormals: #the face selection list is empty
+            return True
+        if occurrence:
+            # Only one occurrence per component allowed, to save on conflict checking
+            if occurrence.component.id not in self.componentIds:
+                return True
+            if occurrenceName not in self.primaryNormals:
+                return False
+        elif occurrenceName not in self.primaryNormals:
+            return True
+        primaryFaceNormal = self.primaryNormals[occurrenceName]
+        if primaryFaceNormal is None:
+            return True
+        return primaryFaceNormal.isParallelTo(dbUtils.getFaceNormal(entity))
+
+
+class DogboneOverlay:
+    '''
+    Graphics only preview of the planned dogbones while faces and edges are being selected - a CustomGraphicsGroup per
+    selected face, with a circle at each dogbone centre. Nothing is added to the design.
+    Only faces marked dirty (by SelectedFace/SelectedEdge when their selection changes) are redrawn, unless the
+    dogbone settings change - then every face is.
+    '''
+    def __init__(self, dog):
+        self.dog = dog
+        self.groups = {}  # faceId: CustomGraphicsGroup
+        self.dirty = set()  # faceIds
+        self.settings = None
+
+    def markDirty(self, faceId):
+        self.dirty.add(faceId)
+
+    def readSettings(self, inputs):
+        dbType = inputs.itemById('dogboneType').selectedItem.name
+        return dbPlanner.DogboneSettings(dbType,
+                                         (inputs.itemById('circDiameter').value + inputs.itemById('offset').value) / 2,
+                                         inputs.itemById('minimalPercent').value,
+                                         inputs.itemById('mortiseType').selectedItem.name == 'On Long Side')
+
+    def update(self, inputs):
+        settings = self.readSettings(inputs)
+        if settings != self.settings:
+            self.settings = settings
+            self.dirty.update(self.dog.selectedFaces.keys())
+        for faceId in self.dirty:
+            self.removeFace(faceId)
+            selectedFace = self.dog.selectedFaces.get(faceId)
+            if selectedFace and selectedFace.selected:
+                self.drawFace(selectedFace)
+        if self.dirty:
+            self.dog.app.activeViewport.refresh()
+        self.dirty.clear()
+
+    def drawFace(self, selectedFace):
+        face = selectedFace.face  # proxy, so that the circles are in world space
+        corners = self.dog.faceCorners(selectedFace.occurrenceName, None, selectedFace, face, dbType = self.settings.dbType, countErrors = False)
+        plan = dbPlanner.planDogbones(corners, self.settings)
+        if not plan:
+            return
+        group = self.dog.rootComp.customGraphicsGroups.add()
+        normal = dbUtils.getFaceNormal(face)
+        for dogbone in plan:
+            group.addCurve(adsk.core.Circle3D.createByCenter(adsk.core.Point3D.create(*dogbone.centre), normal, dogbone.radius))
+        self.groups[selectedFace.faceId] = group
+
+    def removeFace(self, faceId):
+        group = self.groups.pop(faceId, None)
+        if group and group.isValid:
+            group.deleteMe()
+
+    def clear(self):
+        for faceId in list(self.groups):
+            self.removeFace(faceId)
+        self.dirty.clear()
+        self.settings = None
 
 
 class DogboneCommand(object):
     COMMAND_ID = "dogboneBtn"
+    REPLAY_COMMAND_ID = "dogboneReplayBtn"
     
     faceAssociations = {}
     defaultData = {}
@@ -139,16 +287,32 @@ class DogboneCommand(object):
         self.circVal = None
         self.edges = []
         self.benchmark = False
+        self.timer = dbUtils.PhaseTimer(enabled = False)  # phase timings for the Benchmark option - see onExecute
+        self.profile = False
+        self.profiler = None  # cProfile.Profile of the current command, while the Profile option is on - see profiled
+        self.profiling = False
+        self.savePlan = False
+        self.updateExisting = True
+        self.existingUnits = {}  # dbAttributes.Unit of earlier runs, suppressed while the dialog is open - see suspendExisting
+        self.suspendedBodies = set()  # (occurrence, body name) of the bodies suspendExisting has been called for
+        self.designUnits = None  # dbAttributes.findUnits of the design, read for the first body suspendExisting is called for
+        self.tags = dbAttributes.RunTags(None, None, None, enabled = False)  # tags what the engines add - see createDogbones
         self.errorCount = 0
 #        self.boneDirection = "top"
         self.dbType = 'Normal Dogbone'
         self.longside = True
         self.minimalPercent = 10.0
+        self.depthTolerance = 0.001
         self.faceSelections = adsk.core.ObjectCollection.create()
         self.fromTop = False
 
         self.addingEdges = 0
+        self.addingFaces = False
+        self.headless = False  # set while DogboneBatch runs - errors are only counted and logged, never shown
+        self.loopWalk = True
         self.parametric = True
+        self.toolBody = False
+        self.groupHoles = True
         self.logging = 0
         self.loggingLevels = {'Notset':0,'Debug':10,'Info':20,'Warning':30,'Error':40}
 
@@ -158,6 +322,9 @@ class DogboneCommand(object):
         self.levels = {}
 
         self.handlers = dbUtils.HandlerHelper()
+        self.cornerEdgeCache = dbUtils.CornerEdgeCache()  # outlives the selection model - reopening the dialog on an unchanged part reuses it
+        self.logger = dbLogging.getLogger(__name__)
+        self.logWriter = dbLogging.LogWriter(__package__)  # dogbone.log - see initLogger
 
         self.appPath = os.path.dirname(os.path.abspath(__file__))
         
@@ -171,15 +338,22 @@ class DogboneCommand(object):
         self.defaultData['circVal'] = self.circVal
             #self.defaultData['!outputUnconstrainedGeometry:' = str(self.outputUnconstrainedGeometry))
         self.defaultData['benchmark'] = self.benchmark
+        self.defaultData['profile'] = self.profile
+        self.defaultData['savePlan'] = self.savePlan
+        self.defaultData['updateExisting'] = self.updateExisting
 #        self.defaultData['boneDirection'] = self.boneDirection
         self.defaultData['dbType'] = self.dbType
         self.defaultData['minimalPercent'] = self.minimalPercent
         self.defaultData['fromTop'] = self.fromTop
         self.defaultData['parametric'] = self.parametric
+        self.defaultData['toolBody'] = self.toolBody
+        self.defaultData['groupHoles'] = self.groupHoles
         self.defaultData['logging'] = self.logging
         self.defaultData['mortiseType'] = self.longside
         self.defaultData['expandModeGroup'] = self.expandModeGroup
         self.defaultData['expandSettingsGroup'] = self.expandSettingsGroup
+        self.defaultData['loopWalk'] = self.loopWalk
+        self.defaultData['depthTolerance'] = self.depthTolerance
         
         json_file = open(os.path.join(self.appPath, 'defaults.dat'), 'w', encoding='UTF-8')
         json.dump(self.defaultData, json_file, ensure_ascii=False)
@@ -219,6 +393,13 @@ class DogboneCommand(object):
             self.longside = self.defaultData['mortiseType']
             self.expandModeGroup = self.defaultData['expandModeGroup']
             self.expandSettingsGroup = self.defaultData['expandSettingsGroup']
+            self.loopWalk = self.defaultData['loopWalk']
+            self.depthTolerance = self.defaultData['depthTolerance']
+            self.groupHoles = self.defaultData['groupHoles']
+            self.toolBody = self.defaultData['toolBody']
+            self.savePlan = self.defaultData['savePlan']
+            self.profile = self.defaultData['profile']
+            self.updateExisting = self.defaultData['updateExisting']
 
         except KeyError: 
         
@@ -231,10 +412,10 @@ class DogboneCommand(object):
             return
             
     def debugFace(self, face):
-        if self.logger.level < logging.DEBUG:
+        if not self.logger.isEnabledFor(logging.DEBUG):
             return
         for edge in face.edges:
-            self.logger.debug('edge {}; startVertex: {}; endVertex: {}'.format(edge.tempId, edge.startVertex.geometry.asArray(), edge.endVertex.geometry.asArray()))
+            self.logger.debug('edge {}; startVertex: {}; endVertex: {}', edge.tempId, edge.startVertex.geometry.asArray(), edge.endVertex.geometry.asArray())
 
         return
 
@@ -259,14 +440,91 @@ class DogboneCommand(object):
         buttonControl.isPromotedByDefault = True
         buttonControl.isPromoted = True
 
+        buttonReplay = self.ui.commandDefinitions.addButtonDefinition(
+            self.REPLAY_COMMAND_ID, 'Replay Dogbone Plan', 'Creates dogbones from a saved dogbone plan', 'Resources')
+        buttonReplay.commandCreated.add(self.handlers.make_handler(adsk.core.CommandCreatedEventHandler,
+                                                                    self.onReplayCreate))
+        createPanel.controls.addCommand(buttonReplay, self.REPLAY_COMMAND_ID)
+
     def removeButton(self):
-        cmdDef = self.ui.commandDefinitions.itemById(self.COMMAND_ID)
-        if cmdDef:
-            cmdDef.deleteMe()
-        createPanel = self.ui.allToolbarPanels.itemById('SolidCreatePanel')
-        cntrl = createPanel.controls.itemById(self.COMMAND_ID)
-        if cntrl:
-            cntrl.deleteMe()
+        for commandId in (self.COMMAND_ID, self.REPLAY_COMMAND_ID):
+            cmdDef = self.ui.commandDefinitions.itemById(commandId)
+            if cmdDef:
+                cmdDef.deleteMe()
+            createPanel = self.ui.allToolbarPanels.itemById('SolidCreatePanel')
+            cntrl = createPanel.controls.itemById(commandId)
+            if cntrl:
+                cntrl.deleteMe()
+
+    def resetSelection(self):
+        '''
+        starts an empty selection model - for a new dialog, or a new DogboneBatch job
+        '''
+        self.faces = []
+        self.errorCount = 0
+        self.faceSelections.clear()
+        
+        self.selectedOccurrences = {} 
+        self.selectedFaces = {} 
+        self.selectedEdges = {} 
+        self.selectionState = SelectionState()
+        self.overlay = DogboneOverlay(self)
+        self.corners = None
+        dbUtils.entityResolver.clear()
+        self.cornersKey = None
+
+    def checkTimeline(self):
+        '''
+        drops cached geometry, topology and corner edges if the timeline has changed - call at event boundaries
+        '''
+        dbUtils.faceGeometryCache.checkTimeline(self.design)
+        dbUtils.topologyCache.checkTimeline(self.design)
+        self.cornerEdgeCache.checkTimeline(self.design)
+
+    def addFace(self, face, edgeSelect = None, cornerEdges = None):
+        '''
+        adds face (native, or a proxy in its assembly context) to the selection model, with all its dogbone edges selected.
+        edgeSelect - the dialog's edge selection input, None when there's no dialog
+        cornerEdges - the face's dogbone edges, if they're already known
+        returns (SelectedFace, True if it was already known and has been reselected)
+        '''
+        if face.assemblyContext:
+            activeOccurrenceName = face.assemblyContext.name
+            changedEntityName = face.assemblyContext.name.split(':')[-1]
+        else:
+            activeOccurrenceName = face.body.name
+            changedEntityName = face.body.name
+        
+        faceId = str(face.tempId) + ":" + changedEntityName 
+        if faceId in self.selectedFaces:
+            return (self.selectedFaces[faceId], True)
+        (tempId, body) = (face.tempId, face.body)
+        refPoint = face.nativeObject.pointOnFace if face.assemblyContext else face.pointOnFace
+        faceToken = makeNative(face).entityToken
+        if self.suspendExisting(body) and not face.isValid:
+            # the dogbones suppressed had cut the body - the face is found again, with their corners back
+            nativeFace = self.reValidateFace(makeNative(body).parentComponent, refPoint, faceToken)
+            if nativeFace is None:
+                self.logger.warning('face {} could not be found once the existing dogbones were suppressed', faceId)
+            else:
+                face = nativeFace.createForAssemblyContext(face.assemblyContext) if face.assemblyContext else nativeFace
+        newSelectedFace = SelectedFace(
+                                        self, 
+                                        face,
+                                        faceId,
+                                        tempId,
+                                        changedEntityName,
+                                        refPoint,
+                                        edgeSelect,
+                                        cornerEdges
+                                      )  # creates a collecton (of edges) associated with a faceId
+        faces = []
+        faces = self.selectedOccurrences.get(activeOccurrenceName, faces)
+        faces.append(newSelectedFace)
+        self.selectedOccurrences[activeOccurrenceName] = faces # adds a face to a list of faces associated with this occurrence
+        self.selectedFaces[faceId] = newSelectedFace
+        self.selectionState.faceCount += 1
+        return (newSelectedFace, False)
 
     def onCreate(self, args:adsk.core.CommandCreatedEventArgs):
         """
@@ -288,17 +546,16 @@ class DogboneCommand(object):
             provides fast method of finding face that owns an edge
         """
         inputs = adsk.core.CommandCreatedEventArgs.cast(args)
-        self.faces = []
-        self.errorCount = 0
-        self.faceSelections.clear()
-        
-        self.selectedOccurrences = {} 
-        self.selectedFaces = {} 
-        self.selectedEdges = {} 
+        self.resetSelection()
         
         argsCmd = adsk.core.Command.cast(args)
  
-        self.readDefaults()
+        self.timer = dbUtils.PhaseTimer()
+        with self.timer.phase('defaults I/O'):
+            self.readDefaults()
+        self.timer.enabled = self.benchmark
+        self.profiler = None  # a new profile for every command
+        self.checkTimeline()
 
         inputs = adsk.core.CommandInputs.cast(inputs.command.commandInputs)
         
@@ -318,6 +575,13 @@ class DogboneCommand(object):
         selInput1.addSelectionFilter('LinearEdges')
         selInput1.setSelectionLimits(1,0)
         selInput1.isVisible = False
+
+        detectInp = inputs.addBoolValueInput('autoDetect', 'Detect Faces', False, '', False)
+        detectInp.tooltip = "Selects every face with dogbone edges in one go"
+        detectInp.tooltipDescription = "Finds the planar faces with internal corner edges dropping down from them - on the bodies that already have a face selected, "\
+                                       "or on every body in the design if none have.\n"\
+                                       "\nFaces follow the same rules as selecting them by hand: one direction per body (the primary face's, "\
+                                       "or else the one with the most dogbone edges) and one occurrence per component."
                 
         inp = inputs.addValueInput(
             'circDiameter', 'Tool Diameter               ', self.design.unitsManager.defaultLengthUnits,
@@ -338,11 +602,20 @@ class DogboneCommand(object):
         modeGroupChildInputs = modeGroup.children
         
         modeRowInput = adsk.core.ButtonRowCommandInput.cast(modeGroupChildInputs.addButtonRowCommandInput('modeRow', 'Mode', False))
-        modeRowInput.listItems.add('Static', not self.parametric, 'resources/staticMode' )
+        modeRowInput.listItems.add('Static', not self.parametric and not self.toolBody, 'resources/staticMode' )
         modeRowInput.listItems.add('Parametric', self.parametric, 'resources/parametricMode' )
+        modeRowInput.listItems.add('Tool Body', self.toolBody and not self.parametric, 'resources/staticMode' )
         modeRowInput.tooltipDescription = "Static dogbones do not move with the underlying component geometry. \n" \
                                 "\nParametric dogbones will automatically adjust position with parametric changes to underlying geometry. " \
-                                "Geometry changes must be made via the parametric dialog.\nFusion has more issues/bugs with these!"
+                                "Geometry changes must be made via the parametric dialog.\nFusion has more issues/bugs with these!\n" \
+                                "\nTool Body dogbones are static, but all of them are cut in one combine per body rather than with hole features - " \
+                                "much faster for large jobs."
+
+        groupHolesInp = modeGroupChildInputs.addBoolValueInput('groupHoles', 'Group Holes', True, '', self.groupHoles)
+        groupHolesInp.tooltip = "Creates one hole feature per hole plane and depth, instead of one per dogbone."
+        groupHolesInp.tooltipDescription = "Each dogbone is a sketch point dimensioned to its corner edges, so grouped holes still follow geometry changes.\n"\
+                                           "\nFewer timeline features make parameter changes (e.g. dbToolDia) recompute much faster."
+        groupHolesInp.isVisible = self.parametric
         
         typeRowInput = adsk.core.ButtonRowCommandInput.cast(modeGroupChildInputs.addButtonRowCommandInput('dogboneType', 'Type', False))
         typeRowInput.listItems.add('Normal Dogbone', self.dbType == 'Normal Dogbone', 'resources/normal' )
@@ -372,6 +645,12 @@ class DogboneCommand(object):
         depthRowInput.listItems.add('From Top Face', self.fromTop, 'resources/fromTop' )
         depthRowInput.tooltipDescription = "When \"From Top Face\" is selected, all dogbones will be extended to the top most face\n"\
                                             "\nThis is typically chosen when you don't want to, or can't do, double sided machining."
+
+        updateInp = modeGroupChildInputs.addBoolValueInput('updateExisting', 'Update Existing', True, '', self.updateExisting)
+        updateInp.tooltip = "Updates the dogbones added before, instead of adding duplicates"
+        updateInp.tooltipDescription = "Dogbones already added to the selected bodies are rolled back while the dialog is open, so their corners can be selected again. "\
+                                       "On OK, the ones that haven't changed are kept, and only changed or new dogbones are removed and added.\n"\
+                                       "\nBodies and directions with no dogbones selected are left alone. Best set before selecting faces."
  
         settingGroup = adsk.core.GroupCommandInput.cast(inputs.addGroupCommandInput('settingsGroup', 'Settings'))
         settingGroup.isExpanded = self.expandSettingsGroup
@@ -381,6 +660,25 @@ class DogboneCommand(object):
         benchMark.tooltip = "Enables benchmarking"
         benchMark.tooltipDescription = "When enabled, shows overall time taken to process all selected dogbones."
 
+        profileInp = settingGroupChildInputs.addBoolValueInput("profile", "Profile", True, "", self.profile)
+        profileInp.tooltip = "Profiles the add-in with cProfile"
+        profileInp.tooltipDescription = "When enabled, selecting faces and creating dogbones are profiled. "\
+                                        "The profile is saved as dogbone.prof, with a summary of the slowest functions in dogbone_profile.txt.\n" \
+                     "Location: " +  self.appPath
+
+        savePlanInp = settingGroupChildInputs.addBoolValueInput('savePlan', 'Save plan', True, '', self.savePlan)
+        savePlanInp.tooltip = "Saves the dogbone plan to a file, so it can be replayed"
+        savePlanInp.tooltipDescription = "When enabled, you'll be asked for a file name when OK is pressed.\n"\
+                                         "\nThe saved plan holds every dogbone's position and size, and can be applied again with the Replay Dogbone Plan command, "\
+                                         "without having to select any faces."
+
+        toleranceInp = settingGroupChildInputs.addValueInput(
+            'depthTolerance', 'Depth Tolerance', self.design.unitsManager.defaultLengthUnits,
+            adsk.core.ValueInput.createByReal(self.depthTolerance))
+        toleranceInp.tooltip = "Dogbone depths within this tolerance share one hole feature."
+        toleranceInp.tooltipDescription = "Static dogbones on coplanar faces are grouped into one hole feature per depth.\n"\
+                                          "Depths that differ by less than this (e.g. floating point noise) are treated as the same depth."
+
         logDropDownInp = adsk.core.DropDownCommandInput.cast(settingGroupChildInputs.addDropDownCommandInput("logging", "Logging level", adsk.core.DropDownStyles.TextListDropDownStyle))
         logDropDownInp.tooltip = "Enables logging"
         logDropDownInp.tooltipDescription = "Creates a dogbone.log file. \n" \
@@ -393,38 +691,66 @@ class DogboneCommand(object):
         cmd = adsk.core.Command.cast(args.command)
         # Add handlers to this command.
         cmd.execute.add(self.handlers.make_handler(adsk.core.CommandEventHandler, self.onExecute))
+        cmd.executePreview.add(self.handlers.make_handler(adsk.core.CommandEventHandler, self.onPreview))
         cmd.selectionEvent.add(self.handlers.make_handler(adsk.core.SelectionEventHandler, self.onFaceSelect))
         cmd.validateInputs.add(
             self.handlers.make_handler(adsk.core.ValidateInputsEventHandler, self.onValidate))
         cmd.inputChanged.add(
-            self.handlers.make_handler(adsk.core.InputChangedEventHandler, self.onChange))
+            self.handlers.make_handler(adsk.core.InputChangedEventHandler, self.onInputChanged))
+        cmd.destroy.add(self.handlers.make_handler(adsk.core.CommandEventHandler, self.onDestroy))
+        cmd.unselect.add(self.handlers.make_handler(adsk.core.SelectionEventHandler, self.onUnselect))
 
     #==============================================================================
     #  routine to process any changed selections
     #  this is where selection and deselection management takes place
     #  also where eligible edges are determined
     #==============================================================================
+    @profiled
     def onChange(self, args:adsk.core.InputChangedEventArgs):
         
         changedInput = adsk.core.CommandInput.cast(args.input)
-#        self.logger.debug('input changed- {}'.format(changedInput.id))
+#        self.logger.debug('input changed- {}', changedInput.id)
+        self.checkTimeline()
 
         if changedInput.id == 'dogboneType':
             changedInput.commandInputs.itemById('minimalPercent').isVisible = (changedInput.commandInputs.itemById('dogboneType').selectedItem.name == 'Minimal Dogbone')
             changedInput.commandInputs.itemById('mortiseType').isVisible = (changedInput.commandInputs.itemById('dogboneType').selectedItem.name == 'Mortise Dogbone')
        
 
+        if changedInput.id == 'modeRow':
+            changedInput.commandInputs.itemById('groupHoles').isVisible = (changedInput.commandInputs.itemById('modeRow').selectedItem.name == 'Parametric')
+
+        if changedInput.id == 'autoDetect':
+            self.autoDetectFaces(changedInput.commandInputs)
+            return
+
+        if changedInput.id == 'profile':
+            self.profile = changedInput.value  # profiling starts with the next event
+            return
+
+        if changedInput.id == 'updateExisting':
+            self.updateExisting = changedInput.value
+            if self.updateExisting:
+                for body in [selectedFace.face.body for selectedFace in self.selectedFaces.values() if selectedFace.selected]:
+                    self.suspendExisting(body)
+            else:
+                self.restoreExisting()
+            return
+
         if changedInput.id != 'select' and changedInput.id != 'edgeSelect':
             return
+        self.corners = None  # selection has changed - the preview has to collect corners again
 
-#        self.logger.debug('input changed- {}'.format(changedInput.id))
+#        self.logger.debug('input changed- {}', changedInput.id)
         if changedInput.id == 'select':
+            if self.addingFaces:
+                return  # autoDetectFaces does its own bookkeeping
 
             #==============================================================================
             #            processing changes to face selections
             #==============================================================================
-            numSelectedFaces = sum(1 for face in self.selectedFaces.values() if face.selected) 
-            if numSelectedFaces > changedInput.selectionCount:               
+            unselectedFaces = self.selectionState.popUnselected('select')
+            if self.selectionState.faceCount > changedInput.selectionCount:               
                 # a face has been removed
                 
                 # If all faces are removed, just iterate through all
@@ -435,15 +761,20 @@ class DogboneCommand(object):
                     changedInput.commandInputs.itemById('edgeSelect').clearSelection()
                     changedInput.commandInputs.itemById('select').hasFocus = True                    
                     changedInput.commandInputs.itemById('edgeSelect').isVisible = False   
+                    self.selectionState.refresh(self.selectedOccurrences)
                     return
                 
-                # Else find the missing face in selection
-                selectionList = [changedInput.selection(i).entity.tempId for i in range(changedInput.selectionCount)]
-                missingFace = {k for k, v in self.selectedFaces.items() if v.selected and v.tempId not in selectionList}.pop()
+                # Else the unselect event has told us which face went missing - otherwise find the missing face in selection
+                missingFaces = [k for k in unselectedFaces if k in self.selectedFaces and self.selectedFaces[k].selected]
+                if not missingFaces:
+                    selectionSet = {changedInput.selection(i).entity.tempId for i in range(changedInput.selectionCount)}
+                    missingFaces = [k for k, v in self.selectedFaces.items() if v.selected and v.tempId not in selectionSet]
                 changedInput.commandInputs.itemById('edgeSelect').hasFocus = True
-                self.selectedFaces[missingFace].selectAll(False)
+                for missingFace in missingFaces:
+                    self.selectedFaces[missingFace].selectAll(False)
             
                 changedInput.commandInputs.itemById('select').hasFocus = True
+                self.selectionState.refresh(self.selectedOccurrences)
                 return
              
             #==============================================================================
@@ -452,37 +783,13 @@ class DogboneCommand(object):
             face = adsk.fusion.BRepFace.cast(changedInput.selection(changedInput.selectionCount -1).entity)
             changedInput.commandInputs.itemById('edgeSelect').isVisible = True  
             
-            changedEntity = face #changedInput.selection(changedInput.selectionCount-1).entity
-            if changedEntity.assemblyContext:
-                activeOccurrenceName = changedEntity.assemblyContext.name
-            else:
-                activeOccurrenceName = changedEntity.body.name
-                
-            if changedInput.selection(changedInput.selectionCount-1).entity.assemblyContext:
-                changedEntityName = changedInput.selection(changedInput.selectionCount-1).entity.assemblyContext.name.split(':')[-1]
-            else:
-                changedEntityName = changedEntity.body.name
-            
-            faceId = str(changedEntity.tempId) + ":" + changedEntityName 
-            if faceId in self.selectedFaces :
-                changedInput.commandInputs.itemById('edgeSelect').hasFocus = True
-                self.selectedFaces[faceId].selectAll(True) 
+            edgeSelect = changedInput.commandInputs.itemById('edgeSelect')
+            (selectedFace, reselected) = self.addFace(face, edgeSelect)
+            if reselected:
+                edgeSelect.hasFocus = True
+                selectedFace.selectAll(True) 
                 changedInput.commandInputs.itemById('select').hasFocus = True
-                return
-            newSelectedFace = SelectedFace(
-                                            self, 
-                                            face,
-                                            faceId,
-                                            changedEntity.tempId,
-                                            changedEntityName,
-                                            face.nativeObject.pointOnFace if face.assemblyContext else face.pointOnFace,
-                                            changedInput.commandInputs.itemById('edgeSelect')
-                                          )  # creates a collecton (of edges) associated with a faceId
-            faces = []
-            faces = self.selectedOccurrences.get(activeOccurrenceName, faces)
-            faces.append(newSelectedFace)
-            self.selectedOccurrences[activeOccurrenceName] = faces # adds a face to a list of faces associated with this occurrence
-            self.selectedFaces[faceId] = newSelectedFace
+            self.selectionState.refresh(self.selectedOccurrences)
 
 
                  #end of processing faces
@@ -491,17 +798,25 @@ class DogboneCommand(object):
         #==============================================================================
         if changedInput.id != 'edgeSelect':
             return
+        if self.addingEdges:
+            return  # SelectedFace.pushSelections has already done the bookkeeping for its batch
 
-        if sum(1 for edge in self.selectedEdges.values() if edge.selected) > changedInput.selectionCount:
+        unselectedEdges = self.selectionState.popUnselected('edgeSelect')
+        if self.selectionState.edgeCount > changedInput.selectionCount:
             #==============================================================================
             #             an edge has been removed
+            #             the unselect event normally tells us which - only rescan the selection if the counts still don't agree
             #==============================================================================
-            
-            changedSelectionList = [changedInput.selection(i).entity for i in range(changedInput.selectionCount)]
-            changedEdgeIdSet = set(map(calcId, changedSelectionList))  # converts list of edges to a list of their edgeIds
-            missingEdges = (set(self.selectedEdges.keys()) - changedEdgeIdSet)
-            for missingEdge in missingEdges:
-                self.selectedEdges[missingEdge].select(False)
+            for missingEdge in unselectedEdges:
+                if missingEdge in self.selectedEdges:
+                    self.selectedEdges[missingEdge].select(False)
+
+            if self.selectionState.edgeCount != changedInput.selectionCount:
+                changedSelectionList = [changedInput.selection(i).entity for i in range(changedInput.selectionCount)]
+                changedEdgeIdSet = set(map(calcId, changedSelectionList))  # converts list of edges to a list of their edgeIds
+                missingEdges = (set(self.selectedEdges.keys()) - changedEdgeIdSet)
+                for missingEdge in missingEdges:
+                    self.selectedEdges[missingEdge].select(False)
             # Note - let the user manually unselect the face if they want to choose a different face
 
             return
@@ -515,6 +830,76 @@ class DogboneCommand(object):
             self.selectedEdges[calcId(edge)].select() # Get selectedFace then get selectedEdge, then call function
 
 
+    def autoDetectFaces(self, inputs):
+        '''
+        selects every face with dogbone edges in one go - on the bodies that already have a face selected or, if none have,
+        on every solid body of the design (see dbUtils.designBodies).
+        Faces follow the selection rules of onFaceSelect: only faces facing the same way as the occurrence's primary face - or,
+        without one, the direction with most dogbone edges - and one occurrence per component
+        '''
+        select = inputs.itemById('select')
+        edgeSelect = inputs.itemById('edgeSelect')
+        self.checkTimeline()
+
+        bodies = {}  # (occurrence or body name, native body entityToken): body - in selection order
+        for selectedFace in self.selectedFaces.values():
+            if selectedFace.selected:
+                body = selectedFace.face.body
+                bodies.setdefault((body.assemblyContext.name if body.assemblyContext else body.name, makeNative(body).entityToken), body)
+        bodies = list(bodies.values()) or dbUtils.designBodies(self.design)
+
+        added = 0
+        primaryNormals = dict(self.selectionState.primaryNormals)  # the bodies of an occurrence all follow its primary face
+        self.addingFaces = True
+        try:
+            for body in bodies:
+                occurrenceName = body.assemblyContext.name if body.assemblyContext else body.name
+                self.suspendExisting(body)  # before its corners are looked for
+                dogboneFaces = dbUtils.findDogboneFaces(body, self.loopWalk, primaryNormals.get(occurrenceName), self.headless)
+                if dogboneFaces and not primaryNormals.get(occurrenceName):
+                    primaryNormals[occurrenceName] = dbUtils.getFaceNormal(dogboneFaces[0][0])
+                for (face, edges) in dogboneFaces:
+                    (selectedFace, reselected) = self.addFace(face, edgeSelect, edges)
+                    if reselected:
+                        if selectedFace.selected:
+                            continue
+                        selectedFace.selectAll(True)
+                    select.addSelection(face)
+                    added += 1
+        finally:
+            self.addingFaces = False
+            self.selectionState.refresh(self.selectedOccurrences)
+
+        self.logger.info('auto detect - {} faces added on {} bodies', added, len(bodies))
+        self.corners = None
+        if self.selectedFaces:
+            edgeSelect.isVisible = True
+        select.hasFocus = True
+
+    def onInputChanged(self, args):
+        self.onChange(args)
+        try:
+            self.overlay.update(args.input.commandInputs)
+        except:
+            self.logger.exception('Failed to update the dogbone overlay')  # graphics only - never worth interrupting the selection
+
+    def onDestroy(self, args):
+        self.overlay.clear()
+        self.restoreExisting()  # cancelled - nothing has been updated
+        self.finishProfile()  # executed or cancelled, the command is over
+
+    def onUnselect(self, args):
+        '''
+        records the id of each face or edge the user unselects, so onChange only has to process the changed items
+        '''
+        eventArgs = adsk.core.SelectionEventArgs.cast(args)
+        activeIn = eventArgs.firingEvent.activeInput
+        if self.addingEdges or not activeIn:
+            return
+        if activeIn.id != 'select' and activeIn.id != 'edgeSelect':
+            return
+        self.selectionState.unselected[activeIn.id].append(calcId(eventArgs.selection.entity))
+
     def parseInputs(self, inputs):
         '''==============================================================================
            put the selections into variables that can be accessed by the main routine            
@@ -523,7 +908,7 @@ class DogboneCommand(object):
         inputs = {inp.id: inp for inp in inputs}
 
         self.logging = self.loggingLevels[inputs['logging'].selectedItem.name]
-        self.logHandler.setLevel(self.logging)
+        self.logWriter.setLevel(self.logging)
 
         self.logger.debug('Parsing inputs')
 
@@ -532,25 +917,37 @@ class DogboneCommand(object):
         self.offStr = inputs['offset'].expression
         self.offVal = inputs['offset'].value
         self.benchmark = inputs['benchmark'].value
+        self.profile = inputs['profile'].value
+        self.savePlan = inputs['savePlan'].value
+        self.updateExisting = inputs['updateExisting'].value
         self.dbType = inputs['dogboneType'].selectedItem.name
         self.minimalPercent = inputs['minimalPercent'].value
+        self.depthTolerance = inputs['depthTolerance'].value
         self.fromTop = (inputs['depthExtent'].selectedItem.name == 'From Top Face')
         self.parametric = (inputs['modeRow'].selectedItem.name == 'Parametric')
+        self.groupHoles = inputs['groupHoles'].value
+        self.toolBody = (inputs['modeRow'].selectedItem.name == 'Tool Body')
         self.longside = (inputs['mortiseType'].selectedItem.name == 'On Long Side')
         self.expandModeGroup = (inputs['modeGroup']).isExpanded
         self.expandSettingsGroup = (inputs['settingsGroup']).isExpanded
 
-        self.logger.debug('self.fromTop = {}'.format(self.fromTop))
-        self.logger.debug('self.dbType = {}'.format(self.dbType))
-        self.logger.debug('self.parametric = {}'.format(self.parametric))
-        self.logger.debug('self.circStr = {}'.format(self.circStr))
-        self.logger.debug('self.circDiameter = {}'.format(self.circVal))
-        self.logger.debug('self.offStr = {}'.format(self.offStr))
-        self.logger.debug('self.offVal = {}'.format(self.offVal))
-        self.logger.debug('self.benchmark = {}'.format(self.benchmark))
-        self.logger.debug('self.mortiseType = {}'.format(self.longside))
-        self.logger.debug('self.expandModeGroup = {}'.format(self.expandModeGroup))
-        self.logger.debug('self.expandSettingsGroup = {}'.format(self.expandSettingsGroup))
+        self.logger.debug('self.fromTop = {}', self.fromTop)
+        self.logger.debug('self.dbType = {}', self.dbType)
+        self.logger.debug('self.parametric = {}', self.parametric)
+        self.logger.debug('self.groupHoles = {}', self.groupHoles)
+        self.logger.debug('self.toolBody = {}', self.toolBody)
+        self.logger.debug('self.circStr = {}', self.circStr)
+        self.logger.debug('self.circDiameter = {}', self.circVal)
+        self.logger.debug('self.offStr = {}', self.offStr)
+        self.logger.debug('self.offVal = {}', self.offVal)
+        self.logger.debug('self.benchmark = {}', self.benchmark)
+        self.logger.debug('self.profile = {}', self.profile)
+        self.logger.debug('self.savePlan = {}', self.savePlan)
+        self.logger.debug('self.updateExisting = {}', self.updateExisting)
+        self.logger.debug('self.depthTolerance = {}', self.depthTolerance)
+        self.logger.debug('self.mortiseType = {}', self.longside)
+        self.logger.debug('self.expandModeGroup = {}', self.expandModeGroup)
+        self.logger.debug('self.expandSettingsGroup = {}', self.expandSettingsGroup)
         
         self.edges = []
         self.faces = []
@@ -565,99 +962,452 @@ class DogboneCommand(object):
                 self.faces.append(entity)
                 
     def initLogger(self):
-        self.logger = logging.getLogger(__name__)
-        self.formatter = logging.Formatter('%(asctime)s ; %(name)s ; %(levelname)s ; %(lineno)d; %(message)s')
-#        if not os.path.isfile(os.path.join(self.appPath, 'dogBone.log')):
-#            return
-        self.logHandler = logging.FileHandler(os.path.join(self.appPath, 'dogbone.log'), mode='w')
-        self.logHandler.setFormatter(self.formatter)
-        self.logHandler.flush()
-        self.logger.addHandler(self.logHandler)
+        '''
+        starts a new dogbone.log (the previous one is kept as dogbone.log.1), at the current logging level -
+        see dbLogging.LogWriter
+        '''
+        self.logWriter.start(os.path.join(self.appPath, 'dogbone.log'), self.logging)
+
+    def setUpParameters(self):
+        '''
+        creates (or updates) the user parameters parametric dogbones are driven by
+        '''
+        userParams = adsk.fusion.UserParameters.cast(self.design.userParameters)
         
-    def closeLogger(self):
-        for handler in self.logger.handlers:
-            handler.flush()
-            handler.close()
+        #set up parameters, so that changes can be easily made after dogbones have been inserted
+        if not userParams.itemByName('dbToolDia'):
+            dValIn = adsk.core.ValueInput.createByString(self.circStr)
+            dParameter = userParams.add('dbToolDia', dValIn, self.design.unitsManager.defaultLengthUnits, '')
+            dParameter.isFavorite = True
+        else:
+            uParam = userParams.itemByName('dbToolDia')
+            uParam.expression = self.circStr
+            uParam.isFavorite = True
+            
+        if not userParams.itemByName('dbOffset'):
+            rValIn = adsk.core.ValueInput.createByString(self.offStr)
+            rParameter = userParams.add('dbOffset',rValIn, self.design.unitsManager.defaultLengthUnits, 'Do NOT change formula')
+        else:
+            uParam = userParams.itemByName('dbOffset')
+            uParam.expression = self.offStr
+            uParam.comment = 'Do NOT change formula'
 
-    def onExecute(self, args):
-        start = time.time()
+        if not userParams.itemByName('dbRadius'):
+            rValIn = adsk.core.ValueInput.createByString('(dbToolDia + dbOffset)/2')
+            rParameter = userParams.add('dbRadius',rValIn, self.design.unitsManager.defaultLengthUnits, 'Do NOT change formula')
+        else:
+            uParam = userParams.itemByName('dbRadius')
+            uParam.expression = '(dbToolDia + dbOffset)/2'
+            uParam.comment = 'Do NOT change formula'
+
+        if not userParams.itemByName('dbMinPercent'):
+            rValIn = adsk.core.ValueInput.createByReal(self.minimalPercent)
+            rParameter = userParams.add('dbMinPercent',rValIn, '', '')
+            rParameter.isFavorite = True
+        else:
+            uParam = userParams.itemByName('dbMinPercent')
+            uParam.value = self.minimalPercent
+            uParam.comment = ''
+            uParam.isFavorite = True
+
+        if not userParams.itemByName('dbHoleOffset'):
+            oValIn = adsk.core.ValueInput.createByString('dbRadius / sqrt(2)' + (' * (1 + dbMinPercent/100)') if self.dbType == 'Minimal Dogbone' else 'dbRadius' if self.dbType == 'Mortise Dogbone' else 'dbRadius / sqrt(2)')
+            oParameter = userParams.add('dbHoleOffset', oValIn, self.design.unitsManager.defaultLengthUnits, 'Do NOT change formula')
+        else:
+            uParam = userParams.itemByName('dbHoleOffset')
+            uParam.expression = 'dbRadius / sqrt(2)' + (' * (1 + dbMinPercent/100)') if self.dbType == 'Minimal Dogbone' else 'dbRadius' if self.dbType == 'Mortise Dogbone' else 'dbRadius / sqrt(2)'
+            uParam.comment = 'Do NOT change formula'
 
-        self.initLogger()
-        self.logger.log(0, 'logging Level = %(levelname)')
-        self.parseInputs(args.firingEvent.sender.commandInputs)
-        self.logHandler.setLevel(self.logging)
-        self.logger.setLevel(self.logging)
+        self.radius = userParams.itemByName('dbRadius').value
+        self.offset = adsk.core.ValueInput.createByString('dbOffset')
+        self.offset = adsk.core.ValueInput.createByReal(userParams.itemByName('dbHoleOffset').value)
 
-        self.writeDefaults()
+    #==============================================================================
+    #  existing dogbones - what each run adds is tagged (see dbAttributes), so that running again updates it
+    #==============================================================================
+    def suspendExisting(self, body):
+        '''
+        suppresses the dogbones earlier runs added to body (native or proxy), so that the corners they cut can be selected
+        again - called before the first of its faces is selected. createDogbones then keeps or removes them,
+        restoreExisting puts back the rest.
+        returns True if any were suppressed - the body's faces and edges are then no longer valid
+        '''
+        if not self.updateExisting or not self.design or self.design.designType != adsk.fusion.DesignTypes.ParametricDesignType:
+            return False  # without a timeline, there's nothing to roll back
+        key = (body.assemblyContext.name if body.assemblyContext else body.name, body.name)  # as dbPlanner.dogboneKey
+        if key in self.suspendedBodies:
+            return False
+        self.suspendedBodies.add(key)
+        if self.designUnits is None:
+            self.designUnits = dbAttributes.findUnits(self.design)
+        units = {unitId: unit for (unitId, unit) in dbAttributes.unitsOnBody(self.designUnits, *key).items() if unitId not in self.existingUnits}
+        if not units:
+            return False
+        dbAttributes.suppress(units.values())
+        self.existingUnits.update(units)
+        self.logger.info('{} existing dogbone units suppressed on {}', len(units), key[1])
+        return True
+
+    def restoreExisting(self):
+        if self.existingUnits:
+            dbAttributes.suppress(self.existingUnits.values(), False)
+            self.existingUnits = {}
+        self.suspendedBodies = set()
+        self.designUnits = None
+
+    def tagFeature(self, feature, unitId, dogbones, sketchId = None):
+        '''
+        tags feature for the next run (see dbAttributes.RunTags.tagFeature). A feature that can't be tagged is kept,
+        but counted as an error - the next run won't know its dogbones are there
+        '''
+        try:
+            self.tags.tagFeature(feature, unitId, dogbones, sketchId)
+        except:
+            self.errorCount += 1
+            self.logger.exception('Failed to tag {0.name}', feature)
+
+    def updateExistingDogbones(self, keep, remove):
+        '''
+        restores the suspended units in keep, and deletes the ones in remove - called once the new dogbones have been added,
+        so that the faces they were planned on don't change under them
+        '''
+        units = self.existingUnits
+        self.existingUnits = {}
+        keptUnits = [units[unitId] for unitId in keep]
+        dbAttributes.suppress(keptUnits, False)
+        dbAttributes.remove(self.design, [units[unitId] for unitId in remove], keptUnits)
 
-        if self.parametric:
-            userParams = adsk.fusion.UserParameters.cast(self.design.userParameters)
-            
-            #set up parameters, so that changes can be easily made after dogbones have been inserted
-            if not userParams.itemByName('dbToolDia'):
-                dValIn = adsk.core.ValueInput.createByString(self.circStr)
-                dParameter = userParams.add('dbToolDia', dValIn, self.design.unitsManager.defaultLengthUnits, '')
-                dParameter.isFavorite = True
-            else:
-                uParam = userParams.itemByName('dbToolDia')
-                uParam.expression = self.circStr
-                uParam.isFavorite = True
-                
-            if not userParams.itemByName('dbOffset'):
-                rValIn = adsk.core.ValueInput.createByString(self.offStr)
-                rParameter = userParams.add('dbOffset',rValIn, self.design.unitsManager.defaultLengthUnits, 'Do NOT change formula')
-            else:
-                uParam = userParams.itemByName('dbOffset')
-                uParam.expression = self.offStr
-                uParam.comment = 'Do NOT change formula'
+    #==============================================================================
+    #  saved plans - see dbPlanner.planToData/planFromData for the file format
+    #==============================================================================
+    def dogboneKeys(self, dogbone):
+        '''
+        returns (component name, persistent keys) for the API references of a planned dogbone
+        '''
+        refs = dogbone.corner.refs
+        tokens = refs.tokens
+        return (refs.component.name,
+                {'edge': tokens.edge,
+                 'body': tokens.body,
+                 'bodyName': refs.body.name,
+                 'face': tokens.face,
+                 'plane': tokens.plane,
+                 'planePoint': tokens.planePoint,
+                 'cornerEdges': list(tokens.cornerEdges) if tokens.cornerEdges else None})
+
+    def planOptions(self):
+        return {'mode': 'Parametric' if self.parametric else 'Tool Body' if self.toolBody else 'Static',
+                'groupHoles': self.groupHoles,
+                'fromTop': self.fromTop,
+                'depthTolerance': self.depthTolerance,
+                'circStr': self.circStr,
+                'offStr': self.offStr}
+
+    def savePlanFile(self, plan):
+        fileDialog = self.ui.createFileDialog()
+        fileDialog.title = 'Save dogbone plan'
+        fileDialog.filter = 'Dogbone plan (*.dbplan);;All files (*.*)'
+        if fileDialog.showSave() != adsk.core.DialogResults.DialogOK:
+            return
+        settings = dbPlanner.DogboneSettings(self.dbType, self.radius, self.minimalPercent, self.longside)
+        json_file = open(fileDialog.filename, 'w', encoding='UTF-8')
+        json.dump(dbPlanner.planToData(plan, settings, self.planOptions(), self.dogboneKeys), json_file, ensure_ascii=False)
+        json_file.close()
+        self.logger.info('plan saved to {} - {} dogbones', fileDialog.filename, len(plan))
+
+    def findEntity(self, token):
+        if not token:
+            return None
+        entities = self.design.findEntityByToken(token)
+        return entities[0] if entities else None
+
+    def resolvePlanRefs(self, components, componentName, keys):
+        '''
+        returns dbPlanner.CornerRefs for a saved dogbone - entity tokens first, then body name and a point on the plane
+        (for a revision of the part, where the tokens no longer resolve). None if the body or plane can't be found
+        components - {name: component} of the design, made once per replay
+        '''
+        comp = components.get(componentName)
+        if comp is None:
+            return None
+        body = self.findEntity(keys['body']) or comp.bRepBodies.itemByName(keys['bodyName'])
+        plane = self.findEntity(keys['plane'])
+        if not plane or not plane.isValid:
+            plane = self.reValidateFace(comp, adsk.core.Point3D.create(*keys['planePoint']))
+        if not body or not plane:
+            return None
+        face = self.findEntity(keys['face']) or plane
+        edge = self.findEntity(keys['edge'])
+        cornerEdges = tuple(self.findEntity(token) for token in keys['cornerEdges']) if keys['cornerEdges'] else None
+        if not edge or (cornerEdges and not all(cornerEdges)):
+            cornerEdges = None  # the edges are only needed by parametric dogbones
+        (face, body, plane) = (makeNative(face), makeNative(body), makeNative(plane))
+        tokens = dbPlanner.RefTokens(face.entityToken,
+                                     edge.entityToken if edge else None,
+                                     tuple(cornerEdge.entityToken for cornerEdge in cornerEdges) if cornerEdges else None,
+                                     body.entityToken,
+                                     plane.entityToken,
+                                     plane.pointOnFace.asArray())
+        return dbPlanner.CornerRefs(comp, face, edge, cornerEdges, body, plane, tokens)
+
+    def onReplayCreate(self, args:adsk.core.CommandCreatedEventArgs):
+        cmd = adsk.core.Command.cast(args.command)
+        cmd.isExecutedWhenPreEmpted = False
+        cmd.execute.add(self.handlers.make_handler(adsk.core.CommandEventHandler, self.onReplay))
+
+    def onReplay(self, args):
+        '''
+        creates the dogbones of a saved plan - there's nothing to select, and no corner or topology analysis is done.
+        Parametric plans are replayed with the grouped parametric engine, which also needs the corner edges - 
+        if any of them can't be found the plan is replayed as static dogbones
+        '''
+        fileDialog = self.ui.createFileDialog()
+        fileDialog.title = 'Replay dogbone plan'
+        fileDialog.filter = 'Dogbone plan (*.dbplan);;All files (*.*)'
+        if fileDialog.showOpen() != adsk.core.DialogResults.DialogOK:
+            return
 
-            if not userParams.itemByName('dbRadius'):
-                rValIn = adsk.core.ValueInput.createByString('(dbToolDia + dbOffset)/2')
-                rParameter = userParams.add('dbRadius',rValIn, self.design.unitsManager.defaultLengthUnits, 'Do NOT change formula')
-            else:
-                uParam = userParams.itemByName('dbRadius')
-                uParam.expression = '(dbToolDia + dbOffset)/2'
-                uParam.comment = 'Do NOT change formula'
-
-            if not userParams.itemByName('dbMinPercent'):
-                rValIn = adsk.core.ValueInput.createByReal(self.minimalPercent)
-                rParameter = userParams.add('dbMinPercent',rValIn, '', '')
-                rParameter.isFavorite = True
-            else:
-                uParam = userParams.itemByName('dbMinPercent')
-                uParam.value = self.minimalPercent
-                uParam.comment = ''
-                uParam.isFavorite = True
-
-            if not userParams.itemByName('dbHoleOffset'):
-                oValIn = adsk.core.ValueInput.createByString('dbRadius / sqrt(2)' + (' * (1 + dbMinPercent/100)') if self.dbType == 'Minimal Dogbone' else 'dbRadius' if self.dbType == 'Mortise Dogbone' else 'dbRadius / sqrt(2)')
-                oParameter = userParams.add('dbHoleOffset', oValIn, self.design.unitsManager.defaultLengthUnits, 'Do NOT change formula')
-            else:
-                uParam = userParams.itemByName('dbHoleOffset')
-                uParam.expression = 'dbRadius / sqrt(2)' + (' * (1 + dbMinPercent/100)') if self.dbType == 'Minimal Dogbone' else 'dbRadius' if self.dbType == 'Mortise Dogbone' else 'dbRadius / sqrt(2)'
-                uParam.comment = 'Do NOT change formula'
+        self.initLogger()
+        self.readDefaults()
+        self.timer = dbUtils.PhaseTimer(enabled = False)
+        self.logWriter.setLevel(self.logging)
+        try:
+            json_file = open(fileDialog.filename, 'r', encoding='UTF-8')
+            data = json.load(json_file)
+            json_file.close()
+            components = {}
+            for component in self.design.allComponents:
+                components.setdefault(component.name, component)
+            (plan, settings, options) = dbPlanner.planFromData(data, functools.partial(self.resolvePlanRefs, components))
+        except (ValueError, KeyError, TypeError):
+            self.logger.exception('Failed to read dogbone plan')
+            dbUtils.messageBox('{} is not a dogbone plan this version can read:\n{}'.format(fileDialog.filename, traceback.format_exc()))
+            return
+        self.logger.info('replaying {} - {} dogbones', fileDialog.filename, len(plan))
+
+        (self.dbType, self.radius, self.minimalPercent, self.longside) = settings
+        self.fromTop = options['fromTop']
+        self.depthTolerance = options['depthTolerance']
+        self.circStr = options['circStr']
+        self.offStr = options['offStr']
+
+        mode = options['mode'] if options['mode'] != 'Parametric' or all(dogbone.corner.refs.cornerEdges for dogbone in plan) else 'Static'
+        self.tags = dbAttributes.RunTags(self.design, mode, dict(options, mode = mode, **settings._asdict()))
+        if mode == 'Parametric':
+            self.setUpParameters()
+            self.createGroupedParametricDogbones(plan)
+        elif mode == 'Tool Body':
+            self.createToolBodyDogbones(plan)
+        else:
+            self.createStaticDogbones(plan)
+        self.finishProfile()
 
-            self.radius = userParams.itemByName('dbRadius').value
-            self.offset = adsk.core.ValueInput.createByString('dbOffset')
-            self.offset = adsk.core.ValueInput.createByReal(userParams.itemByName('dbHoleOffset').value)
+    @profiled
+    def onExecute(self, args):
+        start = time.time()
 
-            self.createParametricDogbones()
+        self.initLogger()
+        self.logger.log(0, 'logging Level = %(levelname)')
+        inputs = args.firingEvent.sender.commandInputs
+        self.timer.enabled = inputs.itemById('benchmark').value
+        with self.timer.phase('input parsing'):
+            self.parseInputs(inputs)
+
+        with self.timer.phase('defaults I/O'):
+            self.writeDefaults()
+        self.checkTimeline()
+        self.overlay.clear()
+
+        with self.timer.phase('create dogbones'):
+            self.createDogbones()
+        
+        self.logger.info(dbUtils.faceGeometryCache.stats())
+        self.logger.info(dbUtils.entityResolver.stats())
+        self.logger.info(self.cornerEdgeCache.stats())
+        self.logger.info('all dogbones complete\n-------------------------------------------\n')
 
+        if self.benchmark:
+            self.reportBenchmark(time.time() - start)
+
+    def reportBenchmark(self, seconds):
+        '''
+        shows the phase timings and counts of the last run, and saves them to benchmark.json (next to dogbone.log)
+        '''
+        self.logger.info('Benchmark phases:\n{}', self.timer.report())
+        benchmarkFile = os.path.join(self.appPath, 'benchmark.json')
+        data = {'seconds': seconds,
+                'edges': len(self.edges),
+                'mode': 'Parametric' if self.parametric else 'Tool Body' if self.toolBody else 'Static',
+                'dbType': self.dbType,
+                'fromTop': self.fromTop,
+                'groupHoles': self.groupHoles}
+        data.update(self.timer.toData())
+        try:
+            json_file = open(benchmarkFile, 'w', encoding='UTF-8')
+            json.dump(data, json_file, indent = 2)
+            json_file.close()
+        except OSError:
+            self.logger.exception('Failed to write {}', benchmarkFile)
+        dbUtils.messageBox("Benchmark: {:.02f} sec processing {} edges\n\n{}\n\nSaved to: {}".format(
+            seconds, len(self.edges), self.timer.report(), benchmarkFile))
+
+    def finishProfile(self):
+        '''
+        saves the profile of the command, if anything was profiled, and starts the next command with a new one
+        '''
+        if self.profiler is None:
+            return
+        self.saveProfile()
+        self.profiler = None
+
+    def saveProfile(self):
+        '''
+        writes the profile so far to dogbone.prof (for pstats, snakeviz ...), and the PROFILE_TOP functions
+        with the most cumulative time to dogbone_profile.txt - both next to dogbone.log
+        '''
+        profileFile = os.path.join(self.appPath, 'dogbone.prof')
+        summary = io.StringIO()
+        pstats.Stats(self.profiler, stream = summary).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        try:
+            self.profiler.dump_stats(profileFile)
+            text_file = open(os.path.join(self.appPath, 'dogbone_profile.txt'), 'w', encoding='UTF-8')
+            text_file.write(summary.getvalue())
+            text_file.close()
+        except OSError:
+            self.logger.exception('Failed to write {}', profileFile)
+
+    def reValidateFace(self, comp, refPoint, token = None):
+        '''
+        finds a face of comp again, after it's been invalidated by a feature - by its entity token,
+        or failing that the face at refPoint (see dbUtils.EntityResolver). None if it's gone
+        '''
+        with self.timer.phase('face revalidation'):
+            return dbUtils.entityResolver.resolve(comp, token, refPoint)
+
+    def reValidateEdge(self, comp, selectedEdge):
+        '''
+        returns selectedEdge's native edge - found again by entity token if a feature has invalidated it, None if it's gone
+        '''
+        if selectedEdge.edge.isValid:
+            return makeNative(selectedEdge.edge)
+        with self.timer.phase('edge revalidation'):
+            return dbUtils.entityResolver.resolve(comp, selectedEdge.token, entityType = adsk.fusion.BRepEntityTypes.BRepEdgeEntityType)
+
+    def currentEntity(self, comp, entity, token, current, point = None, entityType = adsk.fusion.BRepEntityTypes.BRepFaceEntityType):
+        '''
+        returns entity - or if a feature has invalidated it, the entity found again by its token, or failing that
+        the face at point (x, y, z) - see dbUtils.EntityResolver. None if it's gone.
+        current - {token: entity} of the entities already checked, so entities shared by several dogbones are checked once
+        '''
+        if not token:
+            return entity  # nothing to find it by
+        if token in current:
+            return current[token]
+        if entity is None or not entity.isValid:
+            with self.timer.phase('edge revalidation' if entityType == adsk.fusion.BRepEntityTypes.BRepEdgeEntityType else 'face revalidation'):
+                entity = dbUtils.entityResolver.resolve(comp, token, adsk.core.Point3D.create(*point) if point else None, entityType)
+        current[token] = entity
+        return entity
+
+    def currentRefs(self, refs, current):
+        '''
+        returns refs (dbPlanner.CornerRefs) with the entities a feature has invalidated since they were collected found again
+        by their tokens (refs.tokens) - see currentEntity. None if the face, body or plane can't be found -
+        the edges are only needed by parametric dogbones, and are left None if they can't
+        '''
+        (comp, tokens) = (refs.component, refs.tokens)
+        edgeType = adsk.fusion.BRepEntityTypes.BRepEdgeEntityType
+        face = self.currentEntity(comp, refs.face, tokens.face, current)
+        body = self.currentEntity(comp, refs.body, tokens.body, current, entityType = adsk.fusion.BRepEntityTypes.BRepBodyEntityType)
+        plane = self.currentEntity(comp, refs.plane, tokens.plane, current, tokens.planePoint)
+        if face is None or body is None or plane is None:
+            return None
+        edge = self.currentEntity(comp, refs.edge, tokens.edge, current, entityType = edgeType)
+        cornerEdges = None
+        if edge is not None and refs.cornerEdges:
+            cornerEdges = tuple(self.currentEntity(comp, cornerEdge, token, current, entityType = edgeType)
+                                for (cornerEdge, token) in zip(refs.cornerEdges, tokens.cornerEdges))
+            if not all(cornerEdges):
+                cornerEdges = None
+        return refs._replace(face = face, edge = edge, cornerEdges = cornerEdges, body = body, plane = plane)
+
+    def currentDogbones(self, dogbones):
+        '''
+        returns dogbones with their refs made current (see currentRefs) - for the engines, once a feature may have
+        invalidated them. Dogbones whose faces can't be found are left out, and counted as errors
+        '''
+        current = {}
+        result = []
+        for dogbone in dogbones:
+            refs = self.currentRefs(dogbone.corner.refs, current)
+            if refs is None:
+                self.logger.warning('the face or body of the dogbone at {} could not be found - skipped', dogbone.centre)
+                self.errorCount += 1
+                continue
+            result.append(dogbone._replace(body = refs.body, plane = refs.plane, corner = dogbone.corner._replace(refs = refs)))
+        return result
+
+
+    def createDogbones(self):
+        '''
+        creates the dogbones of the selection model, with the engine and settings (see parseInputs) chosen -
+        shared by onExecute and DogboneBatch
+        '''
+        if self.parametric:
+            with self.timer.phase('user parameters'):
+                self.setUpParameters()
         else: #Static dogbones
 
             self.radius = (self.circVal + self.offVal) / 2
             self.offset = self.radius / sqrt(2)  * (1 + self.minimalPercent/100) if self.dbType == 'Minimal Dogbone' else self.radius if self.dbType == 'Mortise Dogbone' else self.radius / sqrt(2)
-            
-            self.createStaticDogbones()
-        
-        self.logger.info('all dogbones complete\n-------------------------------------------\n')
 
-        self.closeLogger()
-        
-        if self.benchmark:
-            dbUtils.messageBox("Benchmark: {:.02f} sec processing {} edges".format(
-                time.time() - start, len(self.edges)))
+        plan = self.planDogbones()
+        if self.savePlan:
+            self.savePlanFile(plan)
 
+        mode = self.planOptions()['mode']
+        (keep, remove) = ([], [])
+        if self.existingUnits:
+            (plan, keep, remove) = dbPlanner.diffPlan(plan, {unitId: unit.keys for (unitId, unit) in self.existingUnits.items()}, mode)
+            self.logger.info('existing dogbones - {} units kept, {} removed, {} dogbones to add', len(keep), len(remove), len(plan))
+        settings = dbPlanner.DogboneSettings(self.dbType, self.radius, self.minimalPercent, self.longside)
+        self.tags = dbAttributes.RunTags(self.design, mode, dict(self.planOptions(), **settings._asdict()))
+
+        if self.parametric:
+            if self.groupHoles:
+                self.createGroupedParametricDogbones(plan)
+            else:
+                self.createParametricDogbones(plan)
+        elif self.toolBody:
+            self.createToolBodyDogbones(plan)
+        else:
+            self.createStaticDogbones(plan)
+
+        if self.existingUnits:
+            with self.timer.phase('existing dogbones'):
+                self.updateExistingDogbones(keep, remove)
+
+    def onPreview(self, args):
+        '''
+        shows the dogbones while the inputs change - cut with the tool body engine whatever the mode, and thrown away
+        (isValidResult = False) so that OK still runs the selected engine.
+        Corners are cached between previews (see planDogbones), so changing numbers or dogbone type only replans
+        '''
+        if not self.logWriter.isRunning:
+            self.initLogger()
+        self.timer.enabled = False  # previews aren't part of the benchmark - onExecute turns it back on
+        self.parseInputs(args.firingEvent.sender.commandInputs)
+        self.checkTimeline()
+        if not self.selectedOccurrences:
+            return
+
+        self.radius = (self.circVal + self.offVal) / 2
+        self.tags = dbAttributes.RunTags(None, None, None, enabled = False)  # previews are thrown away
+        try:
+            self.createToolBodyDogbones(self.planDogbones(useCache = True), preview = True)
+        except:
+            self.logger.exception('Preview failed')
+        args.isValidResult = False
 
     ################################################################################        
     def onValidate(self, args):
@@ -687,74 +1437,9 @@ class DogboneCommand(object):
             # processing activities when faces are being selected
             #        selection filter is limited to planar faces
             #        makes sure only valid occurrences and components are selectable
+            #        everything needed is precomputed in self.selectionState whenever the face selection changes
             #==============================================================================
-
-            if not len( self.selectedOccurrences ): #get out if the face selection list is empty
-                eventArgs.isSelectable = True
-                return
-            if not eventArgs.selection.entity.assemblyContext:
-                # dealing with a root component body
-
-                activeBodyName = eventArgs.selection.entity.body.name
-                try:            
-                    faces = self.selectedOccurrences[activeBodyName]
-                    for face in faces:
-                        if face.selected:
-                            primaryFace = face
-                            break
-                    else:
-                        eventArgs.isSelectable = True
-                        return
-                except (KeyError, IndexError) as e:
-                    return
-
-                primaryFaceNormal = dbUtils.getFaceNormal(primaryFace.face)
-                if primaryFaceNormal.isParallelTo(dbUtils.getFaceNormal(eventArgs.selection.entity)):
-                    eventArgs.isSelectable = True
-                    return
-                eventArgs.isSelectable = False
-                return
-            # End of root component face processing
-            
-            #==============================================================================
-            # Start of occurrence face processing              
-            #==============================================================================
-            activeOccurrence = eventArgs.selection.entity.assemblyContext
-            activeOccurrenceName = activeOccurrence.name
-            activeComponent = activeOccurrence.component
-            
-            # we got here because the face is either not in root or is on the existing selected list    
-            # at this point only need to check for duplicate component selection - Only one component allowed, to save on conflict checking
-            try:
-                selectedComponentList = [x[0].face.assemblyContext.component for x in self.selectedOccurrences.values() if x[0].face.assemblyContext]
-            except KeyError:
-               eventArgs.isSelectable = True
-               return
-
-            if activeComponent not in selectedComponentList:
-                    eventArgs.isSelectable = True
-                    return
-
-            if activeOccurrenceName not in self.selectedOccurrences:  #check if mouse is over a face that is not already selected
-                eventArgs.isSelectable = False
-                return
-                
-            try:            
-                faces = self.selectedOccurrences[activeOccurrenceName]
-                for face in faces:
-                    if face.selected:
-                        primaryFace = face
-                        break
-                else:
-                    eventArgs.isSelectable = True
-                    return
-            except KeyError:
-                return
-            primaryFaceNormal = dbUtils.getFaceNormal(primaryFace.face)
-            if primaryFaceNormal.isParallelTo(dbUtils.getFaceNormal(eventArgs.selection.entity)):
-                eventArgs.isSelectable = True
-                return
-            eventArgs.isSelectable = False
+            eventArgs.isSelectable = self.selectionState.isFaceSelectable(eventArgs.selection.entity)
             return
             # end selecting faces
             
@@ -794,23 +1479,30 @@ class DogboneCommand(object):
         return self.rootComp.xZConstructionPlane if self.yUp else self.rootComp.xYConstructionPlane
 
     # The main algorithm for parametric dogbones
-    def createParametricDogbones(self):
+    @profiled
+    def createParametricDogbones(self, plan = None):
+        '''
+        one parametric hole feature per dogbone edge - positioned by offsets from the corner edges.
+        Only edges with a dogbone in plan get a hole (it's used to tag them - see dbAttributes)
+        '''
         self.logger.info('Creating parametric dogbones')
         self.errorCount = 0
         if not self.design:
             raise RuntimeError('No active Fusion design')
         holeInput = adsk.fusion.HoleFeatureInput.cast(None)
         offsetByStr = adsk.core.ValueInput.createByString('dbHoleOffset')
-        centreDistance = self.radius*(1+self.minimalPercent/100 if self.dbType=='Minimal Dogbone' else  1)
+        if plan is None:
+            plan = self.planDogbones()
+        plannedEdges = {(dogbone.occurrence, dogbone.corner.refs.tokens.edge): dogbone for dogbone in plan}
         
-        for occurrenceFace in self.selectedOccurrences.values():
+        for (occurrenceName, occurrenceFace) in self.selectedOccurrences.items():
             startTlMarker = self.design.timeline.markerPosition
 
             if occurrenceFace[0].face.assemblyContext:
                 comp = occurrenceFace[0].face.assemblyContext.component
                 occ = occurrenceFace[0].face.assemblyContext
-                self.logger.debug('processing component  = {}'.format(comp.name))
-                self.logger.debug('processing occurrence  = {}'.format(occ.name))
+                self.logger.debug('processing component  = {0.name}', comp)
+                self.logger.debug('processing occurrence  = {0.name}', occ)
                 #entityName = occ.name.split(':')[-1]
             else:
                comp = self.rootComp
@@ -818,8 +1510,22 @@ class DogboneCommand(object):
                self.logger.debug('processing Rootcomponent')
 
             if self.fromTop:
-                (topFace, topFaceRefPoint) = dbUtils.getTopFace(makeNative(occurrenceFace[0].face))
-                self.logger.info('Processing holes from top face - {}'.format(topFace.body.name))
+                firstFace = makeNative(occurrenceFace[0].face)
+                if not firstFace.isValid:  # the holes of another occurrence of the component
+                    firstFace = self.reValidateFace(comp, occurrenceFace[0].refPoint, occurrenceFace[0].faceToken)
+                with self.timer.phase('top face search'):
+                    (topFace, topFaceRefPoint) = dbUtils.getTopFace(firstFace)
+                topFaceToken = dbUtils.entityResolver.track(makeNative(topFace))
+                self.logger.info('Processing holes from top face - {0.body.name}', topFace)
+
+            # every hole invalidates the body's entities - edges are found again by the tokens taken when their corners
+            # were collected (see faceCorners)
+            edgeDogbones = {}  # edge token: planned dogbone
+            for selectedFace in occurrenceFace:
+                for selectedEdge in selectedFace.selectedEdges.values():
+                    if selectedEdge.selected and selectedEdge.token:
+                        edgeDogbones[selectedEdge.token] = plannedEdges.get((occurrenceName, selectedEdge.token))
+            processedEdges = set()  # tokens of the edges holes have been added to
 
             for selectedFace in occurrenceFace:
                 if len(selectedFace.selectedEdges.values()) <1:
@@ -830,25 +1536,26 @@ class DogboneCommand(object):
                 
                 if not face.isValid:
                     self.logger.debug('revalidating Face')
-                    face = reValidateFace(comp, selectedFace.refPoint)
-                self.logger.debug('Processing Face = {}'.format(face.tempId))
+                    face = self.reValidateFace(comp, selectedFace.refPoint, selectedFace.faceToken)
+                self.logger.debug('Processing Face = {0.tempId}', face)
+                topology = dbUtils.getTopologyIndex(face.body)
               
                 #faceNormal = dbUtils.getFaceNormal(face.nativeObject)
                 if self.fromTop:
-                    self.logger.debug('topFace type {}'.format(type(topFace)))
+                    self.logger.debug('topFace type {}', type(topFace))
                     if not topFace.isValid:
                        self.logger.debug('revalidating topFace') 
-                       topFace = reValidateFace(comp, topFaceRefPoint)
+                       topFace = self.reValidateFace(comp, topFaceRefPoint, topFaceToken)
 
                     topFace = makeNative(topFace)
                        
-                    self.logger.debug('topFace isValid = {}'.format(topFace.isValid))
-                    transformVector = dbUtils.getTranslateVectorBetweenFaces(face, topFace)
-                    self.logger.debug('creating transformVector to topFace = ({},{},{}) length = {}'.format(transformVector.x, transformVector.y, transformVector.z, transformVector.length))
+                    self.logger.debug('topFace isValid = {0.isValid}', topFace)
+                    transformVector = dbUtils.translationBetweenFaces(face, topFace)
+                    self.logger.debug('creating transformVector to topFace = ({},{},{}) length = {}', transformVector.x, transformVector.y, transformVector.z, transformVector.length)
                                 
                 for selectedEdge in selectedFace.selectedEdges.values():
                     
-                    self.logger.debug('Processing edge - {}'.format(selectedEdge.edge.tempId))
+                    self.logger.debug('Processing edge - {0.tempId}', selectedEdge.edge)
 
                     if not selectedEdge.selected:
                         self.logger.debug('  Not selected. Skipping...')
@@ -856,44 +1563,46 @@ class DogboneCommand(object):
 
                     if not face.isValid:
                         self.logger.debug('Revalidating face')
-                        face = reValidateFace(comp, selectedFace.refPoint)
-
-                    if not selectedEdge.edge.isValid:
-                        continue # edges that have been processed already will not be valid any more - at the moment this is easier than removing the 
-    #                    affected edge from self.edges after having been processed
-                    edge = makeNative(selectedEdge.edge)
+                        face = self.reValidateFace(comp, selectedFace.refPoint, selectedFace.faceToken)
+
+                    if selectedEdge.token in processedEdges:
+                        continue  # already has its hole - from another face
+                    dogbone = edgeDogbones.get(selectedEdge.token)
+                    if dogbone is None:
+                        continue  # not planned - an earlier run's hole is being kept
+                    edge = self.reValidateEdge(comp, selectedEdge)
+                    if edge is None:
+                        self.logger.warning('edge {} could not be found after adding holes - skipped', selectedEdge.edgeId)
+                        self.errorCount += 1
+                        continue
                     try:
-                        if not dbUtils.isEdgeAssociatedWithFace(face, edge):
+                        if not dbUtils.isEdgeAssociatedWithFace(face, edge, topology):
                             continue  # skip if edge is not associated with the face currently being processed
                     except:
                         pass
                     
-                    startVertex = adsk.fusion.BRepVertex.cast(dbUtils.getVertexAtFace(face, edge))
-                    extentToEntity = dbUtils.findExtent(face, edge)
+                    startVertex = adsk.fusion.BRepVertex.cast(dbUtils.getVertexAtFace(face, edge, topology))
+                    extentToEntity = dbUtils.findExtent(face, edge, topology)
 
                     extentToEntity = makeNative(extentToEntity)
-                    self.logger.debug('extentToEntity - {}'.format(extentToEntity.isValid))
+                    self.logger.debug('extentToEntity - {0.isValid}', extentToEntity)
                     if not extentToEntity.isValid:
                         self.logger.debug('To face invalid')
 
                     try:
-                        (edge1, edge2) = dbUtils.getCornerEdgesAtFace(face, edge)
+                        (edge1, edge2) = dbUtils.getCornerEdgesAtFace(face, edge, topology)
                     except:
                         self.logger.exception('Failed at findAdjecentFaceEdges')
-                        dbUtils.messageBox('Failed at findAdjecentFaceEdges:\n{}'.format(traceback.format_exc()))
+                        if not self.headless:
+                            dbUtils.messageBox('Failed at findAdjecentFaceEdges:\n{}'.format(traceback.format_exc()))
                     
-                    centrePoint = makeNative(startVertex).geometry.copy()
+                    centrePoint = dbGeom.Point.fromAdsk(makeNative(startVertex).geometry)
                         
-                    selectedEdgeFaces = makeNative(selectedEdge.edge).faces
-                    
-                    dirVect = adsk.core.Vector3D.cast(dbUtils.getFaceNormal(selectedEdgeFaces[0]).copy())
-                    dirVect.add(dbUtils.getFaceNormal(selectedEdgeFaces[1]))
-                    dirVect.normalize()
-                    dirVect.scaleBy(centreDistance)  #ideally radius should be linked to parameters, 
+                    selectedEdgeFaces = edge.faces
  
                     if self.dbType == 'Mortise Dogbone':
-                        direction0 = dbUtils.correctedEdgeVector(edge1,startVertex) 
-                        direction1 = dbUtils.correctedEdgeVector(edge2,startVertex)
+                        direction0 = dbUtils.edgeVector(edge1,startVertex) 
+                        direction1 = dbUtils.edgeVector(edge2,startVertex)
                         
                         if self.longside:
                             if (edge1.length > edge2.length):
@@ -914,20 +1623,19 @@ class DogboneCommand(object):
                                 edge1OffsetByStr = adsk.core.ValueInput.createByReal(0)
                                 edge2OffsetByStr = offsetByStr
                     else:
-                        dirVect = adsk.core.Vector3D.cast(dbUtils.getFaceNormal(makeNative(selectedEdgeFaces[0])).copy())
-                        dirVect.add(dbUtils.getFaceNormal(makeNative(selectedEdgeFaces[1])))
+                        dirVect = dbUtils.getFaceNormalVector(makeNative(selectedEdgeFaces[0])).add(dbUtils.getFaceNormalVector(makeNative(selectedEdgeFaces[1])))
                         edge1OffsetByStr = offsetByStr
                         edge2OffsetByStr = offsetByStr
 
-                    centrePoint.translateBy(dirVect)
-                    self.logger.debug('centrePoint = ({},{},{})'.format(centrePoint.x, centrePoint.y, centrePoint.z))
+                    centrePoint = centrePoint.translatedBy(dirVect)
+                    self.logger.debug('centrePoint = ({},{},{})', centrePoint.x, centrePoint.y, centrePoint.z)
 
                     if self.fromTop:
-                        centrePoint.translateBy(transformVector)
-                        self.logger.debug('centrePoint at topFace = {}'.format(centrePoint.asArray()))
+                        centrePoint = centrePoint.translatedBy(transformVector)
+                        self.logger.debug('centrePoint at topFace = {}', centrePoint)
                         holePlane = topFace if self.fromTop else face
                         if not holePlane.isValid:
-                            holePlane = reValidateFace(comp, topFaceRefPoint)
+                            holePlane = self.reValidateFace(comp, topFaceRefPoint, topFaceToken)
                     else:
                         holePlane = makeNative(face)
                          
@@ -939,192 +1647,633 @@ class DogboneCommand(object):
 #                    holeInput.participantBodies = [face.nativeObject.body if occ else face.body]  #Restore this once AD fixes occurrence bugs
                     holeInput.participantBodies = [makeNative(face.body)]
                     
-                    self.logger.debug('extentToEntity before setPositionByPlaneAndOffsets - {}'.format(extentToEntity.isValid))
-                    holeInput.setPositionByPlaneAndOffsets(holePlane, centrePoint, edge1, edge1OffsetByStr, edge2, edge2OffsetByStr)
-                    self.logger.debug('extentToEntity after setPositionByPlaneAndOffsets - {}'.format(extentToEntity.isValid))
+                    self.logger.debug('extentToEntity before setPositionByPlaneAndOffsets - {0.isValid}', extentToEntity)
+                    holeInput.setPositionByPlaneAndOffsets(holePlane, adsk.core.Point3D.create(*centrePoint), edge1, edge1OffsetByStr, edge2, edge2OffsetByStr)
+                    self.logger.debug('extentToEntity after setPositionByPlaneAndOffsets - {0.isValid}', extentToEntity)
                     holeInput.setOneSideToExtent(extentToEntity, False)
-                    self.logger.info('hole added to list - {}'.format(centrePoint.asArray()))
+                    self.logger.info('hole added to list - {}', centrePoint)
  
-                    holes.add(holeInput)
+                    with self.timer.phase('hole features'):
+                        holeFeature = holes.add(holeInput)
+                    self.tagFeature(holeFeature, self.tags.newUnit(), [dogbone])
+                    processedEdges.add(selectedEdge.token)
+                    self.timer.count('features created')
+                    self.timer.count('holes')
                     
             endTlMarker = self.design.timeline.markerPosition-1
             if endTlMarker - startTlMarker >0:
-                timelineGroup = self.design.timeline.timelineGroups.add(startTlMarker,endTlMarker)
+                with self.timer.phase('timeline grouping'):
+                    timelineGroup = self.design.timeline.timelineGroups.add(startTlMarker,endTlMarker)
                 timelineGroup.name = 'dogbone'
+                self.tags.tagGroup(timelineGroup)
 #            self.logger.debug('doEvents - allowing display to refresh')
 #            adsk.doEvents()
             
-        if self.errorCount >0:
+        if self.errorCount >0 and not self.headless:
             dbUtils.messageBox('Reported errors:{}\nYou may not need to do anything, \nbut check holes have been created'.format(self.errorCount))
 
-    def createStaticDogbones(self):
-        self.logger.info('Creating static dogbones')
+    @profiled
+    def createGroupedParametricDogbones(self, plan = None):
+        '''
+        Parametric dogbones with one hole feature per hole plane and extent, rather than one per edge.
+        Each dogbone centre is a sketch point dimensioned (dbHoleOffset) to the projected corner edges, so the holes
+        still follow geometry changes and dbHoleOffset. Dogbones on coplanar target planes share a sketch,
+        and dogbones dropping to the same parallel face (findExtentFace) share a hole.
+        '''
+        self.logger.info('Creating grouped parametric dogbones')
         self.errorCount = 0
         if not self.design:
             raise RuntimeError('No active Fusion design')
-        holeInput = adsk.fusion.HoleFeatureInput.cast(None)
-        centreDistance = self.radius*(1+self.minimalPercent/100 if self.dbType == 'Minimal Dogbone' else  1)
+        if plan is None:
+            plan = self.planDogbones()
         
-        for occurrenceFace in self.selectedOccurrences.values():
+        for (occurrenceName, dogbones) in dbPlanner.groupByOccurrence(plan):
             startTlMarker = self.design.timeline.markerPosition
-            
-            if occurrenceFace[0].face.assemblyContext:
-                comp = occurrenceFace[0].face.assemblyContext.component
-                occ = occurrenceFace[0].face.assemblyContext
-                self.logger.info('processing component  = {}'.format(comp.name))
-                self.logger.info('processing occurrence  = {}'.format(occ.name))
-                #entityName = occ.name.split(':')[-1]
-            else:
-               comp = self.rootComp
-               occ = None
-               self.logger.info('processing Rootcomponent')
-               
-            
-            if self.fromTop:
-                (topFace, topFaceRefPoint) = dbUtils.getTopFace(makeNative(occurrenceFace[0].face))
-                self.logger.debug('topFace ref point: {}'.format(topFaceRefPoint.asArray()))
-                self.logger.info('Processing holes from top face - {}'.format(topFace.tempId))
-                self.debugFace(topFace)
-                
-                    
-                sketch = adsk.fusion.Sketch.cast(comp.sketches.add(topFace))  #used for fault finding
+            comp = adsk.fusion.Component.cast(dogbones[0].corner.refs.component)
+            self.logger.debug('processing occurrence  = {}', occurrenceName)
+
+            # the holes of each plane invalidate the faces and edges of the bodies they cut (and those of other occurrences
+            # of the component) - the refs are made current before they're used
+            holesAdded = False
+            for planeDogbones in dbUtils.groupCoplanarFaces(self.currentDogbones(dogbones), self.depthTolerance, key = lambda dogbone: dogbone.plane):
+                if holesAdded:
+                    planeDogbones = self.currentDogbones(planeDogbones)
+                    if not planeDogbones:
+                        continue
+                with self.timer.phase('sketch creation'):
+                    sketch = adsk.fusion.Sketch.cast(comp.sketches.add(planeDogbones[0].plane))
                 sketch.name = 'dogbone'
                 sketch.isComputeDeferred = True
-                self.logger.debug('Added topFace sketch - {}'.format(sketch.name))
+                sketchId = self.tags.tagSketch(sketch)
+                projectedEdges = {}  # edge tempId: projected sketch line - adjacent corners share face edges
+                extentGroups = {}  # extent entity tempId: [extent entity, its token, [sketch point, ...], {body token: body}, [dogbone, ...]]
+
+                for dogbone in planeDogbones:
+                    refs = dogbone.corner.refs
+                    self.logger.debug('Processing edge - {0.tempId}', refs.edge)
+                    if not refs.cornerEdges:
+                        self.errorCount += 1
+                        continue
+                    try:
+                        extentToEntity = makeNative(dbUtils.findExtentFace(refs.face, refs.edge, dbUtils.getTopologyIndex(refs.body)))
+                    except:
+                        self.logger.exception('Failed at findExtentFace')
+                        self.errorCount += 1
+                        continue
 
-            for selectedFace in occurrenceFace:
-                if len(selectedFace.selectedEdges.values()) <1:
-                    self.logger.debug('Face has no edges')
-                    continue 
-                face = makeNative(selectedFace.face)
+                    centrePoint = sketch.modelToSketchSpace(adsk.core.Point3D.create(*dogbone.centre))
+                    with self.timer.phase('sketch points'):
+                        sketchPoint = sketch.sketchPoints.add(centrePoint)
 
-                if not face.isValid:
-                    self.logger.debug('Revalidating face')
-                    face = reValidateFace(comp, selectedFace.refPoint)
-                    self.logger.info('Processing Face = {}'.format(face.tempId))
-                    self.debugFace(face)
+                    for (index, offsetEdge) in enumerate(refs.cornerEdges):
+                        line = projectedEdges.get(offsetEdge.tempId)
+                        if line is None:
+                            line = projectedEdges[offsetEdge.tempId] = sketch.project(offsetEdge).item(0)
+                        if index == dogbone.onEdge:
+                            sketch.geometricConstraints.addCoincident(sketchPoint, line)  # Mortise dogbones sit on one of the corner edges
+                            continue
+                        dimension = sketch.sketchDimensions.addDistanceDimension(sketchPoint, line, 
+                                                                                 adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, 
+                                                                                 centrePoint)
+                        dimension.parameter.expression = 'dbHoleOffset'
+
+                    extentGroup = extentGroups.get(extentToEntity.tempId)
+                    if extentGroup is None:
+                        extentGroup = extentGroups[extentToEntity.tempId] = [extentToEntity, dbUtils.entityResolver.track(extentToEntity), [], {}, []]
+                    extentGroup[2].append(sketchPoint)
+                    extentGroup[3].setdefault(refs.tokens.body, dogbone.body)
+                    extentGroup[4].append(dogbone)
+                    if self.logger.isEnabledFor(logging.INFO):
+                        self.logger.info('hole added to list - {}', centrePoint.asArray())
+                sketch.isComputeDeferred = False
+
+                for (extentToEntity, extentToken, sketchPoints, participantBodies, extentDogbones) in extentGroups.values():
+                    current = {}  # the holes of the last extent invalidated the extent faces and bodies of the rest
+                    extentToEntity = self.currentEntity(comp, extentToEntity, extentToken, current)
+                    bodies = [self.currentEntity(comp, body, token, current, entityType = adsk.fusion.BRepEntityTypes.BRepBodyEntityType)
+                              for (token, body) in participantBodies.items()]
+                    if extentToEntity is None or not all(bodies):
+                        self.logger.error('the extent face or bodies of {} holes could not be found - skipped', len(sketchPoints))
+                        self.errorCount += 1
+                        continue
+                    pointCollection = adsk.core.ObjectCollection.create()  #needed for the setPositionBySketchpoints
+                    for sketchPoint in sketchPoints:
+                        pointCollection.add(sketchPoint)
 
-                self.logger.info('processing face - {}'.format(face.tempId))
-                self.debugFace(face)
-                holeList = []                
+                    holes =  comp.features.holeFeatures
+                    holeInput = holes.createSimpleInput(adsk.core.ValueInput.createByString('dbRadius*2'))
+                    holeInput.isDefaultDirection = True
+                    holeInput.tipAngle = adsk.core.ValueInput.createByString('180 deg')
+                    holeInput.participantBodies = [makeNative(body) for body in bodies]
+                    holeInput.setPositionBySketchPoints(pointCollection)
+                    holeInput.setOneSideToExtent(extentToEntity, False)
+                    try:
+                        with self.timer.phase('hole features'):
+                            holeFeature = holes.add(holeInput)
+                    except:
+                        self.errorCount += 1
+                        self.logger.exception('Failed to add {} holes', len(sketchPoints))
+                        continue
+                    holesAdded = True
+                    self.tagFeature(holeFeature, self.tags.newUnit(), extentDogbones, sketchId)
+                    self.timer.count('features created')
+                    self.timer.count('holes', len(sketchPoints))
+                    self.logger.info('{} Holes added', len(sketchPoints))
 
-                comp = adsk.fusion.Component.cast(comp)
-                
+            endTlMarker = self.design.timeline.markerPosition-1
+            if endTlMarker - startTlMarker >0:
+                with self.timer.phase('timeline grouping'):
+                    timelineGroup = self.design.timeline.timelineGroups.add(startTlMarker,endTlMarker)
+                timelineGroup.name = 'dogbone'
+                self.tags.tagGroup(timelineGroup)
 
-                if self.fromTop:
-                    self.logger.debug('topFace type {}'.format(type(topFace)))
-                    if not topFace.isValid:
-                       self.logger.debug('revalidating topFace') 
-                       topFace = reValidateFace(comp, topFaceRefPoint)
-                       topFaceRefPoint = topFace.pointOnFace
-                       self.debugFace(topFace)
-                    self.logger.debug('topFace isValid = {}'.format(topFace.isValid))
-                    transformVector = dbUtils.getTranslateVectorBetweenFaces(face, topFace)
-                    self.logger.debug('creating transformVector to topFace = {} length = {}'.format(transformVector.asArray(), transformVector.length))
-                else:    
-                    sketch = adsk.fusion.Sketch.cast(comp.sketches.add(face))
-                    sketch.name = 'dogbone'
-                    sketch.isComputeDeferred = True
-                    self.logger.debug('creating face plane sketch - {}'.format(sketch.name))
-                
-                for selectedEdge in selectedFace.selectedEdges.values():
-                    
-                    self.logger.debug('Processing edge - {}'.format(selectedEdge.edge.tempId))
+        if self.errorCount >0 and not self.headless:
+            dbUtils.messageBox('Reported errors:{}\nYou may not need to do anything, \nbut check holes have been created'.format(self.errorCount))
 
-                    if not selectedEdge.selected:
-                        self.logger.debug('  Not selected. Skipping...')
-                        continue
+    #==============================================================================
+    #  planning - reads the selection model, but never changes the design.
+    #  The engines below (createStaticDogbones, createToolBodyDogbones, createGroupedParametricDogbones) only execute the plan
+    #==============================================================================
+    def staticFaceList(self, occurrenceFace, comp):
+        '''
+        returns [(selectedFace, native face), ...] for the faces of an occurrence that have dogbone edges -
+        faces are revalidated if they're no longer valid
+        '''
+        faceList = []
+        for selectedFace in occurrenceFace:
+            if len(selectedFace.selectedEdges.values()) <1:
+                self.logger.debug('Face has no edges')
+                continue 
+            face = makeNative(selectedFace.face)
+
+            if not face.isValid:
+                self.logger.debug('Revalidating face')
+                face = self.reValidateFace(comp, selectedFace.refPoint, selectedFace.faceToken)
+            faceList.append((selectedFace, face))
+        return faceList
+
+    def collectCorners(self):
+        '''
+        returns a dbPlanner.Corner for every selected dogbone edge, in selection order
+        '''
+        corners = []
+        for (occurrenceName, occurrenceFace) in self.selectedOccurrences.items():
+            if occurrenceFace[0].face.assemblyContext:
+                comp = occurrenceFace[0].face.assemblyContext.component
+                self.logger.info('collecting component  = {0.name}', comp)
+            else:
+               comp = self.rootComp
+               self.logger.info('collecting Rootcomponent')
+
+            faceList = self.staticFaceList(occurrenceFace, comp)
+            topFace = None
+            if self.fromTop and faceList:
+                with self.timer.phase('top face search'):
+                    (topFace, topFaceRefPoint) = dbUtils.getTopFace(makeNative(occurrenceFace[0].face))
+                topFace = makeNative(topFace)
+                self.logger.info('Processing holes from top face - {0.tempId}', topFace)
+                self.debugFace(topFace)
 
-                    if not face.isValid:
-                        self.logger.debug('Revalidating face')
-                        face = reValidateFace(comp, selectedFace.refPoint)
-                        
-                    if not selectedEdge.edge.isValid:
-                        continue # edges that have been processed already will not be valid any more - at the moment this is easier than removing the 
-    #                    affected edge from self.edges after having been processed
-                    try:
-                        if not dbUtils.isEdgeAssociatedWithFace(face, makeNative(selectedEdge.edge)):
-                            continue  # skip if edge is not associated with the face currently being processed
-                    except:
-                        pass
+            for (selectedFace, face) in faceList:
+                corners.extend(self.faceCorners(occurrenceName, comp, selectedFace, face, topFace))
+        return corners
+
+    def faceCorners(self, occurrenceName, comp, selectedFace, face, topFace = None, dbType = None, countErrors = True):
+        '''
+        generator of a dbPlanner.Corner for each selected dogbone edge of selectedFace
+        face - normally the native face, so that corners are in component space. If it's a proxy (assembly context),
+        corners are in world space - as the selection overlay needs.
+        dbType - the dogbone type the corners are for (self.dbType if None) - Mortise dogbones skip corners without corner edges.
+        countErrors - False for the overlay: skipped corners are only logged, errorCount is the engines'
+        The corner geometry of each edge is kept in cornerEdgeCache, until the body changes
+        '''
+        inContext = (lambda x: x) if face.assemblyContext else makeNative
+        dbType = dbType or self.dbType
+        self.logger.debug('processing face - {0.tempId}', face)
+        self.debugFace(face)
+        topology = dbUtils.getTopologyIndex(face.body)
+        planeNormal = dbUtils.getFaceNormalVector(face)
+        edgeCorners = self.cornerEdgeCache.faceMemo(face)
+        topShift = None
+        if topFace:
+            topShift = dbUtils.translationBetweenFaces(face, topFace)
+            self.logger.debug('creating transformVector to topFace = {} length = {}', topShift, topShift.length)
+        plane = makeNative(topFace if topFace else face)
+        (faceToken, bodyToken, planeToken, planePoint) = (makeNative(face).entityToken, makeNative(face.body).entityToken,
+                                                          plane.entityToken, plane.pointOnFace.asArray())
+        
+        for selectedEdge in selectedFace.selectedEdges.values():
+            
+            self.logger.debug('Processing edge - {0.tempId}', selectedEdge.edge)
 
-                    edge = makeNative(selectedEdge.edge)                    
-                    startVertex = adsk.fusion.BRepVertex.cast(dbUtils.getVertexAtFace(face, edge))
-                    centrePoint = startVertex.geometry.copy()
-                        
-                    selectedEdgeFaces = edge.faces
-                    
-                    if self.dbType == 'Mortise Dogbone':
-                        (edge0, edge1) = dbUtils.getCornerEdgesAtFace(face, edge)
-                        direction0 = dbUtils.correctedEdgeVector(edge0,startVertex) 
-                        direction1 = dbUtils.correctedEdgeVector(edge1,startVertex) 
-                        if self.longside:
-                            if (edge0.length > edge1.length):
-                                dirVect = direction0
-                            else:
-                                dirVect = direction1
-                        else:
-                            if (edge0.length > edge1.length):
-                                dirVect = direction1
-                            else:
-                                dirVect = direction0
-                    else:
-                        dirVect = adsk.core.Vector3D.cast(dbUtils.getFaceNormal(makeNative(selectedEdgeFaces[0])).copy())
-                        dirVect.add(dbUtils.getFaceNormal(makeNative(selectedEdgeFaces[1])))
-                    dirVect.normalize()
-                    dirVect.scaleBy(centreDistance)  #ideally radius should be linked to parameters, 
-                                                          # but hole start point still is the right quadrant
-                    centrePoint.translateBy(dirVect)
-                    if self.fromTop:
-                        centrePoint.translateBy(transformVector)
+            if not selectedEdge.selected:
+                self.logger.debug('  Not selected. Skipping...')
+                continue
 
-                    centrePoint = sketch.modelToSketchSpace(centrePoint)
-                    
-                    sketchPoint = sketch.sketchPoints.add(centrePoint)  #as the centre is placed on midline endPoint, it automatically gets constrained
-                    length = (selectedEdge.edge.length + transformVector.length) if self.fromTop else makeNative(selectedEdge.edge).length
-                    holeList.append([length, sketchPoint])
-                    self.logger.info('hole added to list - length {}, {}'.format(length, sketchPoint.geometry.asArray()))
-                    
-                depthList = set(map(lambda x: x[0], holeList))  #create a unique set of depths - using this in the filter will automatically group depths
+            edge = selectedEdge.edge
+            if not edge.isValid:
+                edge = self.reValidateEdge(comp, selectedEdge)  # by the token taken the last time its corner was collected
+                if edge is None:
+                    self.logger.warning('edge {} is no longer valid, and could not be found again - skipped', selectedEdge.edgeId)
+                    continue
+                if face.assemblyContext:
+                    edge = edge.createForAssemblyContext(face.assemblyContext)
+            edge = inContext(edge)
+            edgeCorner = edgeCorners.get(edge.tempId)
+            if edgeCorner is None:
+                edgeCorner = edgeCorners[edge.tempId] = self.edgeCorner(face, edge, topology)
+            if not edgeCorner:
+                continue  # edge is not associated with the face currently being processed
+            (vertex, faceNormals, cornerEdgeRefs, cornerEdges, edgeLength, edgeToken, cornerEdgeTokens) = edgeCorner
+            selectedEdge.token = edgeToken
+            if cornerEdges is None and dbType == 'Mortise Dogbone':
+                if countErrors:
+                    self.logger.error('no corner edges at edge {} - Mortise dogbone skipped', selectedEdge.edgeId)
+                    self.errorCount += 1
+                else:
+                    self.logger.debug('no corner edges at edge {} - Mortise dogbone skipped', selectedEdge.edgeId)
+                continue
+
+            yield dbPlanner.Corner(occurrenceName,
+                                   vertex,
+                                   faceNormals,
+                                   cornerEdges,
+                                   edgeLength,
+                                   planeNormal,
+                                   topShift,
+                                   dbPlanner.CornerRefs(comp, face, edge, cornerEdgeRefs, face.body, topFace if topFace else face,
+                                                        dbPlanner.RefTokens(faceToken, edgeToken, cornerEdgeTokens, bodyToken, planeToken, planePoint)))
+
+    def edgeCorner(self, face, edge, topology):
+        '''
+        returns the corner geometry of a dogbone edge, at face: (vertex, faceNormals, cornerEdgeRefs, cornerEdges, edgeLength)
+        as dbPlanner.Corner, then the entity tokens of edge and cornerEdgeRefs (see dbPlanner.RefTokens) -
+        cornerEdgeRefs, cornerEdges and their tokens are None if they can't be found. False if edge isn't one of face's
+        '''
+        inContext = (lambda x: x) if face.assemblyContext else makeNative
+        try:
+            if not dbUtils.isEdgeAssociatedWithFace(face, edge, topology):
+                return False
+        except:
+            pass
 
-                for depth in depthList:
-                    self.logger.debug('processing holes at depth {}'.format(depth))
+        startVertex = adsk.fusion.BRepVertex.cast(dbUtils.getVertexAtFace(face, edge, topology))
+        selectedEdgeFaces = edge.faces
+        try:
+            (edge0, edge1) = dbUtils.getCornerEdgesAtFace(face, edge, topology)
+            cornerEdgeRefs = (edge0, edge1)
+            cornerEdges = tuple((dbUtils.edgeVector(cornerEdge, startVertex), cornerEdge.length) for cornerEdge in cornerEdgeRefs)
+        except:
+            self.logger.debug('no corner edges found at edge {0.tempId}', edge)
+            (cornerEdgeRefs, cornerEdges) = (None, None)  # only Mortise dogbones need the corner edges to place the centre
+        return (dbGeom.Point.fromAdsk(startVertex.geometry),
+                (dbUtils.getFaceNormalVector(inContext(selectedEdgeFaces[0])), dbUtils.getFaceNormalVector(inContext(selectedEdgeFaces[1]))),
+                cornerEdgeRefs,
+                cornerEdges,
+                edge.length,
+                makeNative(edge).entityToken,
+                tuple(makeNative(cornerEdge).entityToken for cornerEdge in cornerEdgeRefs) if cornerEdgeRefs else None)
+
+    def planDogbones(self, useCache = False):
+        '''
+        returns the plan (a tuple of dbPlanner.Dogbone) for the current selection and settings
+        useCache - reuse the corners from the last call, unless the selection (see onChange) or the depth mode has changed since -
+        only the (pure) planning is then redone, which is all that changing tool diameter, offset or dogbone type needs
+        '''
+        cornersKey = (self.fromTop, self.dbType == 'Mortise Dogbone')  # Mortise dogbones skip corners without corner edges
+        if (not useCache or self.corners is None or cornersKey != self.cornersKey 
+                or not all(corner.refs.edge.isValid for corner in self.corners)):  # in case rolling back a preview didn't keep the references
+            self.corners = self.collectCorners()
+            self.cornersKey = cornersKey
+        settings = dbPlanner.DogboneSettings(self.dbType, self.radius, self.minimalPercent, self.longside)
+        return dbPlanner.planDogbones(self.corners, settings)
+
+    @profiled
+    def createStaticDogbones(self, plan = None):
+        self.logger.info('Creating static dogbones')
+        self.errorCount = 0
+        if not self.design:
+            raise RuntimeError('No active Fusion design')
+        holeInput = adsk.fusion.HoleFeatureInput.cast(None)
+        if plan is None:
+            plan = self.planDogbones()
+        
+        for (occurrenceName, dogbones) in dbPlanner.groupByOccurrence(plan):
+            startTlMarker = self.design.timeline.markerPosition
+            comp = adsk.fusion.Component.cast(dogbones[0].corner.refs.component)
+            self.logger.info('processing occurrence  = {}', occurrenceName)
+
+            #  Holes get bucketed by depth (within depthTolerance) across all dogbones sharing a sketch plane,
+            #  and each bucket becomes a single multi-point hole feature.
+            #  Every plane of the occurrence is sketched before the first hole is added - a hole feature invalidates the faces
+            #  of the bodies it cuts, and the sketches are made on those faces. The refs are made current first, as the holes of
+            #  other occurrences of the component have invalidated them too, and the bodies are made current for each hole.
+            sketchedHoles = []  # (sketchId, [(depth, sketchPoint, dogbone), ...]) per sketch plane
+            for planeDogbones in dbUtils.groupCoplanarFaces(self.currentDogbones(dogbones), self.depthTolerance, key = lambda dogbone: dogbone.plane):
+                with self.timer.phase('sketch creation'):
+                    sketch = adsk.fusion.Sketch.cast(comp.sketches.add(planeDogbones[0].plane))
+                sketch.name = 'dogbone'
+                sketch.isComputeDeferred = True
+                self.logger.debug('creating sketch - {0.name} for {1} dogbones', sketch, len(planeDogbones))
+                sketchId = self.tags.tagSketch(sketch)
+                holeList = []                
+
+                for dogbone in planeDogbones:
+                    centrePoint = sketch.modelToSketchSpace(adsk.core.Point3D.create(*dogbone.centre))
+                    with self.timer.phase('sketch points'):
+                        sketchPoint = sketch.sketchPoints.add(centrePoint)  #as the centre is placed on midline endPoint, it automatically gets constrained
+                    holeList.append((dogbone.depth, sketchPoint, dogbone))
+                    if self.logger.isEnabledFor(logging.INFO):
+                        self.logger.info('hole added to list - length {}, {}', dogbone.depth, sketchPoint.geometry.asArray())
+                sketch.isComputeDeferred = False
+                sketchedHoles.append((sketchId, holeList))
+
+            for (sketchId, holeList) in sketchedHoles:
+                for (depth, holeBucket) in dbUtils.bucketByTolerance(holeList, lambda hole: hole[0], self.depthTolerance):
+                    self.logger.debug('processing {} holes at depth {}', len(holeBucket), depth)
                     pointCollection = adsk.core.ObjectCollection.create()  #needed for the setPositionBySketchpoints
-                    holeCount = 0
-                    for hole in filter(lambda h: h[0] == depth, holeList):
-                        pointCollection.add(hole[1])
-                        holeCount+=1
-                    
-                    if not face.isValid:
-                        self.logger.debug('Revalidating face')
-                        face = reValidateFace(comp, selectedFace.refPoint)
+                    participantBodies = {}  # body token: body
+                    for (length, sketchPoint, dogbone) in holeBucket:
+                        pointCollection.add(sketchPoint)
+                        participantBodies.setdefault(dogbone.corner.refs.tokens.body, dogbone.body)
+                    current = {}
+                    bodies = [self.currentEntity(comp, body, token, current, entityType = adsk.fusion.BRepEntityTypes.BRepBodyEntityType)
+                              for (token, body) in participantBodies.items()]
+                    if not all(bodies):
+                        self.logger.error('the bodies of {} holes could not be found - skipped', len(holeBucket))
+                        self.errorCount += 1
+                        continue
 
                     holes =  comp.features.holeFeatures
                     holeInput = holes.createSimpleInput(adsk.core.ValueInput.createByReal(self.radius*2))
                     holeInput.isDefaultDirection = True
                     holeInput.tipAngle = adsk.core.ValueInput.createByString('180 deg')
-                    holeInput.participantBodies = [face.body]
+                    holeInput.participantBodies = bodies
                     holeInput.setPositionBySketchPoints(pointCollection)
                     holeInput.setDistanceExtent(adsk.core.ValueInput.createByReal(depth))
 
-                    holes.add(holeInput)
-                    self.logger.info('{} Holes added'.format(holeCount))
-            sketch.isComputeDeferred = False
+                    with self.timer.phase('hole features'):
+                        holeFeature = holes.add(holeInput)
+                    self.tagFeature(holeFeature, self.tags.newUnit(), [hole[2] for hole in holeBucket], sketchId)
+                    self.timer.count('features created')
+                    self.timer.count('holes', len(holeBucket))
+                    self.logger.info('{} Holes added', len(holeBucket))
                     
             endTlMarker = self.design.timeline.markerPosition-1
             if endTlMarker - startTlMarker >0:
-                timelineGroup = self.design.timeline.timelineGroups.add(startTlMarker,endTlMarker)
+                with self.timer.phase('timeline grouping'):
+                    timelineGroup = self.design.timeline.timelineGroups.add(startTlMarker,endTlMarker)
                 timelineGroup.name = 'dogbone'
+                self.tags.tagGroup(timelineGroup)
 #            self.logger.debug('doEvents - allowing fusion to refresh')
 #            adsk.doEvents()
             
-        if self.errorCount >0:
+        if self.errorCount >0 and not self.headless:
             dbUtils.messageBox('Reported errors:{}\nYou may not need to do anything, \nbut check holes have been created'.format(self.errorCount))
 
+    @profiled
+    def createToolBodyDogbones(self, plan = None, preview = False):
+        '''
+        Static dogbones without sketches or hole features - every dogbone cylinder is built as a temporary body
+        and unioned in memory, then each occurrence gets one base feature holding a tool body per target body,
+        and one combine cut per target body.
+        Also used by onPreview (preview = True, errors are only logged) - whatever the mode, it's the quickest way to show the dogbones
+        '''
+        self.logger.info('Creating tool body dogbones')
+        self.errorCount = 0
+        if not self.design:
+            raise RuntimeError('No active Fusion design')
+        tempBRep = adsk.fusion.TemporaryBRepManager.get()
+        parametricDesign = self.design.designType == adsk.fusion.DesignTypes.ParametricDesignType
+        if plan is None:
+            plan = self.planDogbones()
+
+        for (occurrenceName, dogbones) in dbPlanner.groupByOccurrence(plan):
+            comp = adsk.fusion.Component.cast(dogbones[0].corner.refs.component)
+            self.logger.info('processing occurrence  = {}', occurrenceName)
+
+            toolBodies = {}  # target body entityToken: [target body, unioned temporary tool body, [dogbone, ...]]
+            for dogbone in dogbones:
+                centrePoint = adsk.core.Point3D.create(*dogbone.centre)
+                endPoint = adsk.core.Point3D.create(*dbGeom.Point(*dogbone.centre).translatedBy(dbGeom.Vector(*dogbone.axis).scaledBy(dogbone.depth)))
+                with self.timer.phase('tool bodies'):
+                    cylinder = tempBRep.createCylinderOrCone(centrePoint, dogbone.radius, endPoint, dogbone.radius)
+                    toolBody = toolBodies.get(dogbone.body.entityToken)
+                    if toolBody is None:
+                        toolBodies[dogbone.body.entityToken] = [dogbone.body, cylinder, [dogbone]]
+                    else:
+                        tempBRep.booleanOperation(toolBody[1], cylinder, adsk.fusion.BooleanTypes.UnionBooleanType)
+                        toolBody[2].append(dogbone)
+                self.logger.info('dogbone added to tool body - depth {}, {}', dogbone.depth, dogbone.centre)
+
+            startTlMarker = self.design.timeline.markerPosition if parametricDesign else 0
+            unitId = self.tags.newUnit()  # the base feature and its cuts are only removed together
+            baseFeature = None
+            if parametricDesign:
+                baseFeature = comp.features.baseFeatures.add()  # bodies can only be added to a parametric design within a base feature
+                baseFeature.startEdit()
+                self.timer.count('features created')
+                self.tagFeature(baseFeature, unitId, [])
+            cuts = []
+            for (targetBody, toolBody, bodyDogbones) in toolBodies.values():
+                cuts.append((targetBody, comp.bRepBodies.add(toolBody, baseFeature) if baseFeature else comp.bRepBodies.add(toolBody), bodyDogbones))
+            if baseFeature:
+                baseFeature.finishEdit()
+
+            for (targetBody, toolBody, bodyDogbones) in cuts:
+                toolCollection = adsk.core.ObjectCollection.create()
+                toolCollection.add(toolBody)
+                combineInput = comp.features.combineFeatures.createInput(targetBody, toolCollection)
+                combineInput.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
+                combineInput.isKeepToolBodies = False
+                try:
+                    with self.timer.phase('combine features'):
+                        combineFeature = comp.features.combineFeatures.add(combineInput)
+                except:
+                    self.errorCount += 1
+                    self.logger.exception('Failed to cut tool body from {0.name}', targetBody)
+                    continue
+                self.tagFeature(combineFeature, unitId, bodyDogbones)
+                self.timer.count('features created')
+                self.logger.info('tool body cut from {0.name}', targetBody)
+
+            if parametricDesign:
+                endTlMarker = self.design.timeline.markerPosition-1
+                if endTlMarker - startTlMarker >0:
+                    with self.timer.phase('timeline grouping'):
+                        timelineGroup = self.design.timeline.timelineGroups.add(startTlMarker,endTlMarker)
+                    timelineGroup.name = 'dogbone'
+                    self.tags.tagGroup(timelineGroup)
+
+        if self.errorCount >0 and not (preview or self.headless):
+            dbUtils.messageBox('Reported errors:{}\nYou may not need to do anything, \nbut check dogbones have been cut'.format(self.errorCount))
+
+
+class DogboneBatch:
+    '''
+    Dogbones without the dialog - a queue of jobs, one per body. Each job selects the body's faces (given, or found with
+    dbUtils.findDogboneFaces), then plans and creates the dogbones with the usual DogboneCommand engines.
+    settings - any of the fields parseInputs fills (SETTINGS), everything else keeps its saved default (defaults.dat).
+    Lengths are in cm (internal units) - if only circVal or offVal are given, circStr and offStr are made from them
+    '''
+    SETTINGS = ('circVal', 'circStr', 'offVal', 'offStr', 'dbType', 'minimalPercent', 'fromTop', 'parametric', 'groupHoles', 'toolBody', 'longside', 'depthTolerance', 'updateExisting')
+
+    def __init__(self, dog, settings = None):
+        self.dog = dog
+        self.settings = dict(settings) if settings else {}
+        unknown = set(self.settings) - set(self.SETTINGS)
+        if unknown:
+            raise ValueError('Unknown dogbone settings: {}'.format(', '.join(sorted(unknown))))
+        self.jobs = deque()  # (body, faces or None)
+        self.results = []
+
+    def addBody(self, body, faces = None):
+        '''
+        queues a job for body (native or proxy) - faces in the same context, or None to find them
+        '''
+        self.jobs.append((body, faces))
+
+    def addFaces(self, faces):
+        '''
+        queues a job per body for faces, in the order each body is first seen
+        '''
+        jobs = {}
+        for face in faces:
+            key = (face.assemblyContext.name if face.assemblyContext else None, makeNative(face.body).entityToken)
+            if key not in jobs:
+                jobs[key] = (face.body, [])
+                self.jobs.append(jobs[key])
+            jobs[key][1].append(face)
+
+    def addDesign(self, design):
+        '''
+        queues a job for every solid body of design (see dbUtils.designBodies)
+        '''
+        for body in dbUtils.designBodies(design):
+            self.addBody(body)
+
+    def applySettings(self):
+        dog = self.dog
+        dog.readDefaults()
+        for (name, value) in self.settings.items():
+            setattr(dog, name, value)
+        if 'circVal' in self.settings and 'circStr' not in self.settings:
+            dog.circStr = '{} cm'.format(dog.circVal)
+        if 'offVal' in self.settings and 'offStr' not in self.settings:
+            dog.offStr = '{} cm'.format(dog.offVal)
+        dog.savePlan = False  # nobody to answer the file dialog
+        dog.timer = dbUtils.PhaseTimer(enabled = False)  # the summary has the time per job
+
+    def run(self, showProgress = True):
+        '''
+        runs the queued jobs, one body at a time, with a progress dialog that can cancel the jobs still queued.
+        Settings are applied, but never written to defaults.dat. returns the summary
+        '''
+        dog = self.dog
+        dog.initLogger()
+        self.applySettings()
+        dog.logWriter.setLevel(dog.logging)
+        dog.logger.info('batch started - {} jobs, settings = {}', len(self.jobs), self.settings)
+
+        progress = None
+        if showProgress:
+            progress = dog.ui.createProgressDialog()
+            progress.isCancelButtonShown = True
+            progress.show('Dogbone', 'Dogboning body %v of %m', 0, len(self.jobs))
+        dog.headless = True
+        try:
+            while self.jobs:
+                if progress and progress.wasCancelled:
+                    dog.logger.info('batch cancelled - {} jobs not run', len(self.jobs))
+                    break
+                (body, faces) = self.jobs.popleft()
+                self.results.append(self.runJob(body, faces))
+                if progress:
+                    progress.progressValue = len(self.results)
+                    adsk.doEvents()  # lets the dialog repaint, and see the cancel button
+        finally:
+            dog.headless = False
+            if progress:
+                progress.hide()
+            dog.resetSelection()
+            dog.finishProfile()
+
+        summary = self.summary()
+        dog.logger.info('batch complete - {jobs} jobs, {dogbones} dogbones, {errors} errors, {failed} failed, {cancelled} cancelled in {seconds:.02f} sec'.format(
+            **dict(summary, failed = len(summary['failed']))))
+        return summary
+
+    def runJob(self, body, faces = None):
+        '''
+        dogbones one body - returns its result: body and occurrence names, face and dogbone counts, errors, seconds,
+        and failure (the exception, if the job couldn't finish)
+        '''
+        dog = self.dog
+        start = time.time()
+        result = {'body': body.name,
+                  'occurrence': body.assemblyContext.name if body.assemblyContext else None,
+                  'faces': 0,
+                  'dogbones': 0,
+                  'errors': 0,
+                  'failure': None}
+        dog.logger.info('batch job - {} {}', result['occurrence'] or '', result['body'])
+        dog.resetSelection()
+        try:
+            # earlier runs' dogbones on the body are rolled back, so their corners are found again - see DogboneCommand.createDogbones
+            dog.suspendExisting(body)
+            dog.checkTimeline()
+            if faces is None:
+                for (face, edges) in dbUtils.findDogboneFaces(body, dog.loopWalk, headless = dog.headless):
+                    dog.addFace(face, cornerEdges = edges)
+            else:
+                for face in faces:
+                    dog.addFace(face)
+            result['faces'] = len(dog.selectedFaces)
+            result['dogbones'] = len(dog.selectedEdges)
+            if dog.selectedEdges:
+                dog.createDogbones()
+        except:
+            dog.logger.exception('batch job failed - {}', result['body'])
+            result['failure'] = traceback.format_exc().strip().splitlines()[-1]
+        dog.restoreExisting()  # any left - the job failed, or found no dogbones
+        result['errors'] = dog.errorCount
+        result['seconds'] = time.time() - start
+        return result
+
+    def summary(self):
+        return {'jobs': len(self.results),
+                'dogbones': sum(result['dogbones'] for result in self.results),
+                'errors': sum(result['errors'] for result in self.results),
+                'failed': [result['body'] for result in self.results if result['failure']],
+                'cancelled': len(self.jobs),
+                'seconds': sum(result['seconds'] for result in self.results),
+                'results': self.results}
+
 
 dog = DogboneCommand()
 
 
+def batch(design = None, bodies = None, faces = None, showProgress = True, **settings):
+    '''
+    script entry point - dogbones without the dialog (see DogboneBatch).
+    design - the design to work on (made active if it isn't), defaults to the active design
+    bodies, faces - what to dogbone. Faces are used as given, bodies have their faces found -
+    with neither, every solid body in design is done
+    settings - DogboneBatch.SETTINGS, e.g. circVal = 0.635, dbType = 'Minimal Dogbone', parametric = False
+    returns the summary - see DogboneBatch.summary
+    '''
+    if design and design != dog.design:
+        design.parentDocument.activate()  # the engines work on the active design
+    job = DogboneBatch(dog, settings)
+    if faces:
+        job.addFaces(faces)
+    for body in bodies or []:
+        job.addBody(body)
+    if not faces and not bodies:
+        job.addDesign(dog.design)
+    return job.run(showProgress)
+
+
 def run(context):
     try:
         dog.addButton()
@@ -1135,5 +2284,6 @@ def run(context):
 def stop(context):
     try:
         dog.removeButton()
+        dog.logWriter.close()
     except:
         dbUtils.messageBox(traceback.format_exc())
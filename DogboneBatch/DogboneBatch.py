@@ -0,0 +1,47 @@
+#Author-Peter Ludikar, Gary Singer
+#Description-Dogbones every body of the active design, without the dialog.
+
+# Script entry point for the Dogbone add-in's batch mode (DogBone2.batch) - edit SETTINGS, then run it from
+# the Scripts and Add-Ins dialog. Faces are found on every solid body, and a summary is shown when it's done.
+# Lengths are in cm. Any setting left out keeps the value last used in the Dogbone dialog.
+
+import importlib
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import traceback
+
+import adsk.core
+
+SETTINGS = {'circVal': 0.635,
+            'offVal': 0.0,
+            'dbType': 'Normal Dogbone',  # 'Minimal Dogbone', 'Mortise Dogbone'
+            'fromTop': False,
+            'parametric': False,
+            'toolBody': False,
+            'longside': True}
+
+ADDIN_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDIN_PACKAGE = 'dogboneAddin'
+
+
+def loadAddin():
+    # the add-in uses relative imports, so it's loaded as a package from its own folder
+    if ADDIN_PACKAGE not in sys.modules:
+        spec = importlib.machinery.ModuleSpec(ADDIN_PACKAGE, None, is_package=True)
+        package = importlib.util.module_from_spec(spec)
+        package.__path__ = [ADDIN_PATH]
+        sys.modules[ADDIN_PACKAGE] = package
+    return importlib.import_module(ADDIN_PACKAGE + '.DogBone2')
+
+
+def run(context):
+    ui = adsk.core.Application.get().userInterface
+    try:
+        summary = loadAddin().batch(**SETTINGS)
+        ui.messageBox('{} dogbones on {} bodies in {:.02f} sec\nErrors: {}\nFailed: {}\nCancelled: {}'.format(
+            summary['dogbones'], summary['jobs'], summary['seconds'], summary['errors'],
+            ', '.join(summary['failed']) or 'none', summary['cancelled']))
+    except:
+        ui.messageBox(traceback.format_exc())
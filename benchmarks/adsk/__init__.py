@@ -0,0 +1,17 @@
+'''
+Minimal pure-Python stand-in for the parts of the Fusion 360 ``adsk`` API used by the Dogbone add-in.
+
+Only intended for running the add-in logic outside Fusion (benchmarks, smoke checks) - it models
+polyhedral BRep topology, evaluators, selection inputs, hole features and the timeline closely enough
+for the add-in code paths to execute unchanged.
+'''
+
+from . import core, fusion
+
+
+def doEvents():
+    pass
+
+
+def terminate():
+    pass
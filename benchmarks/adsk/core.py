@@ -0,0 +1,846 @@
+'''
+Stand-in for ``adsk.core`` - geometry primitives, collections, value inputs, UI and command inputs.
+'''
+
+import math
+
+TOLERANCE = 1e-9
+
+
+class Base(object):
+    _namespace = 'core'
+
+    @classmethod
+    def cast(cls, obj):
+        return obj
+
+    @classmethod
+    def classType(cls):
+        return 'adsk::{}::{}'.format(cls._namespace, cls.__name__)
+
+    @property
+    def objectType(self):
+        return self.classType()
+
+    @property
+    def isValid(self):
+        return True
+
+
+#==============================================================================
+#  geometry
+#==============================================================================
+class Vector3D(Base):
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Vector3D(x, y, z)
+
+    @property
+    def length(self):
+        return math.sqrt(self.x*self.x + self.y*self.y + self.z*self.z)
+
+    def asArray(self):
+        return (self.x, self.y, self.z)
+
+    def asPoint(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def copy(self):
+        return Vector3D(self.x, self.y, self.z)
+
+    def add(self, v):
+        self.x += v.x; self.y += v.y; self.z += v.z
+        return True
+
+    def subtract(self, v):
+        self.x -= v.x; self.y -= v.y; self.z -= v.z
+        return True
+
+    def scaleBy(self, s):
+        self.x *= s; self.y *= s; self.z *= s
+        return True
+
+    def normalize(self):
+        l = self.length
+        if l < TOLERANCE:
+            return False
+        self.scaleBy(1.0/l)
+        return True
+
+    def dotProduct(self, v):
+        return self.x*v.x + self.y*v.y + self.z*v.z
+
+    def crossProduct(self, v):
+        return Vector3D(self.y*v.z - self.z*v.y, self.z*v.x - self.x*v.z, self.x*v.y - self.y*v.x)
+
+    def angleTo(self, v):
+        l = self.length * v.length
+        if l < TOLERANCE:
+            return 0.0
+        return math.acos(max(-1.0, min(1.0, self.dotProduct(v)/l)))
+
+    def isParallelTo(self, v):
+        l = self.length * v.length
+        if l < TOLERANCE:
+            return False
+        return self.crossProduct(v).length / l < 1e-8
+
+    def isPerpendicularTo(self, v):
+        l = self.length * v.length
+        if l < TOLERANCE:
+            return False
+        return abs(self.dotProduct(v)) / l < 1e-8
+
+    def isEqualTo(self, v):
+        return abs(self.x-v.x) < TOLERANCE and abs(self.y-v.y) < TOLERANCE and abs(self.z-v.z) < TOLERANCE
+
+    def transformBy(self, matrix):
+        self.x, self.y, self.z = matrix._applyVector(self.x, self.y, self.z)
+        return True
+
+    def __repr__(self):
+        return 'Vector3D({:g}, {:g}, {:g})'.format(self.x, self.y, self.z)
+
+
+class Point3D(Base):
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+    def asArray(self):
+        return (self.x, self.y, self.z)
+
+    def asVector(self):
+        return Vector3D(self.x, self.y, self.z)
+
+    def copy(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def vectorTo(self, p):
+        return Vector3D(p.x-self.x, p.y-self.y, p.z-self.z)
+
+    def distanceTo(self, p):
+        return self.vectorTo(p).length
+
+    def translateBy(self, v):
+        self.x += v.x; self.y += v.y; self.z += v.z
+        return True
+
+    def isEqualTo(self, p):
+        return abs(self.x-p.x) < TOLERANCE and abs(self.y-p.y) < TOLERANCE and abs(self.z-p.z) < TOLERANCE
+
+    def isEqualToByTolerance(self, p, tolerance):
+        return self.distanceTo(p) <= tolerance
+
+    def transformBy(self, matrix):
+        self.x, self.y, self.z = matrix._applyPoint(self.x, self.y, self.z)
+        return True
+
+    def __repr__(self):
+        return 'Point3D({:g}, {:g}, {:g})'.format(self.x, self.y, self.z)
+
+
+class Matrix3D(Base):
+    def __init__(self):
+        self._rows = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+
+    @staticmethod
+    def create():
+        return Matrix3D()
+
+    @property
+    def translation(self):
+        return Vector3D(self._rows[0][3], self._rows[1][3], self._rows[2][3])
+
+    @translation.setter
+    def translation(self, v):
+        self._rows[0][3], self._rows[1][3], self._rows[2][3] = v.x, v.y, v.z
+
+    def copy(self):
+        m = Matrix3D()
+        m._rows = [list(r) for r in self._rows]
+        return m
+
+    def invert(self):
+        # rigid transforms only
+        r = self._rows
+        rot = [[r[j][i] for j in range(3)] for i in range(3)]
+        t = [-sum(rot[i][j]*r[j][3] for j in range(3)) for i in range(3)]
+        self._rows = [rot[0]+[t[0]], rot[1]+[t[1]], rot[2]+[t[2]], [0.0, 0.0, 0.0, 1.0]]
+        return True
+
+    def _applyVector(self, x, y, z):
+        r = self._rows
+        return (r[0][0]*x + r[0][1]*y + r[0][2]*z, r[1][0]*x + r[1][1]*y + r[1][2]*z, r[2][0]*x + r[2][1]*y + r[2][2]*z)
+
+    def _applyPoint(self, x, y, z):
+        vx, vy, vz = self._applyVector(x, y, z)
+        r = self._rows
+        return (vx + r[0][3], vy + r[1][3], vz + r[2][3])
+
+
+class Plane(Base):
+    def __init__(self, origin, normal):
+        self.origin = origin.copy()
+        self.normal = normal.copy()
+        self.normal.normalize()
+
+    @staticmethod
+    def create(origin, normal):
+        return Plane(origin, normal)
+
+    def copy(self):
+        return Plane(self.origin, self.normal)
+
+    def intersectWithLine(self, line):
+        denom = self.normal.dotProduct(line.direction)
+        if abs(denom) < TOLERANCE:
+            return None
+        t = self.normal.dotProduct(line.origin.vectorTo(self.origin)) / denom
+        p = line.origin.copy()
+        d = line.direction.copy()
+        d.scaleBy(t)
+        p.translateBy(d)
+        return p
+
+    def isParallelToPlane(self, plane):
+        return self.normal.isParallelTo(plane.normal)
+
+    def isCoPlanarTo(self, plane):
+        return self.isParallelToPlane(plane) and abs(self.normal.dotProduct(self.origin.vectorTo(plane.origin))) < TOLERANCE
+
+    def transformBy(self, matrix):
+        self.origin.transformBy(matrix)
+        self.normal.transformBy(matrix)
+        return True
+
+
+class InfiniteLine3D(Base):
+    def __init__(self, origin, direction):
+        self.origin = origin.copy()
+        self.direction = direction.copy()
+
+    @staticmethod
+    def create(origin, direction):
+        return InfiniteLine3D(origin, direction)
+
+
+class Curve3DTypes(object):
+    Line3DCurveType = 0
+    Arc3DCurveType = 1
+    Circle3DCurveType = 2
+    Ellipse3DCurveType = 3
+    EllipticalArc3DCurveType = 4
+    InfiniteLine3DCurveType = 5
+    NurbsCurve3DCurveType = 6
+
+
+class Line3D(Base):
+    curveType = Curve3DTypes.Line3DCurveType
+
+    def __init__(self, startPoint, endPoint):
+        self.startPoint = startPoint
+        self.endPoint = endPoint
+
+    @staticmethod
+    def create(startPoint, endPoint):
+        return Line3D(startPoint.copy(), endPoint.copy())
+
+    def transformBy(self, matrix):
+        self.startPoint.transformBy(matrix)
+        self.endPoint.transformBy(matrix)
+        return True
+
+
+class Circle3D(Base):
+    curveType = Curve3DTypes.Circle3DCurveType
+
+    def __init__(self, center, normal, radius):
+        self.center = center
+        self.normal = normal
+        self.radius = radius
+
+    @staticmethod
+    def createByCenter(center, normal, radius):
+        return Circle3D(center.copy(), normal.copy(), radius)
+
+
+class BoundingBox3D(Base):
+    def __init__(self, minPoint, maxPoint):
+        self.minPoint = minPoint
+        self.maxPoint = maxPoint
+
+    @staticmethod
+    def create(minPoint, maxPoint):
+        return BoundingBox3D(minPoint.copy(), maxPoint.copy())
+
+
+#==============================================================================
+#  collections and values
+#==============================================================================
+class ObjectCollection(Base):
+    def __init__(self, items=None):
+        self._items = list(items) if items else []
+
+    @staticmethod
+    def create():
+        return ObjectCollection()
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def add(self, item):
+        self._items.append(item)
+        return True
+
+    def item(self, i):
+        return self._items[i]
+
+    def clear(self):
+        del self._items[:]
+        return True
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, i):
+        return self._items[i]
+
+
+class ValueInput(Base):
+    def __init__(self, realValue=None, stringValue=None):
+        self.realValue = realValue
+        self.stringValue = stringValue
+
+    @staticmethod
+    def createByReal(value):
+        return ValueInput(realValue=value)
+
+    @staticmethod
+    def createByString(value):
+        return ValueInput(stringValue=value)
+
+    @property
+    def valueType(self):
+        return 0 if self.realValue is not None else 1
+
+
+#==============================================================================
+#  application and user interface
+#==============================================================================
+class Selections(Base):
+    def __init__(self):
+        self._items = []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def add(self, entity):
+        self._items.append(entity)
+        return True
+
+    def removeByEntity(self, entity):
+        for i, item in enumerate(self._items):
+            if item is entity:
+                del self._items[i]
+                return True
+        return False
+
+    def clear(self):
+        del self._items[:]
+        return True
+
+
+class ProgressDialog(Base):
+    def __init__(self):
+        self.isShowing = False
+        self.progressValue = 0
+        self.message = ''
+        self.wasCancelled = False
+
+    def show(self, title, message, minimumValue, maximumValue, delay=0):
+        self.isShowing = True
+        self.message = message
+        return True
+
+    def hide(self):
+        self.isShowing = False
+        return True
+
+
+class FileDialog(Base):
+    def __init__(self):
+        self.filter = ''
+        self.title = ''
+        self.filename = ''
+        self.initialDirectory = ''
+
+    def showOpen(self):
+        return DialogResults.DialogOK if self.filename else DialogResults.DialogCancel
+
+    def showSave(self):
+        return DialogResults.DialogOK if self.filename else DialogResults.DialogCancel
+
+
+class DialogResults(object):
+    DialogOK = 0
+    DialogCancel = 1
+    DialogError = 2
+    DialogYes = 2
+    DialogNo = 3
+
+
+class UserInterface(Base):
+    def __init__(self):
+        self.messages = []
+        self.activeSelections = Selections()
+        self.progressDialog = ProgressDialog()
+        self.commandDefinitions = CommandDefinitions()
+        self.allToolbarPanels = _ToolbarPanels()
+
+    def messageBox(self, text, *args):
+        self.messages.append(text)
+        return DialogResults.DialogOK
+
+    def createProgressDialog(self):
+        return ProgressDialog()
+
+    def createFileDialog(self):
+        return FileDialog()
+
+
+class Viewport(Base):
+    def __init__(self):
+        self.refreshCount = 0
+
+    def refresh(self):
+        self.refreshCount += 1
+        return True
+
+
+class Application(Base):
+    _instance = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.activeProduct = None
+        self.activeViewport = Viewport()
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
+
+    @property
+    def activeDocument(self):
+        return None
+
+
+class _ToolbarControls(Base):
+    def __init__(self):
+        self._controls = {}
+
+    def addCommand(self, definition, id_=None):
+        control = _ToolbarControl(self, id_ or definition.id)
+        self._controls[control.id] = control
+        return control
+
+    def itemById(self, id_):
+        return self._controls.get(id_)
+
+
+class _ToolbarControl(Base):
+    def __init__(self, parent, id_):
+        self._parent = parent
+        self.id = id_
+        self.isPromoted = False
+        self.isPromotedByDefault = False
+
+    def deleteMe(self):
+        self._parent._controls.pop(self.id, None)
+        return True
+
+
+class _ToolbarPanel(Base):
+    def __init__(self):
+        self.controls = _ToolbarControls()
+
+
+class _ToolbarPanels(Base):
+    def __init__(self):
+        self._panels = {}
+
+    def itemById(self, id_):
+        return self._panels.setdefault(id_, _ToolbarPanel())
+
+
+class Event(Base):
+    def __init__(self):
+        self._handlers = []
+
+    def add(self, handler):
+        self._handlers.append(handler)
+        return True
+
+    def remove(self, handler):
+        self._handlers.remove(handler)
+        return True
+
+    def fire(self, args):
+        for handler in self._handlers:
+            handler.notify(args)
+
+
+class CommandDefinition(Base):
+    def __init__(self, parent, id_, name, tooltip, resourceFolder):
+        self._parent = parent
+        self.id = id_
+        self.name = name
+        self.tooltip = tooltip
+        self.resourceFolder = resourceFolder
+        self.commandCreated = Event()
+
+    def deleteMe(self):
+        self._parent._definitions.pop(self.id, None)
+        return True
+
+    def execute(self):
+        return True
+
+
+class CommandDefinitions(Base):
+    def __init__(self):
+        self._definitions = {}
+
+    def addButtonDefinition(self, id_, name, tooltip, resourceFolder=''):
+        definition = CommandDefinition(self, id_, name, tooltip, resourceFolder)
+        self._definitions[id_] = definition
+        return definition
+
+    def itemById(self, id_):
+        return self._definitions.get(id_)
+
+
+#==============================================================================
+#  commands, inputs and events
+#==============================================================================
+class EventHandler(Base):
+    def notify(self, args):
+        pass
+
+
+class CommandCreatedEventHandler(EventHandler):
+    pass
+
+
+class CommandEventHandler(EventHandler):
+    pass
+
+
+class SelectionEventHandler(EventHandler):
+    pass
+
+
+class ValidateInputsEventHandler(EventHandler):
+    pass
+
+
+class InputChangedEventHandler(EventHandler):
+    pass
+
+
+class DropDownStyles(object):
+    LabeledIconDropDownStyle = 0
+    CheckBoxDropDownStyle = 1
+    TextListDropDownStyle = 2
+
+
+class ListItem(Base):
+    def __init__(self, parent, name, isSelected, icon):
+        self._parent = parent
+        self.name = name
+        self._isSelected = isSelected
+        self.icon = icon
+
+    @property
+    def isSelected(self):
+        return self._isSelected
+
+    @isSelected.setter
+    def isSelected(self, value):
+        if value:
+            for item in self._parent._items:
+                item._isSelected = False
+        self._isSelected = value
+
+
+class ListItems(Base):
+    def __init__(self):
+        self._items = []
+
+    def add(self, name, isSelected, icon='', beforeIndex=-1):
+        item = ListItem(self, name, isSelected, icon)
+        self._items.append(item)
+        return item
+
+    def item(self, i):
+        return self._items[i]
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class CommandInput(Base):
+    def __init__(self, commandInputs, id_, name=''):
+        self.commandInputs = commandInputs
+        self.id = id_
+        self.name = name
+        self.isVisible = True
+        self.isEnabled = True
+        self.tooltip = ''
+        self.tooltipDescription = ''
+        self.hasFocus = False
+
+    @property
+    def parentCommand(self):
+        return self.commandInputs.command
+
+
+class Selection(Base):
+    def __init__(self, entity, point=None):
+        self.entity = entity
+        self.point = point
+
+
+class SelectionCommandInput(CommandInput):
+    def __init__(self, commandInputs, id_, name, prompt):
+        CommandInput.__init__(self, commandInputs, id_, name)
+        self.prompt = prompt
+        self._selections = []
+        self.filters = []
+
+    def addSelectionFilter(self, filter_):
+        self.filters.append(filter_)
+        return True
+
+    def setSelectionLimits(self, minimum, maximum=0):
+        return True
+
+    @property
+    def selectionCount(self):
+        return len(self._selections)
+
+    def selection(self, i):
+        return self._selections[i]
+
+    def addSelection(self, entity):
+        self._selections.append(Selection(entity))
+        return True
+
+    def removeSelection(self, i):
+        del self._selections[i]
+        return True
+
+    def clearSelection(self):
+        del self._selections[:]
+        return True
+
+
+class ValueCommandInput(CommandInput):
+    def __init__(self, commandInputs, id_, name, unitType, initialValue):
+        CommandInput.__init__(self, commandInputs, id_, name)
+        self.unitType = unitType
+        if initialValue.stringValue is not None:
+            self.expression = initialValue.stringValue
+            self.value = _evaluate(initialValue.stringValue)
+        else:
+            self.value = initialValue.realValue
+            self.expression = str(initialValue.realValue)
+
+
+class BoolValueCommandInput(CommandInput):
+    def __init__(self, commandInputs, id_, name, isCheckBox, resourceFolder, initialValue):
+        CommandInput.__init__(self, commandInputs, id_, name)
+        self.value = initialValue
+
+
+class DropDownCommandInput(CommandInput):
+    def __init__(self, commandInputs, id_, name, style):
+        CommandInput.__init__(self, commandInputs, id_, name)
+        self.listItems = ListItems()
+
+    @property
+    def selectedItem(self):
+        for item in self.listItems:
+            if item.isSelected:
+                return item
+        return None
+
+
+class ButtonRowCommandInput(DropDownCommandInput):
+    def __init__(self, commandInputs, id_, name, isMultiSelectEnabled):
+        DropDownCommandInput.__init__(self, commandInputs, id_, name, None)
+
+
+class TextBoxCommandInput(CommandInput):
+    def __init__(self, commandInputs, id_, name, formattedText, numRows, isReadOnly):
+        CommandInput.__init__(self, commandInputs, id_, name)
+        self.formattedText = formattedText
+        self.text = formattedText
+        self.numRows = numRows
+        self.isReadOnly = isReadOnly
+
+
+class GroupCommandInput(CommandInput):
+    def __init__(self, commandInputs, id_, name):
+        CommandInput.__init__(self, commandInputs, id_, name)
+        self.isExpanded = True
+        self.isEnabledCheckBoxDisplayed = False
+        self.children = CommandInputs(commandInputs.command, commandInputs)
+
+
+class CommandInputs(Base):
+    def __init__(self, command=None, parent=None):
+        self.command = command
+        self._parent = parent
+        self._inputs = []
+
+    @property
+    def _root(self):
+        return self._parent._root if self._parent else self
+
+    def _add(self, inp):
+        inp.commandInputs = self._root
+        self._inputs.append(inp)
+        return inp
+
+    def addSelectionInput(self, id_, name, commandPrompt):
+        return self._add(SelectionCommandInput(self, id_, name, commandPrompt))
+
+    def addValueInput(self, id_, name, unitType, initialValue):
+        return self._add(ValueCommandInput(self, id_, name, unitType, initialValue))
+
+    def addBoolValueInput(self, id_, name, isCheckBox, resourceFolder='', initialValue=False):
+        return self._add(BoolValueCommandInput(self, id_, name, isCheckBox, resourceFolder, initialValue))
+
+    def addDropDownCommandInput(self, id_, name, dropDownStyle):
+        return self._add(DropDownCommandInput(self, id_, name, dropDownStyle))
+
+    def addButtonRowCommandInput(self, id_, name, isMultiSelectEnabled):
+        return self._add(ButtonRowCommandInput(self, id_, name, isMultiSelectEnabled))
+
+    def addGroupCommandInput(self, id_, name):
+        return self._add(GroupCommandInput(self, id_, name))
+
+    def addTextBoxCommandInput(self, id_, name, formattedText, numRows, isReadOnly):
+        return self._add(TextBoxCommandInput(self, id_, name, formattedText, numRows, isReadOnly))
+
+    def _walk(self):
+        for inp in self._inputs:
+            yield inp
+            if isinstance(inp, GroupCommandInput):
+                for child in inp.children._walk():
+                    yield child
+
+    def itemById(self, id_):
+        for inp in self._walk():
+            if inp.id == id_:
+                return inp
+        return None
+
+    def __iter__(self):
+        return iter(list(self._walk()))
+
+    @property
+    def count(self):
+        return len(list(self._walk()))
+
+
+class Command(Base):
+    def __init__(self):
+        self.commandInputs = CommandInputs(self)
+        self.execute = Event()
+        self.executePreview = Event()
+        self.destroy = Event()
+        self.selectionEvent = Event()
+        self.select = Event()
+        self.unselect = Event()
+        self.validateInputs = Event()
+        self.inputChanged = Event()
+        self.isOKButtonVisible = True
+
+
+class FiringEvent(Base):
+    def __init__(self, sender, activeInput=None):
+        self.sender = sender
+        self.activeInput = activeInput
+
+
+class CommandCreatedEventArgs(Base):
+    def __init__(self, command):
+        self.command = command
+        self.firingEvent = FiringEvent(command)
+
+
+class CommandEventArgs(Base):
+    def __init__(self, command):
+        self.command = command
+        self.firingEvent = FiringEvent(command)
+        self.isValidResult = True
+
+
+class InputChangedEventArgs(Base):
+    def __init__(self, command, input_):
+        self.input = input_
+        self.inputs = command.commandInputs
+        self.firingEvent = FiringEvent(command)
+
+
+class SelectionEventArgs(Base):
+    def __init__(self, command, activeInput, entity):
+        self.selection = Selection(entity)
+        self.isSelectable = True
+        self.firingEvent = FiringEvent(command, activeInput)
+
+
+class ValidateInputsEventArgs(Base):
+    def __init__(self, command):
+        self.areInputsValid = True
+        self.firingEvent = FiringEvent(command)
+
+
+#==============================================================================
+#  expression evaluation for value inputs and user parameters (internal units are cm)
+#==============================================================================
+_UNITS = {'in': 2.54, 'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'deg': math.pi/180.0}
+
+
+def _evaluate(expression, names=None):
+    import re
+    names = dict(names or {})
+    names.update({'sqrt': math.sqrt, 'pi': math.pi})
+
+    def unit(match):
+        return '*{}'.format(_UNITS[match.group(1)])
+    expr = re.sub(r'(?<=[\d\s\)])\s*\b(in|mm|cm|m|deg)\b', unit, str(expression))
+    return float(eval(expr, {'__builtins__': {}}, names))
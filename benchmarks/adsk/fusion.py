@@ -0,0 +1,1374 @@
+'''
+Stand-in for ``adsk.fusion`` - polyhedral BRep topology with assembly-context proxies, components,
+occurrences, sketches, hole/base/combine features, user parameters, attributes and the timeline.
+'''
+
+import itertools
+import math
+import re
+
+from . import core
+
+
+class FusionBase(core.Base):
+    _namespace = 'fusion'
+
+
+class BRepEntityTypes(object):
+    BRepBodyEntityType = 0
+    BRepFaceEntityType = 1
+    BRepEdgeEntityType = 2
+    BRepVertexEntityType = 3
+
+
+class DesignTypes(object):
+    DirectDesignType = 0
+    ParametricDesignType = 1
+
+
+class FeatureOperations(object):
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+
+class BooleanTypes(object):
+    DifferenceBooleanType = 0
+    IntersectionBooleanType = 1
+    UnionBooleanType = 2
+
+
+#==============================================================================
+#  attributes
+#==============================================================================
+class Attribute(FusionBase):
+    def __init__(self, parent, groupName, name, value):
+        self.parent = parent
+        self.groupName = groupName
+        self.name = name
+        self.value = value
+
+    def deleteMe(self):
+        self.parent.attributes._remove(self)
+        return True
+
+
+class Attributes(FusionBase):
+    _registry = []
+
+    def __init__(self, parent):
+        self._parent = parent
+        self._items = []
+
+    def add(self, groupName, name, value):
+        existing = self.itemByName(groupName, name)
+        if existing:
+            existing.value = value
+            return existing
+        attribute = Attribute(self._parent, groupName, name, value)
+        self._items.append(attribute)
+        Attributes._registry.append(attribute)
+        return attribute
+
+    def itemByName(self, groupName, name):
+        for attribute in self._items:
+            if attribute.groupName == groupName and attribute.name == name:
+                return attribute
+        return None
+
+    def itemsByGroup(self, groupName):
+        return [a for a in self._items if a.groupName == groupName]
+
+    def _remove(self, attribute):
+        self._items.remove(attribute)
+        Attributes._registry.remove(attribute)
+
+    def _clear(self):
+        for attribute in list(self._items):
+            self._remove(attribute)
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+
+#==============================================================================
+#  BRep topology
+#==============================================================================
+class BRepCollection(core.ObjectCollection):
+    def itemByTempId(self, tempId):
+        for item in self._items:
+            if item.tempId == tempId:
+                return item
+        return None
+
+
+class BRepEntity(FusionBase):
+    '''
+    Native entities hold the data; proxies (assembly context) only hold a reference to the native object.
+    A feature that changes a body invalidates its entities (see BRepBody._modified) - the entities that replace them
+    have new tempIds, but keep their entity token (_token).
+    '''
+    _tempIds = itertools.count(1)
+
+    def __init__(self, body):
+        self._native = None
+        self._occ = None
+        self._proxies = {}
+        self._body = body
+        self._tempId = next(BRepEntity._tempIds)
+        self._token = self._tempId
+        self._revision = body._revision if body else 1  # of its body, when it was made
+        self._valid = True
+        self._attributes = None
+
+    @property
+    def _n(self):
+        return self._native or self
+
+    @property
+    def tempId(self):
+        return self._n._tempId
+
+    @property
+    def assemblyContext(self):
+        return self._occ
+
+    @property
+    def nativeObject(self):
+        return self._native
+
+    @property
+    def isValid(self):
+        native = self._n
+        return native._valid and (native._body is None or native._revision == native._body._revision)
+
+    @property
+    def body(self):
+        return self._ctx(self._n._body)
+
+    @property
+    def entityToken(self):
+        native = self._n
+        token = '{}/{}'.format(type(native).__name__, native._token)
+        return token + ('@' + self._occ.name if self._occ else '')
+
+    @property
+    def attributes(self):
+        native = self._n
+        if native._attributes is None:
+            native._attributes = Attributes(native)
+        return native._attributes
+
+    def createForAssemblyContext(self, occurrence):
+        native = self._n
+        proxy = native._proxies.get(occurrence.name)
+        if proxy is None:
+            proxy = object.__new__(type(native))
+            proxy._native = native
+            proxy._occ = occurrence
+            proxy._proxies = {}
+            native._proxies[occurrence.name] = proxy
+        return proxy
+
+    def _current(self):
+        # the entity that replaces this (native) one, once its body has changed - itself until then
+        body = self._body
+        if body is None or self._revision == body._revision:
+            return self
+        return body._currentEntity(self)
+
+    def _ctx(self, entity):
+        if entity is None:
+            return entity
+        entity = entity._current()
+        if self._occ is None:
+            return entity
+        return entity.createForAssemblyContext(self._occ)
+
+    def _ctxList(self, entities):
+        body = self._n._body or self._n
+        if body._revision > 1:
+            entities = [e._current() for e in entities]
+        if self._occ is None:
+            return BRepCollection(entities)
+        occ = self._occ
+        return BRepCollection([e.createForAssemblyContext(occ) for e in entities])
+
+    def _xform(self, geometry):
+        geometry = geometry.copy()
+        if self._occ is not None:
+            geometry.transformBy(self._occ.transform)
+        return geometry
+
+    def __eq__(self, other):
+        return isinstance(other, BRepEntity) and self._n is other._n and self._occ is other._occ
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = object.__hash__
+
+
+class BRepVertex(BRepEntity):
+    def __init__(self, body, point):
+        BRepEntity.__init__(self, body)
+        self._point = point
+        self._edges = []
+        self._faces = []
+
+    @property
+    def geometry(self):
+        return self._xform(self._n._point)
+
+    @property
+    def edges(self):
+        return self._ctxList(self._n._edges)
+
+    @property
+    def faces(self):
+        return self._ctxList(self._n._faces)
+
+
+class BRepEdge(BRepEntity):
+    def __init__(self, body, startVertex, endVertex):
+        BRepEntity.__init__(self, body)
+        self._start = startVertex
+        self._end = endVertex
+        self._coEdges = []
+        self._faces = []
+
+    @property
+    def startVertex(self):
+        return self._ctx(self._n._start)
+
+    @property
+    def endVertex(self):
+        return self._ctx(self._n._end)
+
+    @property
+    def geometry(self):
+        native = self._n
+        line = core.Line3D(native._start._point.copy(), native._end._point.copy())
+        if self._occ is not None:
+            line.transformBy(self._occ.transform)
+        return line
+
+    @property
+    def faces(self):
+        return self._ctxList(self._n._faces)
+
+    @property
+    def coEdges(self):
+        return self._ctxList(self._n._coEdges)
+
+    @property
+    def length(self):
+        native = self._n
+        return native._start._point.distanceTo(native._end._point)
+
+    @property
+    def isDegenerate(self):
+        return False
+
+
+class BRepCoEdge(BRepEntity):
+    def __init__(self, body, edge, loop, isOpposedToEdge):
+        BRepEntity.__init__(self, body)
+        self._edge = edge
+        self._loop = loop
+        self._opposed = isOpposedToEdge
+
+    @property
+    def edge(self):
+        return self._ctx(self._n._edge)
+
+    @property
+    def loop(self):
+        return self._ctx(self._n._loop)
+
+    @property
+    def isOpposedToEdge(self):
+        return self._n._opposed
+
+
+class BRepLoop(BRepEntity):
+    def __init__(self, body, face, isOuter):
+        BRepEntity.__init__(self, body)
+        self._face = face
+        self._isOuter = isOuter
+        self._coEdges = []
+
+    @property
+    def face(self):
+        return self._ctx(self._n._face)
+
+    @property
+    def isOuter(self):
+        return self._n._isOuter
+
+    @property
+    def coEdges(self):
+        return self._ctxList(self._n._coEdges)
+
+    @property
+    def edges(self):
+        return self._ctxList([c._edge for c in self._n._coEdges])
+
+
+class SurfaceEvaluator(FusionBase):
+    def __init__(self, face):
+        self._face = face
+
+    def getNormalAtPoint(self, point):
+        return (True, self._face._xform(self._face._n._normal))
+
+
+class BRepFace(BRepEntity):
+    def __init__(self, body, normal):
+        BRepEntity.__init__(self, body)
+        self._normal = normal
+        self._loops = []
+        self._vertices = []
+        self._edges = []
+        self._pointOnFace = None
+
+    @property
+    def geometry(self):
+        native = self._n
+        return self._xform(core.Plane(native._vertices[0]._point, native._normal))
+
+    @property
+    def evaluator(self):
+        return SurfaceEvaluator(self)
+
+    @property
+    def pointOnFace(self):
+        return self._xform(self._n._pointOnFace)
+
+    @property
+    def vertices(self):
+        return self._ctxList(self._n._vertices)
+
+    @property
+    def edges(self):
+        return self._ctxList(self._n._edges)
+
+    @property
+    def loops(self):
+        return self._ctxList(self._n._loops)
+
+    @property
+    def area(self):
+        return abs(_polygonArea([c._edge for c in self._n._loops[0]._coEdges], self._n))
+
+    def _contains(self, point, tolerance=1e-7):
+        native = self._n
+        normal = native._normal
+        if abs(native._vertices[0]._point.vectorTo(point).dotProduct(normal)) > tolerance:
+            return False
+        axes = _projectionAxes(normal)
+        inOuter = False
+        for loop in native._loops:
+            polygon = [_loopStart(c) for c in loop._coEdges]
+            inside = _pointInPolygon(point, polygon, axes)
+            if loop._isOuter:
+                inOuter = inside
+            elif inside:
+                return False
+        return inOuter
+
+
+def _loopStart(coEdge):
+    edge = coEdge._edge
+    return (edge._end if coEdge._opposed else edge._start)._point
+
+
+def _projectionAxes(normal):
+    n = (abs(normal.x), abs(normal.y), abs(normal.z))
+    drop = n.index(max(n))
+    return [i for i in range(3) if i != drop]
+
+
+def _pointInPolygon(point, polygon, axes):
+    (a, b) = axes
+    p = point.asArray()
+    x, y = p[a], p[b]
+    inside = False
+    pts = [q.asArray() for q in polygon]
+    for i in range(len(pts)):
+        x1, y1 = pts[i][a], pts[i][b]
+        x2, y2 = pts[i-1][a], pts[i-1][b]
+        if (y1 > y) != (y2 > y):
+            xi = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            if xi > x:
+                inside = not inside
+    return inside
+
+
+def _polygonArea(edges, face):
+    return 0.0
+
+
+class BRepBody(BRepEntity):
+    def __init__(self, name, component):
+        BRepEntity.__init__(self, None)
+        self._name = name
+        self._component = component
+        self._faces = []
+        self._edges = []
+        self._vertices = []
+        self._revision = 1
+        self._currents = {}  # entity token: the entity that replaces it - see _currentEntity
+        self._tokenIndex = None  # (type name, token): entity - see _entityByToken
+
+    @property
+    def name(self):
+        return self._n._name
+
+    @name.setter
+    def name(self, value):
+        self._n._name = value
+
+    @property
+    def body(self):
+        return self
+
+    @property
+    def parentComponent(self):
+        return self._n._component
+
+    @property
+    def revisionId(self):
+        return 'rev{}'.format(self._n._revision)
+
+    @property
+    def isSolid(self):
+        return True
+
+    @property
+    def faces(self):
+        return self._ctxList(self._n._faces)
+
+    @property
+    def edges(self):
+        return self._ctxList(self._n._edges)
+
+    @property
+    def vertices(self):
+        return self._ctxList(self._n._vertices)
+
+    def _modified(self):
+        # a feature has changed the body - its faces, edges, vertices, loops and coEdges are no longer valid
+        self._n._revision += 1
+
+    def _currentEntity(self, entity):
+        '''
+        returns the entity that replaces entity (one of the body's, made at an earlier revision) - made when it's first
+        asked for, as a copy with a new tempId and the same entity token. Made entities refer to the body's first
+        entities, so every accessor goes through _current
+        '''
+        current = self._currents.get(entity._token)
+        if current is None or current._revision != self._revision:
+            current = object.__new__(type(entity))
+            current.__dict__.update(entity.__dict__)
+            current._tempId = next(BRepEntity._tempIds)
+            current._revision = self._revision
+            current._proxies = {}
+            current._attributes = None
+            self._currents[entity._token] = current
+        return current
+
+    def _entityByToken(self, kind, token):
+        # the current vertex, edge or face of kind (type name) with token - for Design.findEntityByToken
+        if self._tokenIndex is None:
+            self._tokenIndex = {(type(entity).__name__, str(entity._token)): entity for entity in self._vertices + self._edges + self._faces}
+        entity = self._tokenIndex.get((kind, token))
+        return entity._current() if entity is not None and self._valid else None
+
+    def deleteMe(self):
+        native = self._n
+        native._valid = False
+        native._component._bodies.remove(native)
+        return True
+
+
+class BodyBuilder(object):
+    '''Builds a closed polyhedral BRepBody from planar polygon faces (outer loop first, then inner loops).'''
+
+    def __init__(self, name, component):
+        self.body = BRepBody(name, component)
+        self._vertices = {}
+        self._edges = {}
+
+    def _vertex(self, coords):
+        key = tuple(round(c, 9) for c in coords)
+        vertex = self._vertices.get(key)
+        if vertex is None:
+            vertex = BRepVertex(self.body, core.Point3D(*coords))
+            self._vertices[key] = vertex
+            self.body._vertices.append(vertex)
+        return vertex
+
+    def addFace(self, loops, normal):
+        normal = core.Vector3D(*normal)
+        normal.normalize()
+        face = BRepFace(self.body, normal)
+        self.body._faces.append(face)
+        for index, coords in enumerate(loops):
+            isOuter = index == 0
+            coords = list(coords)
+            if (_newell(coords).dotProduct(normal) > 0) != isOuter:
+                coords.reverse()
+            loop = BRepLoop(self.body, face, isOuter)
+            face._loops.append(loop)
+            vertices = [self._vertex(c) for c in coords]
+            for vertex in vertices:
+                if face not in vertex._faces:
+                    vertex._faces.append(face)
+                face._vertices.append(vertex)
+            for a, b in zip(vertices, vertices[1:] + vertices[:1]):
+                key = (min(a._tempId, b._tempId), max(a._tempId, b._tempId))
+                edge = self._edges.get(key)
+                if edge is None:
+                    edge = BRepEdge(self.body, a, b)
+                    self._edges[key] = edge
+                    self.body._edges.append(edge)
+                    a._edges.append(edge)
+                    b._edges.append(edge)
+                coEdge = BRepCoEdge(self.body, edge, loop, edge._start is not a)
+                edge._coEdges.append(coEdge)
+                edge._faces.append(face)
+                loop._coEdges.append(coEdge)
+                face._edges.append(edge)
+        outer = [v._point for v in face._vertices[:len(loops[0])]]
+        centroid = core.Point3D(sum(p.x for p in outer)/len(outer), sum(p.y for p in outer)/len(outer), sum(p.z for p in outer)/len(outer))
+        step = outer[0].vectorTo(centroid)
+        step.scaleBy(1e-3)
+        pointOnFace = outer[0].copy()
+        pointOnFace.translateBy(step)
+        face._pointOnFace = pointOnFace
+        return face
+
+    def build(self):
+        for edge in self.body._edges:
+            if len(edge._faces) != 2:
+                raise ValueError('body {} is not closed: edge {} has {} faces'.format(self.body._name, edge._tempId, len(edge._faces)))
+        return self.body
+
+
+def _newell(coords):
+    nx = ny = nz = 0.0
+    for (x1, y1, z1), (x2, y2, z2) in zip(coords, coords[1:] + coords[:1]):
+        nx += (y1 - y2) * (z1 + z2)
+        ny += (z1 - z2) * (x1 + x2)
+        nz += (x1 - x2) * (y1 + y2)
+    return core.Vector3D(nx, ny, nz)
+
+
+#==============================================================================
+#  sketches
+#==============================================================================
+class SketchPoint(FusionBase):
+    def __init__(self, sketch, point):
+        self.parentSketch = sketch
+        self._point = point
+        self.isFixed = False
+        self.attributes = Attributes(self)
+
+    @property
+    def geometry(self):
+        return self._point.copy()
+
+    @property
+    def worldGeometry(self):
+        return self._point.copy()
+
+    def deleteMe(self):
+        self.parentSketch._points.remove(self)
+        return True
+
+
+class SketchPoints(FusionBase):
+    def __init__(self, sketch):
+        self._sketch = sketch
+
+    def add(self, point):
+        sketchPoint = SketchPoint(self._sketch, point.copy())
+        self._sketch._points.append(sketchPoint)
+        return sketchPoint
+
+    @property
+    def count(self):
+        return len(self._sketch._points)
+
+    def item(self, i):
+        return self._sketch._points[i]
+
+    def __iter__(self):
+        return iter(list(self._sketch._points))
+
+
+class SketchLine(FusionBase):
+    def __init__(self, sketch, start, end):
+        self.parentSketch = sketch
+        self.startSketchPoint = start
+        self.endSketchPoint = end
+        self.isConstruction = False
+        self.isReference = True
+
+
+class SketchDimension(FusionBase):
+    def __init__(self, entityOne, entityTwo):
+        self.entityOne = entityOne
+        self.entityTwo = entityTwo
+        self.parameter = ModelParameter()
+
+
+class ModelParameter(FusionBase):
+    def __init__(self):
+        self.expression = ''
+        self.value = 0.0
+
+
+class SketchDimensions(FusionBase):
+    def __init__(self, sketch):
+        self._sketch = sketch
+        self._items = []
+
+    def addDistanceDimension(self, entityOne, entityTwo, orientation, textPoint, isDriving=True):
+        dimension = SketchDimension(entityOne, entityTwo)
+        self._items.append(dimension)
+        return dimension
+
+    def addOffsetDimension(self, line, entity, textPoint, isDriving=True):
+        return self.addDistanceDimension(line, entity, 0, textPoint, isDriving)
+
+    @property
+    def count(self):
+        return len(self._items)
+
+
+class GeometricConstraints(FusionBase):
+    def __init__(self):
+        self._items = []
+
+    def addCoincident(self, point, entity):
+        self._items.append((point, entity))
+        return True
+
+
+class DimensionOrientations(object):
+    AlignedDimensionOrientation = 0
+    HorizontalDimensionOrientation = 1
+    VerticalDimensionOrientation = 2
+
+
+class Sketch(FusionBase):
+    def __init__(self, component, planarEntity, occurrence=None):
+        self.parentComponent = component
+        self.referencePlane = planarEntity
+        self.name = 'Sketch'
+        self.isComputeDeferred = False
+        self.isVisible = True
+        self._points = []
+        self._projected = []
+        self.sketchPoints = SketchPoints(self)
+        self.sketchDimensions = SketchDimensions(self)
+        self.geometricConstraints = GeometricConstraints()
+        self.attributes = Attributes(self)
+
+    def modelToSketchSpace(self, point):
+        return point.copy()
+
+    def sketchToModelSpace(self, point):
+        return point.copy()
+
+    def project(self, entity):
+        if isinstance(entity, BRepEntity) and not entity.isValid:
+            raise RuntimeError('3 : invalid entity to project')
+        result = core.ObjectCollection.create()
+        if isinstance(entity, BRepVertex):
+            point = SketchPoint(self, entity.geometry)
+            self._projected.append(point)
+            result.add(point)
+        elif isinstance(entity, BRepEdge):
+            start = SketchPoint(self, entity.startVertex.geometry)
+            end = SketchPoint(self, entity.endVertex.geometry)
+            line = SketchLine(self, start, end)
+            self._projected.append(line)
+            result.add(line)
+        return result
+
+    @property
+    def isValid(self):
+        return self in self.parentComponent.sketches._items
+
+    def deleteMe(self):
+        self.parentComponent.sketches._items.remove(self)
+        self.attributes._clear()
+        self.parentComponent._design.timeline._removeItem(self)
+        return True
+
+
+class Sketches(FusionBase):
+    def __init__(self, component):
+        self._component = component
+        self._items = []
+
+    def add(self, planarEntity, occurrenceForCreation=None):
+        if isinstance(planarEntity, BRepEntity) and not planarEntity.isValid:
+            raise RuntimeError('3 : invalid planar entity')
+        sketch = Sketch(self._component, planarEntity, occurrenceForCreation)
+        self._items.append(sketch)
+        self._component._design.timeline._addItem(sketch)
+        return sketch
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, i):
+        return self._items[i]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+
+#==============================================================================
+#  features
+#==============================================================================
+class Feature(FusionBase):
+    def __init__(self, component, bodies):
+        self.parentComponent = component
+        self.name = type(self).__name__
+        self._bodies = bodies
+        self.attributes = Attributes(self)
+        self.timelineObject = None
+        self._valid = True
+
+    @property
+    def isValid(self):
+        return self._valid
+
+    @property
+    def bodies(self):
+        return core.ObjectCollection(self._bodies)
+
+    def deleteMe(self):
+        self._valid = False
+        self.attributes._clear()
+        self.parentComponent._design.timeline._removeItem(self)
+        for body in self._bodies:
+            body._modified()
+        return True
+
+
+class HoleFeature(Feature):
+    def __init__(self, component, holeInput):
+        Feature.__init__(self, component, list(holeInput.participantBodies or []))
+        self.holeInput = holeInput
+        self.sketchPoints = core.ObjectCollection(holeInput._points)
+
+    @property
+    def holeCount(self):
+        return max(1, len(self.holeInput._points))
+
+
+class HoleFeatureInput(FusionBase):
+    def __init__(self, diameter):
+        self.holeDiameter = diameter
+        self.isDefaultDirection = True
+        self.tipAngle = None
+        self.participantBodies = []
+        self.creationOccurrence = None
+        self.extent = None
+        self._points = []
+        self._planeAndOffsets = None
+
+    def setPositionBySketchPoints(self, sketchPoints):
+        self._points = list(sketchPoints)
+        return True
+
+    def setPositionBySketchPoint(self, sketchPoint):
+        self._points = [sketchPoint]
+        return True
+
+    def setPositionByPoint(self, planarEntity, point):
+        self._planeAndOffsets = (planarEntity, point)
+        return True
+
+    def setPositionByPlaneAndOffsets(self, planarEntity, point, edgeOne, offsetOne, edgeTwo, offsetTwo):
+        for entity in (planarEntity, edgeOne, edgeTwo):
+            if not entity.isValid:
+                raise RuntimeError('3 : invalid entity for setPositionByPlaneAndOffsets')
+        self._planeAndOffsets = (planarEntity, point, edgeOne, offsetOne, edgeTwo, offsetTwo)
+        return True
+
+    def setDistanceExtent(self, distance):
+        self.extent = ('distance', distance)
+        return True
+
+    def setOneSideToExtent(self, toEntity, matchShape, directionHint=None):
+        if not toEntity.isValid:
+            raise RuntimeError('3 : invalid extent entity')
+        self.extent = ('toEntity', toEntity)
+        return True
+
+    def setAllExtent(self, direction):
+        self.extent = ('all', direction)
+        return True
+
+
+class HoleFeatures(FusionBase):
+    def __init__(self, component):
+        self._component = component
+        self._items = []
+
+    def createSimpleInput(self, holeDiameter):
+        return HoleFeatureInput(holeDiameter)
+
+    def add(self, holeInput):
+        for body in holeInput.participantBodies or []:
+            body = body.nativeObject or body
+            body._modified()
+        feature = HoleFeature(self._component, holeInput)
+        self._items.append(feature)
+        self._component._design.timeline._addItem(feature)
+        return feature
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, i):
+        return self._items[i]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+
+class BaseFeature(Feature):
+    def __init__(self, component):
+        Feature.__init__(self, component, [])
+        self._editing = False
+
+    def startEdit(self):
+        self._editing = True
+        return True
+
+    def finishEdit(self):
+        self._editing = False
+        return True
+
+
+class BaseFeatures(FusionBase):
+    def __init__(self, component):
+        self._component = component
+        self._items = []
+
+    def add(self):
+        feature = BaseFeature(self._component)
+        self._items.append(feature)
+        self._component._design.timeline._addItem(feature)
+        return feature
+
+    @property
+    def count(self):
+        return len(self._items)
+
+
+class CombineFeatureInput(FusionBase):
+    def __init__(self, targetBody, toolBodies):
+        self.targetBody = targetBody
+        self.toolBodies = toolBodies
+        self.operation = FeatureOperations.JoinFeatureOperation
+        self.isKeepToolBodies = False
+        self.isNewComponent = False
+
+
+class CombineFeature(Feature):
+    pass
+
+
+class CombineFeatures(FusionBase):
+    def __init__(self, component):
+        self._component = component
+        self._items = []
+
+    def createInput(self, targetBody, toolBodies):
+        return CombineFeatureInput(targetBody, toolBodies)
+
+    def add(self, combineInput):
+        target = combineInput.targetBody.nativeObject or combineInput.targetBody
+        target._modified()
+        if not combineInput.isKeepToolBodies:
+            for tool in combineInput.toolBodies:
+                tool = tool.nativeObject or tool
+                if tool._n in tool._n._component._bodies:
+                    tool._n._component._bodies.remove(tool._n)
+        feature = CombineFeature(self._component, [target])
+        self._items.append(feature)
+        self._component._design.timeline._addItem(feature)
+        return feature
+
+    @property
+    def count(self):
+        return len(self._items)
+
+
+class Features(FusionBase):
+    def __init__(self, component):
+        self.holeFeatures = HoleFeatures(component)
+        self.baseFeatures = BaseFeatures(component)
+        self.combineFeatures = CombineFeatures(component)
+
+
+#==============================================================================
+#  temporary BRep bodies
+#==============================================================================
+class TemporaryBRepManager(FusionBase):
+    _instance = None
+
+    @staticmethod
+    def get():
+        if TemporaryBRepManager._instance is None:
+            TemporaryBRepManager._instance = TemporaryBRepManager()
+        return TemporaryBRepManager._instance
+
+    def createCylinderOrCone(self, pointOne, pointOneRadius, pointTwo, pointTwoRadius):
+        body = BRepBody('temporary', None)
+        body._primitives = [(pointOne.copy(), pointTwo.copy(), pointOneRadius)]
+        return body
+
+    def booleanOperation(self, targetBody, toolBody, booleanType):
+        targetBody._primitives.extend(toolBody._primitives)
+        return True
+
+    def copy(self, body):
+        copied = BRepBody(body._name, None)
+        copied._primitives = list(getattr(body, '_primitives', []))
+        return copied
+
+
+class BRepBodies(FusionBase):
+    def __init__(self, component):
+        self._component = component
+
+    def add(self, body, targetBaseFeature=None):
+        body = BRepBody(body._name, self._component) if not hasattr(body, '_primitives') else _adopt(body, self._component)
+        self._component._bodies.append(body)
+        if targetBaseFeature is not None:
+            targetBaseFeature._bodies.append(body)
+        return body
+
+    @property
+    def count(self):
+        return len(self._component._bodies)
+
+    def item(self, i):
+        return self._component._bodies[i]
+
+    def itemByName(self, name):
+        for body in self._component._bodies:
+            if body._name == name:
+                return body
+        return None
+
+    def __iter__(self):
+        return iter(list(self._component._bodies))
+
+
+def _adopt(body, component):
+    adopted = BRepBody(body._name, component)
+    adopted._primitives = body._primitives
+    return adopted
+
+
+#==============================================================================
+#  custom graphics
+#==============================================================================
+class CustomGraphicsEntity(FusionBase):
+    def __init__(self, parent):
+        self.parent = parent
+        self.isVisible = True
+        self.color = None
+        self._valid = True
+
+    @property
+    def isValid(self):
+        return self._valid
+
+    def deleteMe(self):
+        self._valid = False
+        if self in self.parent._items:
+            self.parent._items.remove(self)
+        return True
+
+
+class CustomGraphicsCurve(CustomGraphicsEntity):
+    def __init__(self, parent, curve):
+        CustomGraphicsEntity.__init__(self, parent)
+        self.curve = curve
+        self.weight = 1.0
+
+
+class CustomGraphicsPointSet(CustomGraphicsEntity):
+    def __init__(self, parent, coordinates, indexList, pointType, imageFile):
+        CustomGraphicsEntity.__init__(self, parent)
+        self.coordinates = coordinates
+
+
+class CustomGraphicsPointTypes(object):
+    UserDefinedCustomGraphicsPointType = 0
+    PointCloudCustomGraphicsPointType = 1
+
+
+class CustomGraphicsGroup(CustomGraphicsEntity):
+    def __init__(self, parent):
+        CustomGraphicsEntity.__init__(self, parent)
+        self._items = []
+        self.id = ''
+
+    def addCurve(self, curve):
+        item = CustomGraphicsCurve(self, curve)
+        self._items.append(item)
+        return item
+
+    def addPointSet(self, coordinates, indexList, pointType, imageFile):
+        item = CustomGraphicsPointSet(self, coordinates, indexList, pointType, imageFile)
+        self._items.append(item)
+        return item
+
+    def addGroup(self):
+        group = CustomGraphicsGroup(self)
+        self._items.append(group)
+        return group
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, i):
+        return self._items[i]
+
+
+class CustomGraphicsGroups(FusionBase):
+    def __init__(self):
+        self._items = []
+
+    def add(self):
+        group = CustomGraphicsGroup(self)
+        self._items.append(group)
+        return group
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, i):
+        return self._items[i]
+
+
+class CustomGraphicsCoordinates(FusionBase):
+    def __init__(self, coordinates):
+        self.coordinates = list(coordinates)
+
+    @staticmethod
+    def create(coordinates):
+        return CustomGraphicsCoordinates(coordinates)
+
+
+class CustomGraphicsSolidColorEffect(FusionBase):
+    @staticmethod
+    def create(color):
+        return CustomGraphicsSolidColorEffect()
+
+
+#==============================================================================
+#  components, occurrences, design
+#==============================================================================
+class ConstructionPlane(FusionBase):
+    def __init__(self, origin, normal):
+        self.geometry = core.Plane(origin, normal)
+
+
+class Component(FusionBase):
+    _ids = itertools.count(1)
+
+    def __init__(self, design, name):
+        self._design = design
+        self.name = name
+        self.id = 'component-{}'.format(next(Component._ids))
+        self._bodies = []
+        self._occurrences = []
+        self.bRepBodies = BRepBodies(self)
+        self.features = Features(self)
+        self.sketches = Sketches(self)
+        self.customGraphicsGroups = CustomGraphicsGroups()
+        self.attributes = Attributes(self)
+        self.xYConstructionPlane = ConstructionPlane(core.Point3D(), core.Vector3D(0, 0, 1))
+        self.xZConstructionPlane = ConstructionPlane(core.Point3D(), core.Vector3D(0, 1, 0))
+
+    @property
+    def parentDesign(self):
+        return self._design
+
+    @property
+    def holeFeatures(self):
+        return self.features.holeFeatures
+
+    @property
+    def occurrences(self):
+        return core.ObjectCollection(self._occurrences)
+
+    @property
+    def allOccurrences(self):
+        result = []
+        for occ in self._occurrences:
+            result.append(occ)
+        return core.ObjectCollection(result)
+
+    def findBRepUsingPoint(self, point, entityType, proximityTolerance=-1.0, visibleEntitiesOnly=True):
+        result = core.ObjectCollection.create()
+        tolerance = proximityTolerance if proximityTolerance > 0 else 1e-7
+        if entityType == BRepEntityTypes.BRepFaceEntityType:
+            for body in self._bodies:
+                for face in body._faces:
+                    if face._contains(point, tolerance):
+                        result.add(face._current())
+        return result
+
+
+class Occurrence(FusionBase):
+    def __init__(self, parentComponent, component, index, transform):
+        self.component = component
+        self.name = '{}:{}'.format(component.name, index)
+        self.transform = transform
+        self.assemblyContext = None
+        self.nativeObject = None
+        self._parent = parentComponent
+        self.isVisible = True
+        self.attributes = Attributes(self)
+
+    @property
+    def isValid(self):
+        return True
+
+    @property
+    def bRepBodies(self):
+        return core.ObjectCollection([b.createForAssemblyContext(self) for b in self.component._bodies])
+
+    @property
+    def entityToken(self):
+        return 'Occurrence/' + self.name
+
+
+class TimelineObject(FusionBase):
+    def __init__(self, timeline, entity):
+        self.parent = timeline
+        self.entity = entity
+        self.name = getattr(entity, 'name', type(entity).__name__)
+        self._suppressed = False
+
+    @property
+    def isSuppressed(self):
+        return self._suppressed
+
+    @isSuppressed.setter
+    def isSuppressed(self, value):
+        if value != self._suppressed:
+            self._suppressed = value
+            for body in getattr(self.entity, '_bodies', ()):
+                body._modified()  # the bodies the feature changed are recomputed
+
+    @property
+    def index(self):
+        return self.parent._items.index(self)
+
+
+class TimelineGroup(FusionBase):
+    def __init__(self, timeline, start, end):
+        self.parent = timeline
+        self.startIndex = start
+        self.endIndex = end
+        self.name = 'Group'
+        self.attributes = Attributes(self)
+
+
+class TimelineGroups(FusionBase):
+    def __init__(self, timeline):
+        self._timeline = timeline
+        self._items = []
+
+    def add(self, startIndex, endIndex):
+        if endIndex < startIndex or endIndex >= self._timeline.count:
+            raise RuntimeError('3 : invalid timeline group range')
+        group = TimelineGroup(self._timeline, startIndex, endIndex)
+        self._items.append(group)
+        return group
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, i):
+        return self._items[i]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+
+class Timeline(FusionBase):
+    def __init__(self, design=None):
+        self._design = design
+        self._items = []
+        self.markerPosition = 0
+        self.timelineGroups = TimelineGroups(self)
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, i):
+        return self._items[i]
+
+    def _addItem(self, entity):
+        item = TimelineObject(self, entity)
+        self._items.insert(self.markerPosition, item)
+        self.markerPosition += 1
+        entity.timelineObject = item
+        return item
+
+    def _removeItem(self, entity):
+        for index, item in enumerate(self._items):
+            if item.entity is entity:
+                del self._items[index]
+                if index < self.markerPosition:
+                    self.markerPosition -= 1
+                return True
+        return False
+
+
+class UserParameter(FusionBase):
+    def __init__(self, parameters, name, expression, units, comment):
+        self._parameters = parameters
+        self.name = name
+        self._expression = expression
+        self.unit = units
+        self.comment = comment
+        self.isFavorite = False
+
+    @property
+    def expression(self):
+        return self._expression
+
+    @expression.setter
+    def expression(self, value):
+        self._expression = value
+
+    @property
+    def value(self):
+        names = {}
+        for parameter in self._parameters._items:
+            if parameter is not self and re.search(r'\b{}\b'.format(parameter.name), self._expression):
+                names[parameter.name] = parameter.value
+        return core._evaluate(self._expression, names)
+
+    @value.setter
+    def value(self, value):
+        self._expression = repr(value)
+
+
+class UserParameters(FusionBase):
+    def __init__(self):
+        self._items = []
+
+    def add(self, name, value, units, comment):
+        expression = value.stringValue if value.stringValue is not None else repr(value.realValue)
+        parameter = UserParameter(self, name, expression, units, comment)
+        self._items.append(parameter)
+        return parameter
+
+    def itemByName(self, name):
+        for parameter in self._items:
+            if parameter.name == name:
+                return parameter
+        return None
+
+    @property
+    def count(self):
+        return len(self._items)
+
+
+class UnitsManager(FusionBase):
+    defaultLengthUnits = 'mm'
+
+
+class Design(FusionBase):
+    def __init__(self):
+        self.timeline = Timeline(self)
+        self.userParameters = UserParameters()
+        self.unitsManager = UnitsManager()
+        self.designType = DesignTypes.ParametricDesignType
+        self.rootComponent = Component(self, 'root')
+        self._components = [self.rootComponent]
+        self.attributes = Attributes(self)
+
+    @property
+    def activeComponent(self):
+        return self.rootComponent
+
+    @property
+    def allComponents(self):
+        return core.ObjectCollection(self._components)
+
+    def addComponent(self, name, transforms=()):
+        component = Component(self, name)
+        self._components.append(component)
+        for index, transform in enumerate(transforms, 1):
+            occurrence = Occurrence(self.rootComponent, component, index, transform)
+            component._occurrences.append(occurrence)
+            self.rootComponent._occurrences.append(occurrence)
+        return component
+
+    def findEntityByToken(self, token):
+        (kind, _, rest) = token.partition('/')
+        (entityToken, _, occName) = rest.partition('@')
+        occurrence = None
+        if occName:
+            for occ in self.rootComponent._occurrences:
+                if occ.name == occName:
+                    occurrence = occ
+        for component in self._components:
+            for body in component._bodies:
+                if kind == 'BRepBody':
+                    entity = body if str(body._token) == entityToken and body._valid else None
+                else:
+                    entity = body._entityByToken(kind, entityToken)
+                if entity is not None:
+                    return [entity.createForAssemblyContext(occurrence) if occurrence else entity]
+        return []
+
+    def findAttributes(self, groupName, attributeName):
+        return [a for a in Attributes._registry
+                if a.groupName == groupName and (not attributeName or a.name == attributeName) and _parentDesign(a.parent) is self]
+
+
+def _parentDesign(entity):
+    '''
+    the design an attribute's parent belongs to - findAttributes only searches its own design
+    '''
+    if isinstance(entity, Design):
+        return entity
+    if isinstance(entity, Component):
+        return entity._design
+    if isinstance(entity, TimelineGroup):
+        return entity.parent._design
+    component = getattr(entity, 'parentComponent', None)
+    return component._design if component is not None else None
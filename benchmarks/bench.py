@@ -0,0 +1,162 @@
+# Benchmarks for the Dogbone add-in, run outside Fusion against the adsk stand-in (benchmarks/adsk).
+# Each benchmark runs on a synthetic plate (see synthetic.py) with about the given number of edges:
+#
+#   python benchmarks/bench.py                          # 10, 1k and 50k edges
+#   python benchmarks/bench.py --edges 1000 --repeat 5 --json bench.json
+#   python benchmarks/bench.py --only onChange,getTopFace
+#
+# Times are the best of --repeat runs, in seconds. The stand-in is plain python, so absolute times don't compare with
+# Fusion - compare runs of the same benchmark (e.g. before and after a change, on the same machine) to catch regressions.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import adsk.core
+import harness
+import synthetic
+
+EDGES = (10, 1000, 50000)
+
+
+def plateSession(module, pockets, mode = 'Static'):
+    design = synthetic.createDesign(pockets)
+    session = harness.Session(module, design)
+    session.set('modeRow', mode)
+    session.set('dogboneType', 'Normal Dogbone')
+    session.set('depthExtent', 'From Selected Face')
+    return (session, synthetic.topFaces(design)[0])
+
+
+def clearCaches(module):
+    '''
+    drops the add-in's cached topology, face geometry and corner edges, so every run starts cold
+    '''
+    dbUtils = sys.modules[module.__package__ + '.dbutils']
+    dbUtils.topologyCache.clear()
+    dbUtils.faceGeometryCache.clear()
+    module.dog.cornerEdgeCache.clear()
+    return dbUtils
+
+
+#==============================================================================
+#  benchmarks - each sets up its own design, and returns the time of the part being measured
+#==============================================================================
+def benchSelectedFace(module, pockets):
+    (session, face) = plateSession(module, pockets)
+    clearCaches(module)
+    start = time.perf_counter()
+    module.SelectedFace(session.dog, face, '{}:{}'.format(face.tempId, face.body.name), face.tempId, face.body.name, face.pointOnFace, None)
+    return time.perf_counter() - start
+
+
+def benchOnChange(module, pockets):
+    (session, face) = plateSession(module, pockets)
+    clearCaches(module)
+    start = time.perf_counter()
+    session.selectFace(face)
+    return time.perf_counter() - start
+
+
+def benchReopen(module, pockets):
+    '''
+    selects the face again in a second command on the unchanged design - as reopening the dialog does
+    '''
+    (session, face) = plateSession(module, pockets)
+    clearCaches(module)
+    session.selectFace(face)
+    session.command.destroy.fire(adsk.core.CommandEventArgs(session.command))
+    session = harness.Session(module, session.design)
+    start = time.perf_counter()
+    session.selectFace(face)
+    return time.perf_counter() - start
+
+
+def benchOnFaceSelect(module, pockets):
+    '''
+    hovers over every face of the plate, with its top face selected
+    '''
+    (session, face) = plateSession(module, pockets)
+    session.selectFace(face)
+    faces = list(face.body.faces)
+    start = time.perf_counter()
+    for hoverFace in faces:
+        session.hover('select', hoverFace)
+    return time.perf_counter() - start
+
+
+def benchGetTopFace(module, pockets):
+    '''
+    finds the top face from every planar face of the plate
+    '''
+    (session, face) = plateSession(module, pockets)
+    faces = [planarFace for planarFace in face.body.faces if planarFace.geometry.objectType == adsk.core.Plane.classType()]
+    dbUtils = clearCaches(module)
+    start = time.perf_counter()
+    for planarFace in faces:
+        dbUtils.getTopFace(planarFace)
+    return time.perf_counter() - start
+
+
+def benchCreate(mode):
+    def bench(module, pockets):
+        (session, face) = plateSession(module, pockets, mode)
+        session.selectFace(face)
+        start = time.perf_counter()
+        session.execute()
+        return time.perf_counter() - start
+    return bench
+
+
+BENCHMARKS = (('selectedFace', benchSelectedFace),
+              ('onChange', benchOnChange),
+              ('reopen', benchReopen),
+              ('onFaceSelect', benchOnFaceSelect),
+              ('getTopFace', benchGetTopFace),
+              ('createStatic', benchCreate('Static')),
+              ('createParametric', benchCreate('Parametric')))
+
+
+def run(edgeCounts = EDGES, repeat = 3, only = None, output = sys.stdout):
+    '''
+    runs the benchmarks - returns a list of {'benchmark', 'edges', 'best', 'mean', 'runs'}
+    '''
+    module = harness.loadAddin()
+    ui = adsk.core.Application.get().userInterface
+    results = []
+    for edges in edgeCounts:
+        pockets = synthetic.pocketsForEdges(edges)
+        plateEdges = 12 + 12 * pockets
+        for (name, bench) in BENCHMARKS:
+            if only and name not in only:
+                continue
+            del ui.messages[:]
+            times = [bench(module, pockets) for run in range(repeat)]
+            result = {'benchmark': name, 'edges': plateEdges, 'best': min(times), 'mean': sum(times) / len(times), 'runs': repeat}
+            results.append(result)
+            output.write('{:<18} {:>7} edges  best {:>9.4f}s  mean {:>9.4f}s{}\n'.format(
+                name, plateEdges, result['best'], result['mean'], '  messages: {}'.format(len(ui.messages)) if ui.messages else ''))
+            output.flush()
+    return results
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Dogbone add-in benchmarks, against the adsk stand-in')
+    parser.add_argument('--edges', default = ','.join(str(edges) for edges in EDGES), help = 'comma separated plate sizes, in edges')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'runs per benchmark - the best is reported')
+    parser.add_argument('--only', help = 'comma separated benchmark names: ' + ', '.join(name for (name, bench) in BENCHMARKS))
+    parser.add_argument('--json', help = 'also write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = run([int(edges) for edges in args.edges.split(',')], args.repeat, args.only.split(',') if args.only else None)
+    if args.json:
+        with open(args.json, 'w', encoding = 'UTF-8') as jsonFile:
+            json.dump(results, jsonFile, indent = 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Drives the Dogbone add-in against the adsk stand-in (benchmarks/adsk): loads a copy of the add-in as a package,
+# opens the command dialog, selects faces and executes - the same events Fusion fires.
+# The add-in is copied to a temporary directory, so that defaults.dat and dogbone.log in the repo are left alone.
+
+import atexit
+import importlib
+import importlib.machinery
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)  # the stand-in adsk package
+
+import adsk.core
+import adsk.fusion
+
+ADDIN = os.path.dirname(HERE)
+
+
+def loadAddin(root = ADDIN, name = 'dogbone'):
+    '''
+    returns the add-in's DogBone2 module, imported from a copy of root as package name
+    '''
+    if name in sys.modules:
+        return sys.modules[name + '.DogBone2']
+    tempDir = tempfile.mkdtemp(prefix = 'dogbone')
+    atexit.register(shutil.rmtree, tempDir, True)
+    workDir = os.path.join(tempDir, name)
+    shutil.copytree(root, workDir, ignore = shutil.ignore_patterns('.git', '__pycache__', 'benchmarks', '*.log'))
+    spec = importlib.machinery.ModuleSpec(name, None, is_package = True)
+    package = importlib.util.module_from_spec(spec)
+    package.__path__ = [workDir]
+    sys.modules[name] = package
+    return importlib.import_module(name + '.DogBone2')
+
+
+class Session(object):
+    '''
+    one run of the Dogbone command dialog, on design
+    '''
+    def __init__(self, module, design):
+        self.module = module
+        self.dog = module.dog
+        self.design = design
+        self.command = adsk.core.Command()
+        self.dog.onCreate(adsk.core.CommandCreatedEventArgs(self.command))
+        self.inputs = self.command.commandInputs
+
+    def input(self, inputId):
+        return self.inputs.itemById(inputId)
+
+    def change(self, changedInput):
+        self.command.inputChanged.fire(adsk.core.InputChangedEventArgs(self.command, changedInput))
+
+    def set(self, inputId, value):
+        '''
+        sets a value input, or selects the list item named value
+        '''
+        changedInput = self.input(inputId)
+        if hasattr(changedInput, 'listItems'):
+            for item in changedInput.listItems:
+                if item.name == value:
+                    item.isSelected = True
+        else:
+            changedInput.value = value
+        self.change(changedInput)
+
+    def selectFace(self, face):
+        select = self.input('select')
+        select.addSelection(face)
+        self.change(select)
+
+    def unselectFace(self, face):
+        select = self.input('select')
+        for index in range(select.selectionCount):
+            if select.selection(index).entity is face:
+                select.removeSelection(index)
+                break
+        self.change(select)
+
+    def unselectEdge(self, edge):
+        edgeSelect = self.input('edgeSelect')
+        for index in range(edgeSelect.selectionCount):
+            if edgeSelect.selection(index).entity is edge:
+                edgeSelect.removeSelection(index)
+                break
+        self.command.unselect.fire(adsk.core.SelectionEventArgs(self.command, edgeSelect, edge))
+        self.change(edgeSelect)
+
+    def hover(self, inputId, entity):
+        '''
+        fires the selection event Fusion sends while the mouse is over entity - returns isSelectable
+        '''
+        args = adsk.core.SelectionEventArgs(self.command, self.input(inputId), entity)
+        self.command.selectionEvent.fire(args)
+        return args.isSelectable
+
+    def execute(self):
+        args = adsk.core.CommandEventArgs(self.command)
+        self.command.execute.fire(args)
+        return args
+
+    def preview(self):
+        args = adsk.core.CommandEventArgs(self.command)
+        self.command.executePreview.fire(args)
+        return args
+
+    @property
+    def messages(self):
+        '''
+        message boxes shown so far
+        '''
+        return adsk.core.Application.get().userInterface.messages
@@ -0,0 +1,92 @@
+# Synthetic designs for benchmarking the Dogbone add-in against the adsk stand-in.
+# A plate body has pockets rectangular pockets cut into its top face, laid out on a grid. Pocket depths cycle
+# through depths, so there are several floor heights (step heights). Each plate body has 12 + 12 * pockets edges.
+
+import math
+
+import adsk.core
+import adsk.fusion
+
+
+def _rect(x0, y0, x1, y1, z):
+    return [(x0, y0, z), (x1, y0, z), (x1, y1, z), (x0, y1, z)]
+
+
+def buildPlate(component, name, pockets, thickness = 1.8, pocketSize = 2.0, pitch = 3.0, depths = (0.6, 0.9, 1.2)):
+    columns = max(1, int(math.ceil(math.sqrt(pockets))))
+    rows = max(1, int(math.ceil(pockets / float(columns))))
+    width = columns * pitch + 1.0
+    height = rows * pitch + 1.0
+    builder = adsk.fusion.BodyBuilder(name, component)
+
+    pocketRects = []
+    for index in range(pockets):
+        (row, column) = divmod(index, columns)
+        x0 = 1.0 + column * pitch
+        y0 = 1.0 + row * pitch
+        pocketRects.append((x0, y0, x0 + pocketSize, y0 + pocketSize, depths[index % len(depths)]))
+
+    top = thickness
+    builder.addFace([_rect(0, 0, width, height, top)] + [_rect(x0, y0, x1, y1, top) for (x0, y0, x1, y1, d) in pocketRects], (0, 0, 1))
+    builder.addFace([_rect(0, 0, width, height, 0)], (0, 0, -1))
+    builder.addFace([[(0, 0, 0), (width, 0, 0), (width, 0, top), (0, 0, top)]], (0, -1, 0))
+    builder.addFace([[(0, height, 0), (width, height, 0), (width, height, top), (0, height, top)]], (0, 1, 0))
+    builder.addFace([[(0, 0, 0), (0, height, 0), (0, height, top), (0, 0, top)]], (-1, 0, 0))
+    builder.addFace([[(width, 0, 0), (width, height, 0), (width, height, top), (width, 0, top)]], (1, 0, 0))
+
+    for (x0, y0, x1, y1, depth) in pocketRects:
+        floor = top - depth
+        builder.addFace([_rect(x0, y0, x1, y1, floor)], (0, 0, 1))
+        builder.addFace([[(x0, y0, floor), (x0, y1, floor), (x0, y1, top), (x0, y0, top)]], (1, 0, 0))
+        builder.addFace([[(x1, y0, floor), (x1, y1, floor), (x1, y1, top), (x1, y0, top)]], (-1, 0, 0))
+        builder.addFace([[(x0, y0, floor), (x1, y0, floor), (x1, y0, top), (x0, y0, top)]], (0, 1, 0))
+        builder.addFace([[(x0, y1, floor), (x1, y1, floor), (x1, y1, top), (x0, y1, top)]], (0, -1, 0))
+
+    body = builder.build()
+    component._bodies.append(body)
+    return body
+
+
+def pocketsForEdges(edges):
+    '''
+    returns the number of pockets for a plate with about edges edges
+    '''
+    return max(1, int(round((edges - 12) / 12.0)))
+
+
+def createDesign(pockets = 1, occurrences = 0, bodies = 1):
+    '''
+    creates a new design, and makes it the active product
+    occurrences - 0 puts the plates in the root component, otherwise a 'Plate' component is instanced occurrences times,
+    each translated along x
+    '''
+    app = adsk.core.Application.get()
+    design = adsk.fusion.Design()
+    app.activeProduct = design
+    adsk.fusion.Attributes._registry[:] = []
+    if occurrences:
+        transforms = []
+        for index in range(occurrences):
+            matrix = adsk.core.Matrix3D.create()
+            matrix.translation = adsk.core.Vector3D.create(index * 1000.0, 0, 0)
+            transforms.append(matrix)
+        component = design.addComponent('Plate', transforms)
+    else:
+        component = design.rootComponent
+    for index in range(bodies):
+        buildPlate(component, 'Body{}'.format(index + 1), pockets)
+    return design
+
+
+def topFaces(design):
+    '''
+    returns the top face of every plate body - in its assembly context, for plates in occurrences
+    '''
+    faces = []
+    root = design.rootComponent
+    for body in root._bodies:
+        faces.append(body.faces.item(0))
+    for occurrence in root._occurrences:
+        for body in occurrence.component._bodies:
+            faces.append(body.faces.item(0).createForAssemblyContext(occurrence))
+    return faces
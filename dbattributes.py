@@ -0,0 +1,157 @@
+# Dogbone attributes - everything a run of the command adds to the design is tagged (attribute group DOGBONEGROUP),
+# so that the next run can find the dogbones already there and only change the ones that need it (dbPlanner.diffPlan).
+#
+#   features (hole, base and combine features) - ID: the unit the feature belongs to, REV_ID: the run, FACE_ID: entity tokens
+#       of the faces its dogbones came from, DOGBONES: their dbPlanner.dogboneKey, SETTINGS, SKETCH: the sketch its holes are on
+#   sketches - SKETCH_ID
+#   timeline groups - REV_ID, SETTINGS
+#   the design - REV_ID: the last run
+#
+# A unit is the features that are kept or removed together: a hole feature, or the base feature and combine cuts of
+# an occurrence's tool bodies (removing one cut would leave its tool body behind).
+# Attribute values are strings - lists and settings are stored as JSON.
+
+import json
+from collections import namedtuple
+
+from . import dbplanner as dbPlanner
+from . import dblogging as dbLogging
+
+#constants - to keep attribute group and names consistent
+DOGBONEGROUP = 'dogBoneGroup'
+FACE_ID = 'faceID'
+REV_ID = 'revId'
+ID = 'id'
+DOGBONES = 'dogbones'
+SETTINGS = 'settings'
+SKETCH = 'sketch'
+SKETCH_ID = 'sketchId'
+
+logger = dbLogging.getLogger(__name__)
+
+#  features - the unit's features, in the order they were made
+#  keys - [dbPlanner.dogboneKey, ...] of its dogbones
+#  sketches - {sketch id, ...} its holes are on
+Unit = namedtuple('Unit', ['features', 'keys', 'sketches'])
+
+
+def nextRevision(design):
+    '''
+    returns the revision id of a new run on design - one more than the last
+    '''
+    attribute = design.attributes.itemByName(DOGBONEGROUP, REV_ID)
+    revision = int(attribute.value) + 1 if attribute else 1
+    design.attributes.add(DOGBONEGROUP, REV_ID, str(revision))
+    return revision
+
+
+def findUnits(design):
+    '''
+    returns {unit id: Unit} for the dogbone features in design
+    '''
+    units = {}
+    for attribute in design.findAttributes(DOGBONEGROUP, ID):
+        feature = attribute.parent
+        if feature is None or not feature.isValid:
+            continue
+        unit = units.setdefault(attribute.value, Unit([], [], set()))
+        unit.features.append(feature)
+        keys = feature.attributes.itemByName(DOGBONEGROUP, DOGBONES)
+        if keys:
+            unit.keys.extend(tuple(key) for key in json.loads(keys.value))
+        sketch = feature.attributes.itemByName(DOGBONEGROUP, SKETCH)
+        if sketch:
+            unit.sketches.add(sketch.value)
+    return units
+
+
+def unitsOnBody(units, occurrence, bodyName):
+    '''
+    returns {unit id: Unit} for the units of units with dogbones on a body - occurrence as in dbPlanner.Dogbone
+    '''
+    return {unitId: unit for (unitId, unit) in units.items() if any(key[1:3] == (occurrence, bodyName) for key in unit.keys)}
+
+
+def suppress(units, isSuppressed = True):
+    '''
+    suppresses (or unsuppresses) the features of units - suppressed, the corners they cut are back
+    '''
+    for unit in units:
+        for feature in unit.features:
+            if feature.isValid and feature.timelineObject:
+                feature.timelineObject.isSuppressed = isSuppressed
+
+
+def remove(design, units, keptUnits):
+    '''
+    deletes the features of units, and the sketches none of keptUnits still use
+    '''
+    sketches = set()
+    for unit in units:
+        logger.info('removing {} dogbone features - {} dogbones', len(unit.features), len(unit.keys))
+        for feature in reversed(unit.features):  # combine cuts before the base feature holding their tool bodies
+            if feature.isValid:
+                feature.deleteMe()
+        sketches.update(unit.sketches)
+    for unit in keptUnits:
+        sketches.difference_update(unit.sketches)
+    if not sketches:
+        return
+    for attribute in design.findAttributes(DOGBONEGROUP, SKETCH_ID):
+        if attribute.value in sketches and attribute.parent is not None:
+            sketches.discard(attribute.value)
+            attribute.parent.deleteMe()
+
+
+class RunTags(object):
+    '''
+    tags what one run of the command adds to design - see the module notes. Disabled (enabled = False),
+    nothing is tagged, e.g. for previews
+    mode - 'Static', 'Parametric' or 'Tool Body', as keyed by dbPlanner.dogboneKey
+    settings - JSON-able dict of the run's settings
+    '''
+    def __init__(self, design, mode, settings, enabled = True):
+        self.enabled = enabled and design is not None
+        self.mode = mode
+        self.revision = nextRevision(design) if self.enabled else None
+        self.settings = json.dumps(settings)
+        self.units = 0
+        self.sketches = 0
+
+    def newUnit(self):
+        self.units += 1
+        return '{}.{}'.format(self.revision, self.units)
+
+    def tagSketch(self, sketch):
+        '''
+        returns the sketch id, for tagFeature
+        '''
+        if not self.enabled:
+            return None
+        self.sketches += 1
+        sketchId = '{}.s{}'.format(self.revision, self.sketches)
+        sketch.attributes.add(DOGBONEGROUP, SKETCH_ID, sketchId)
+        return sketchId
+
+    def tagFeature(self, feature, unitId, dogbones, sketchId = None):
+        '''
+        feature - made by unit unitId (see newUnit) for dogbones.
+        The faces are tagged with the tokens taken when the dogbones were planned (dbPlanner.CornerRefs.tokens) -
+        by now, the features added have invalidated them
+        '''
+        if not self.enabled:
+            return
+        attributes = feature.attributes
+        attributes.add(DOGBONEGROUP, ID, unitId)
+        attributes.add(DOGBONEGROUP, REV_ID, str(self.revision))
+        attributes.add(DOGBONEGROUP, FACE_ID, json.dumps(sorted(set(dogbone.corner.refs.tokens.face for dogbone in dogbones))))
+        attributes.add(DOGBONEGROUP, DOGBONES, json.dumps([dbPlanner.dogboneKey(dogbone, self.mode) for dogbone in dogbones]))
+        attributes.add(DOGBONEGROUP, SETTINGS, self.settings)
+        if sketchId:
+            attributes.add(DOGBONEGROUP, SKETCH, sketchId)
+
+    def tagGroup(self, timelineGroup):
+        if not self.enabled:
+            return
+        timelineGroup.attributes.add(DOGBONEGROUP, REV_ID, str(self.revision))
+        timelineGroup.attributes.add(DOGBONEGROUP, SETTINGS, self.settings)
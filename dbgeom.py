@@ -0,0 +1,134 @@
+# Dogbone geometry - small, pure python vectors, points and planes for the intermediate maths.
+# Every adsk.core.Vector3D/Point3D operation (copy, add, normalize, scaleBy, translateBy ...) is a SWIG allocation and call -
+# these types are plain tuples, so the maths is done in python and only results cross the API, e.g.
+# adsk.core.Point3D.create(*point). They're interchangeable with the planner's (x, y, z) tuples.
+# Unlike their adsk counterparts they're immutable - operations return a new Vector or Point.
+# The batch functions do the same on numpy arrays of vectors (one per row), when numpy is available.
+
+import math
+from collections import namedtuple
+
+try:
+    import numpy as np  # not bundled with Fusion - only the batch functions need it
+except ImportError:
+    np = None
+
+TOLERANCE = 1e-9  # as dbutils.ANGLE_TOLERANCE
+
+
+class Vector(namedtuple('Vector', ['x', 'y', 'z'])):
+    __slots__ = ()
+
+    @classmethod
+    def fromAdsk(cls, entity):
+        '''
+        from an adsk.core.Vector3D or Point3D - one API call
+        '''
+        return cls(*entity.asArray())
+
+    def asArray(self):
+        return tuple(self)
+
+    @property
+    def length(self):
+        return math.sqrt(self[0] * self[0] + self[1] * self[1] + self[2] * self[2])
+
+    def add(self, other):
+        return Vector(self[0] + other[0], self[1] + other[1], self[2] + other[2])
+
+    def subtract(self, other):
+        return Vector(self[0] - other[0], self[1] - other[1], self[2] - other[2])
+
+    def scaledBy(self, factor):
+        return Vector(self[0] * factor, self[1] * factor, self[2] * factor)
+
+    def normalized(self):
+        return self.scaledBy(1 / self.length)
+
+    def dotProduct(self, other):
+        return self[0] * other[0] + self[1] * other[1] + self[2] * other[2]
+
+    def crossProduct(self, other):
+        return Vector(self[1] * other[2] - self[2] * other[1],
+                      self[2] * other[0] - self[0] * other[2],
+                      self[0] * other[1] - self[1] * other[0])
+
+    def isParallelTo(self, other):
+        return self.crossProduct(other).length <= TOLERANCE * self.length * Vector(*other).length
+
+    def isPerpendicularTo(self, other):
+        return abs(self.dotProduct(other)) <= TOLERANCE * self.length * Vector(*other).length
+
+
+class Point(namedtuple('Point', ['x', 'y', 'z'])):
+    __slots__ = ()
+
+    @classmethod
+    def fromAdsk(cls, entity):
+        return cls(*entity.asArray())
+
+    def asArray(self):
+        return tuple(self)
+
+    def vectorTo(self, other):
+        return Vector(other[0] - self[0], other[1] - self[1], other[2] - self[2])
+
+    def translatedBy(self, vector):
+        return Point(self[0] + vector[0], self[1] + vector[1], self[2] + vector[2])
+
+    def distanceTo(self, other):
+        return self.vectorTo(other).length
+
+
+class Plane(namedtuple('Plane', ['origin', 'normal'])):
+    '''
+    origin - Point, normal - unit Vector
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def fromAdsk(cls, plane):
+        return cls(Point.fromAdsk(plane.origin), Vector.fromAdsk(plane.normal))
+
+    def signedDistanceTo(self, point):
+        '''
+        distance from the plane to point, along normal
+        '''
+        return self.origin.vectorTo(point).dotProduct(self.normal)
+
+    def intersectWithLine(self, point, direction):
+        '''
+        returns the Point where the line through point along direction meets the plane - None if they're parallel
+        '''
+        along = self.normal.dotProduct(direction)
+        if abs(along) <= TOLERANCE:
+            return None
+        return Point(*point).translatedBy(Vector(*direction).scaledBy(-self.signedDistanceTo(point) / along))
+
+
+#==============================================================================
+#  batch variants - arrays with a vector (or point) per row
+#==============================================================================
+def toArray(vectors):
+    return np.array(vectors, dtype=float).reshape(-1, 3)
+
+
+def lengths(vectors):
+    return np.linalg.norm(vectors, axis=1)
+
+
+def normalizeRows(vectors):
+    return vectors / lengths(vectors)[:, None]
+
+
+def dotRows(vectors, others):
+    '''
+    row by row dot products - others may also be a single vector
+    '''
+    if np.ndim(others) == 1:
+        return vectors.dot(others)
+    return np.einsum('ij,ij->i', vectors, others)
+
+
+def crossRows(vectors, others):
+    return np.cross(vectors, others)
@@ -0,0 +1,114 @@
+# Dogbone logging - lazily formatted messages, written to a rotating dogbone.log by one writer thread.
+#
+#     logger = dbLogging.getLogger(__name__)
+#     logger.debug('Processing edge - {0.tempId}', edge)
+#
+# Messages use str.format fields, like the rest of the add-in, but are only formatted if the level is enabled - and
+# attribute fields ({0.tempId}, {0.isValid}) are only read then, so disabled debug lines make no API calls.
+# Payloads that need method calls (asArray() ...) go behind logger.isEnabledFor(logging.DEBUG).
+# Records are formatted on the calling thread (the Fusion API isn't thread safe), and handed through a queue to a
+# QueueListener thread that does the file I/O - the UI thread never waits on the log file.
+
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = '%(asctime)s ; %(name)s ; %(levelname)s ; %(lineno)d; %(message)s'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3  # dogbone.log.1 ... - the logs of earlier runs
+
+_adapters = {}  # logger name: BraceAdapter
+
+
+class BraceMessage(object):
+    __slots__ = ('message', 'args')
+
+    def __init__(self, message, args):
+        self.message = message
+        self.args = args
+
+    def __str__(self):
+        return self.message.format(*self.args) if self.args else self.message
+
+
+class BraceAdapter(logging.LoggerAdapter):
+    '''
+    logger with str.format style, lazily formatted, messages - see getLogger
+    '''
+    def __init__(self, logger):
+        super().__init__(logger, None)
+
+    def log(self, level, message, *args, **kwargs):
+        if self.isEnabledFor(level):
+            kwargs.setdefault('stacklevel', 2)  # the line number logged is the caller's, not this method's
+            self.logger._log(level, BraceMessage(message, args), (), **kwargs)
+
+
+def getLogger(name):
+    adapter = _adapters.get(name)
+    if adapter is None:
+        adapter = _adapters[name] = BraceAdapter(logging.getLogger(name))
+    return adapter
+
+
+class LogWriter(object):
+    '''
+    The add-in's log: one QueueHandler on the package logger, feeding a QueueListener that writes to a
+    RotatingFileHandler. The writer thread runs from start() to close(). start() again begins a new log -
+    the previous one is kept as dogbone.log.1
+    '''
+    def __init__(self, packageName):
+        self.packageLogger = logging.getLogger(packageName)
+        self.queue = queue.Queue(-1)
+        self.queueHandler = logging.handlers.QueueHandler(self.queue)
+        self.fileHandler = None
+        self.listener = None
+
+    @property
+    def isRunning(self):
+        return self.listener is not None
+
+    def start(self, logPath, level):
+        '''
+        starts a new log at logPath, at level
+        '''
+        self.stop()
+        if self.fileHandler is None or self.fileHandler.baseFilename != os.path.abspath(logPath):
+            self.closeFile()
+            self.fileHandler = logging.handlers.RotatingFileHandler(logPath, maxBytes = LOG_MAX_BYTES, backupCount = LOG_BACKUPS,
+                                                                    encoding = 'UTF-8', delay = True)
+            self.fileHandler.setFormatter(logging.Formatter(LOG_FORMAT))
+        if os.path.isfile(logPath) and os.path.getsize(logPath):
+            self.fileHandler.doRollover()
+        self.listener = logging.handlers.QueueListener(self.queue, self.fileHandler)
+        self.listener.start()
+        if self.queueHandler not in self.packageLogger.handlers:
+            self.packageLogger.addHandler(self.queueHandler)
+        self.setLevel(level)
+
+    def setLevel(self, level):
+        self.packageLogger.setLevel(level)
+
+    def stop(self):
+        '''
+        writes out everything queued, and stops the writer thread
+        '''
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        if self.fileHandler is not None:
+            self.fileHandler.flush()
+
+    def closeFile(self):
+        if self.fileHandler is not None:
+            self.fileHandler.close()
+            self.fileHandler = None
+
+    def close(self):
+        '''
+        stops the writer thread, detaches from the package logger and closes the log file - when the add-in stops
+        '''
+        self.stop()
+        self.packageLogger.removeHandler(self.queueHandler)
+        self.closeFile()
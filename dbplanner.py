@@ -0,0 +1,182 @@
+# Dogbone planning - the geometry of each dogbone, worked out before anything is added to the design.
+# The planner turns Corner records (the corner geometry read from the selection model) into Dogbone records.
+# It's plain python - points and vectors are (x, y, z) tuples (dbgeom) - so a plan can be benchmarked, cached and
+# computed without Fusion. The API objects a corner came from travel along untouched, in Corner.refs,
+# for the engines that execute the plan.
+
+from collections import namedtuple
+
+from . import dbgeom as dbGeom
+
+#  occurrence - selectedOccurrences key the corner belongs to
+#  vertex - corner point, on the selected face
+#  faceNormals - normals of the two faces either side of the dogbone edge
+#  cornerEdges - ((direction, length), (direction, length)) of the two face edges at the corner, directed away from vertex - None if unknown
+#  edgeLength - length of the dogbone edge
+#  planeNormal - selected face normal
+#  topShift - vector from the selected face to the top face, or None if dogbones start at the selected face
+#  refs - CornerRefs, never used by the planner
+Corner = namedtuple('Corner', ['occurrence', 'vertex', 'faceNormals', 'cornerEdges', 'edgeLength', 'planeNormal', 'topShift', 'refs'])
+
+#  component, face, edge, cornerEdges (BRepEdge, BRepEdge) or None, body, plane - the face holes start from
+#  tokens - RefTokens of the same entities, taken before anything was added to the design - so that the engines can find
+#  them again once a feature has invalidated them
+CornerRefs = namedtuple('CornerRefs', ['component', 'face', 'edge', 'cornerEdges', 'body', 'plane', 'tokens'])
+
+#  face, edge, cornerEdges (token, token) or None, body, plane - entity tokens of the native entities
+#  planePoint - (x, y, z) on plane, in component space - to find the plane by point if its token no longer resolves
+RefTokens = namedtuple('RefTokens', ['face', 'edge', 'cornerEdges', 'body', 'plane', 'planePoint'])
+
+DogboneSettings = namedtuple('DogboneSettings', ['dbType', 'radius', 'minimalPercent', 'longside'])
+
+#  centre - where the dogbone axis meets the target plane
+#  axis - unit vector, pointing into the material
+#  onEdge - Mortise dogbones sit on one of the corner edges: its index in cornerEdges, otherwise None
+#  body, plane - target body and target plane (API objects, from corner.refs)
+Dogbone = namedtuple('Dogbone', ['occurrence', 'centre', 'axis', 'radius', 'depth', 'body', 'plane', 'onEdge', 'corner'])
+
+
+def centreDistance(settings):
+    return settings.radius * (1 + settings.minimalPercent / 100 if settings.dbType == 'Minimal Dogbone' else 1)
+
+
+def planDogbone(corner, settings):
+    distance = centreDistance(settings)
+    onEdge = None
+    if settings.dbType == 'Mortise Dogbone':
+        ((direction0, length0), (direction1, length1)) = corner.cornerEdges
+        onEdge = 0 if (length0 > length1) == settings.longside else 1
+        direction = dbGeom.Vector(*corner.cornerEdges[onEdge][0])
+    else:
+        direction = dbGeom.Vector(*corner.faceNormals[0]).add(corner.faceNormals[1])
+    centre = dbGeom.Point(*corner.vertex).translatedBy(direction.normalized().scaledBy(distance))
+    depth = corner.edgeLength
+    if corner.topShift:
+        centre = centre.translatedBy(corner.topShift)
+        depth += dbGeom.Vector(*corner.topShift).length
+    return Dogbone(corner.occurrence, centre, dbGeom.Vector(*corner.planeNormal).scaledBy(-1), settings.radius, depth,
+                   corner.refs.body if corner.refs else None, corner.refs.plane if corner.refs else None, onEdge, corner)
+
+
+def planDogbones(corners, settings):
+    '''
+    returns the plan - a tuple of Dogbone records, one per corner, in corner order
+    '''
+    return tuple(planDogbone(corner, settings) for corner in corners)
+
+
+def groupByOccurrence(plan):
+    '''
+    returns [(occurrence, [dogbone, ...]), ...] in the order each occurrence first appears in plan
+    '''
+    groups = {}
+    for dogbone in plan:
+        groups.setdefault(dogbone.occurrence, []).append(dogbone)
+    return list(groups.items())
+
+
+#==============================================================================
+#  saved plans - a compact, versioned JSON form of a plan, so it can be replayed without selecting anything.
+#  API references are stored as keys (entity tokens, names and points), made by the caller -
+#  the planner never looks at the design.
+#==============================================================================
+PLAN_FORMAT = 'dogbonePlan'
+PLAN_VERSION = 1
+PLAN_FIELDS = ('edge', 'centre', 'axis', 'radius', 'depth', 'onEdge', 'body', 'bodyName', 'face', 'plane', 'planePoint', 'cornerEdges')
+
+
+def _rounded(values, digits = 9):
+    return [round(value, digits) for value in values]
+
+
+def planToData(plan, settings, options, dogboneKeys):
+    '''
+    returns plan as JSON-able data
+    options - dict of the command settings needed to replay the plan (mode, fromTop, ...)
+    dogboneKeys(dogbone) - returns (component name, {'edge', 'body', 'bodyName', 'face', 'plane', 'planePoint', 'cornerEdges'}) 
+    '''
+    occurrences = []
+    for (occurrence, dogbones) in groupByOccurrence(plan):
+        rows = []
+        component = None
+        for dogbone in dogbones:
+            (component, keys) = dogboneKeys(dogbone)
+            rows.append([keys['edge'], _rounded(dogbone.centre), _rounded(dogbone.axis), dogbone.radius, dogbone.depth, dogbone.onEdge,
+                         keys['body'], keys['bodyName'], keys['face'], keys['plane'], _rounded(keys['planePoint']), keys['cornerEdges']])
+        occurrences.append({'name': occurrence, 'component': component, 'dogbones': rows})
+    return {'format': PLAN_FORMAT,
+            'version': PLAN_VERSION,
+            'settings': settings._asdict(),
+            'options': options,
+            'fields': list(PLAN_FIELDS),
+            'occurrences': occurrences}
+
+
+def planFromData(data, resolveRefs):
+    '''
+    returns (plan, settings, options) from data written by planToData
+    resolveRefs(component name, keys) - returns the CornerRefs for a saved dogbone, or None if it can't be found - those are left out
+    raises ValueError if data isn't a dogbone plan this version can read
+    '''
+    if data.get('format') != PLAN_FORMAT:
+        raise ValueError('Not a dogbone plan')
+    if data.get('version', 0) > PLAN_VERSION:
+        raise ValueError('Dogbone plan version {} is newer than this add-in can read ({})'.format(data.get('version'), PLAN_VERSION))
+    settings = DogboneSettings(**data['settings'])
+    fields = data['fields']
+    plan = []
+    for occurrence in data['occurrences']:
+        for row in occurrence['dogbones']:
+            keys = dict(zip(fields, row))
+            refs = resolveRefs(occurrence['component'], keys)
+            if refs is None:
+                continue
+            corner = Corner(occurrence['name'], None, None, None, None, None, None, refs)
+            plan.append(Dogbone(occurrence['name'], tuple(keys['centre']), tuple(keys['axis']), keys['radius'], keys['depth'],
+                                refs.body, refs.plane, keys['onEdge'], corner))
+    return (tuple(plan), settings, data['options'])
+
+
+#==============================================================================
+#  regeneration - the dogbones of earlier runs (see dbAttributes) are matched with a new plan by key,
+#  so that running the command again only removes and adds the dogbones that have changed
+#==============================================================================
+KEY_DIGITS = 5  # cm - keys match to 0.1 micron
+
+
+def dogboneKey(dogbone, mode):
+    '''
+    returns the key of the hole dogbone makes, in mode (Static, Parametric, Tool Body) - equal keys make the same hole:
+    (mode, occurrence, body name, centre x, y, z, axis x, y, z, radius, depth)
+    '''
+    return ((mode, dogbone.occurrence, dogbone.body.name) + tuple(_rounded(dogbone.centre, KEY_DIGITS))
+            + tuple(_rounded(dogbone.axis, KEY_DIGITS)) + (round(dogbone.radius, KEY_DIGITS), round(dogbone.depth, KEY_DIGITS)))
+
+
+def keyScope(key):
+    '''
+    (occurrence, body name, axis) of a dogbone key - what one run of the command, on one body and in one direction, covers
+    '''
+    return key[1:3] + key[6:9]
+
+
+def diffPlan(plan, existing, mode):
+    '''
+    matches plan with the dogbones already in the design
+    existing - {unit id: [dogbone key, ...]} for each unit - the features that are kept or removed together
+    returns (plan of the dogbones still to be created, [unit id to keep, ...], [unit id to remove, ...]).
+    A unit is kept if plan has all of its dogbones. Otherwise it's removed if all its dogbones are in the scope of plan
+    (a body and direction plan has dogbones for), and kept if any aren't - other bodies and directions are left alone
+    '''
+    planned = set(dogboneKey(dogbone, mode) for dogbone in plan)
+    scopes = set(keyScope(key) for key in planned)
+    (keep, remove, kept) = ([], [], set())
+    for (unitId, keys) in existing.items():
+        if all(key in planned for key in keys):
+            keep.append(unitId)
+            kept.update(keys)
+        elif all(keyScope(key) in scopes for key in keys):
+            remove.append(unitId)
+        else:
+            keep.append(unitId)
+    return (tuple(dogbone for dogbone in plan if dogboneKey(dogbone, mode) not in kept), keep, remove)
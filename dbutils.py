@@ -1,9 +1,358 @@
-import math, logging
+import math
 import traceback
+import bisect
+import time
+from collections import defaultdict, OrderedDict
+from contextlib import nullcontext
 
 import adsk.core
 import adsk.fusion
 
+from . import dbgeom as dbGeom
+from . import dblogging as dbLogging
+
+try:
+    import numpy as np  # not bundled with Fusion - classifyCornerEdges falls back to per edge checks without it
+except ImportError:
+    np = None
+
+ANGLE_TOLERANCE = 1e-9  # used by the vectorised tests in place of isPerpendicularTo/angleTo
+CORNER_CACHE_BODIES = 32  # bodies CornerEdgeCache keeps the corner edges of - the least recently used are dropped first
+TOPOLOGY_CACHE_BODIES = 32  # bodies TopologyCache keeps the index of
+
+logger = dbLogging.getLogger(__name__)
+
+
+class TopologyIndex(object):
+    '''
+    Adjacency tables for a single (native) BRepBody, keyed by tempId.
+    Built once per body revision, so that "vertex in face.vertices" / "edge in face.edges" tests become
+    dict and set lookups instead of linear walks over SWIG collections.
+    Proxies share tempIds with their native entities, so one index answers for every assembly context.
+    '''
+    def __init__(self, body):
+        self.body = body.nativeObject if body.nativeObject else body
+        self.revisionId = self.body.revisionId
+        self.faceVertices = {}  # face tempId: {vertex tempId, ...}
+        self.edgeFaces = {}  # edge tempId: (face tempId, face tempId)
+        self.edgeVertices = {}  # edge tempId: (startVertex tempId, endVertex tempId)
+
+        for face in self.body.faces:
+            self.faceVertices[face.tempId] = {vertex.tempId for vertex in face.vertices}
+        for edge in self.body.edges:
+            edgeId = edge.tempId
+            vertexIds = (edge.startVertex.tempId, edge.endVertex.tempId)
+            self.edgeVertices[edgeId] = vertexIds
+            self.edgeFaces[edgeId] = tuple(face.tempId for face in edge.faces)
+
+    @property
+    def isCurrent(self):
+        # any feature that modifies the body changes its revisionId - tempIds can't be trusted after that
+        return self.body.isValid and self.body.revisionId == self.revisionId
+
+    def vertexIndexAtFace(self, faceId, edgeId):
+        '''
+        0 if the edge startVertex is on the face, 1 if only the endVertex is, -1 if neither.
+        raises KeyError if the face or edge isn't part of the indexed body
+        '''
+        faceVertices = self.faceVertices[faceId]
+        (startVertexId, endVertexId) = self.edgeVertices[edgeId]
+        if startVertexId in faceVertices:
+            return 0
+        if endVertexId in faceVertices:
+            return 1
+        return -1
+
+    def isEdgeOfFace(self, faceId, edgeId):
+        return faceId in self.edgeFaces[edgeId]
+
+
+class TopologyCache(object):
+    '''
+    The TopologyIndex of each body, keyed by native body entityToken - an index is rebuilt when its body has changed.
+    At most maxBodies bodies are kept - the least recently used are dropped first - and everything is dropped when
+    the timeline changes (see checkTimeline), so indexes of bodies that are no longer being worked on don't pile up
+    '''
+    def __init__(self, maxBodies = TOPOLOGY_CACHE_BODIES):
+        self.maxBodies = maxBodies
+        self.indexes = OrderedDict()  # native body entityToken: TopologyIndex - least recently used first
+        self.timelineKey = None
+
+    def clear(self):
+        self.indexes.clear()
+
+    def checkTimeline(self, design):
+        '''
+        call at event boundaries - drops every index if the design is another, or its timeline has changed since the last call
+        '''
+        key = timelineKey(design)
+        if key != self.timelineKey:
+            self.clear()
+            self.timelineKey = key
+
+    def get(self, body):
+        body = body.nativeObject if body.nativeObject else body
+        key = body.entityToken
+        topology = self.indexes.get(key)
+        if topology is None or not topology.isCurrent:
+            topology = self.indexes[key] = TopologyIndex(body)
+            if len(self.indexes) > self.maxBodies:
+                self.indexes.popitem(last = False)
+        self.indexes.move_to_end(key)
+        return topology
+
+
+topologyCache = TopologyCache()
+
+
+def getTopologyIndex(body):
+    '''
+    returns the TopologyIndex of body (or of its nativeObject) - only rebuilt if the body has changed since it was indexed
+    '''
+    return topologyCache.get(body)
+
+
+def timelineKey(design):
+    # identifies the state of design's timeline - changes when a feature is added, removed or rolled back
+    try:
+        return (design, design.timeline.markerPosition, design.timeline.count)
+    except:
+        return (design, None)  # direct modelling designs have no timeline - revisionId still catches changes
+
+
+class FaceGeometryCache(object):
+    '''
+    Memoizes face normals and reference planes (through face.vertices.item(0)), keyed by face identity:
+    (tempId, occurrence name, body name) - as adsk objects for API calls, and as dbgeom types for the maths.
+    An entry is discarded when its body's revisionId has changed; everything is discarded when the
+    timeline marker moves (see checkTimeline). hits/misses are kept to check the cache is earning its keep.
+    Cached geometry is shared - callers must copy() before modifying it.
+    '''
+    def __init__(self):
+        self.entries = {}  # face key: [body revisionId, normal, plane or None, dbGeom.Vector normal or None, dbGeom.Plane or None]
+        self.planarFaceIndexes = {}  # bodyKey: (body revisionId, PlanarFaceIndex)
+        self.markerPosition = None
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.planarFaceIndexes.clear()
+
+    def checkTimeline(self, design):
+        '''
+        call at event boundaries - drops all cached geometry if the timeline marker has moved since the last call
+        '''
+        try:
+            markerPosition = design.timeline.markerPosition
+        except:
+            markerPosition = None  # direct modelling designs have no timeline - revisionId still catches changes
+        if markerPosition != self.markerPosition:
+            self.clear()
+            self.markerPosition = markerPosition
+
+    def _lookup(self, face):
+        body = face.body
+        key = (face.tempId, face.assemblyContext.name if face.assemblyContext else '', body.name)
+        revisionId = body.revisionId
+        entry = self.entries.get(key)
+        if entry and entry[0] == revisionId:
+            self.hits += 1
+            return (key, entry)
+        self.misses += 1
+        entry = self.entries[key] = [revisionId, face.evaluator.getNormalAtPoint(face.pointOnFace)[1], None, None, None]
+        return (key, entry)
+
+    def normal(self, face):
+        return self._lookup(face)[1][1]
+
+    def plane(self, face):
+        entry = self._lookup(face)[1]
+        if entry[2] is None:
+            entry[2] = adsk.core.Plane.create(face.vertices.item(0).geometry, entry[1])
+        return entry[2]
+
+    def normalVector(self, face):
+        entry = self._lookup(face)[1]
+        if entry[3] is None:
+            entry[3] = dbGeom.Vector.fromAdsk(entry[1])
+        return entry[3]
+
+    def geomPlane(self, face):
+        entry = self._lookup(face)[1]
+        if entry[4] is None:
+            entry[4] = dbGeom.Plane(dbGeom.Point.fromAdsk(face.vertices.item(0).geometry), self.normalVector(face))
+        return entry[4]
+
+    def planarFaceIndex(self, body):
+        '''
+        returns the PlanarFaceIndex of body, in its context - only rebuilt if the body has changed since it was indexed
+        '''
+        key = bodyKey(body)
+        revisionId = body.revisionId
+        entry = self.planarFaceIndexes.get(key)
+        if entry is None or entry[0] != revisionId:
+            entry = self.planarFaceIndexes[key] = (revisionId, PlanarFaceIndex(body))
+        return entry[1]
+
+    def stats(self):
+        return 'face geometry cache - hits: {}, misses: {}, entries: {}'.format(self.hits, self.misses, len(self.entries))
+
+
+faceGeometryCache = FaceGeometryCache()
+
+
+class EntityResolver(object):
+    '''
+    Re-finds BRep entities that a feature has invalidated, for the create routines.
+    Entities are re-found by the entity token taken while they were still valid (see track) - design.findEntityByToken,
+    and the entity found is kept, so re-finding it again (while it stays valid) is a dict lookup.
+    Faces fall back to a point query on their component (findBRepUsingPoint), e.g. when the token no longer resolves.
+    '''
+    def __init__(self):
+        self.entities = {}  # entity token: latest valid entity found for it
+        self.tokenHits = 0
+        self.tokenLookups = 0
+        self.pointQueries = 0
+        self.failures = 0
+
+    def clear(self):
+        self.entities.clear()
+
+    def track(self, entity):
+        '''
+        returns entity's token, for resolve - entity must be valid
+        '''
+        token = entity.entityToken
+        self.entities[token] = entity
+        return token
+
+    def resolve(self, comp, token = None, refPoint = None, entityType = adsk.fusion.BRepEntityTypes.BRepFaceEntityType):
+        '''
+        returns the current entity for token (as taken by track), or failing that the entity of comp at refPoint -
+        None if neither finds it
+        '''
+        if token:
+            entity = self.entities.get(token)
+            if entity is not None and entity.isValid:
+                self.tokenHits += 1
+                return entity
+            self.tokenLookups += 1
+            for entity in comp.parentDesign.findEntityByToken(token):
+                if entity.isValid:
+                    self.entities[token] = entity
+                    return entity
+        if refPoint is not None:
+            self.pointQueries += 1
+            found = comp.findBRepUsingPoint(refPoint, entityType, -1.0, False)
+            if found.count:
+                entity = found.item(0)
+                if token:
+                    self.entities[token] = entity
+                return entity
+        self.failures += 1
+        return None
+
+    def stats(self):
+        return 'entity resolver - token hits: {}, token lookups: {}, point queries: {}, not found: {}'.format(
+            self.tokenHits, self.tokenLookups, self.pointQueries, self.failures)
+
+
+entityResolver = EntityResolver()
+
+
+class CornerEdgeCache(object):
+    '''
+    The corner edges (findCornerEdges) of faces, and a memo of each face's corner geometry (see faceMemo), kept from one
+    command to the next - picking a face of an unchanged body again is a dict lookup. Keyed by body (bodyKey) and face tempId -
+    corner edges by (face tempId, loopWalk), as the two walks are kept so they can be compared.
+    A body's faces are discarded when its revisionId has changed, and everything when the timeline has (see checkTimeline).
+    At most maxBodies bodies are kept - the least recently used are dropped first
+    '''
+    def __init__(self, maxBodies = CORNER_CACHE_BODIES):
+        self.maxBodies = maxBodies
+        self.bodies = OrderedDict()  # bodyKey: (body revisionId, {(face tempId, loopWalk): (corner edge, ...)}, {face tempId: memo}) - least recently used first
+        self.timelineKey = None
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.bodies.clear()
+
+    def checkTimeline(self, design):
+        '''
+        call at event boundaries - drops everything if the design is another, or a feature has been added, removed
+        or rolled back since the last call
+        '''
+        key = timelineKey(design)
+        if key != self.timelineKey:
+            self.clear()
+            self.timelineKey = key
+
+    def _faces(self, body):
+        # returns the body's cache entry - a new one if the body has changed
+        key = bodyKey(body)
+        revisionId = body.revisionId
+        entry = self.bodies.get(key)
+        if entry is None or entry[0] != revisionId:
+            entry = self.bodies[key] = (revisionId, {}, {})
+            if len(self.bodies) > self.maxBodies:
+                self.bodies.popitem(last = False)
+        self.bodies.move_to_end(key)
+        return entry
+
+    def cornerEdges(self, face, topology = None, loopWalk = True, headless = False):
+        '''
+        returns findCornerEdges(face) - a tuple, shared with the cache
+        '''
+        faces = self._faces(face.body)[1]
+        edges = faces.get((face.tempId, loopWalk))
+        if edges is None:
+            self.misses += 1
+            edges = faces[(face.tempId, loopWalk)] = tuple(findCornerEdges(face, topology, loopWalk, headless))
+        else:
+            self.hits += 1
+        return edges
+
+    def store(self, face, edges, loopWalk = True):
+        '''
+        records the corner edges of face, found some other way (findDogboneFaces, with the same loopWalk)
+        '''
+        self._faces(face.body)[1][(face.tempId, loopWalk)] = tuple(edges)
+
+    def faceMemo(self, face):
+        '''
+        returns a dict the caller can keep results for face in, until its body changes - DogboneCommand.faceCorners keeps
+        the corner geometry of each edge there
+        '''
+        return self._faces(face.body)[2].setdefault(face.tempId, {})
+
+    def stats(self):
+        return 'corner edge cache - hits: {}, misses: {}, bodies: {}'.format(self.hits, self.misses, len(self.bodies))
+
+
+def bodyKey(body):
+    # (native body entityToken, occurrence name) - identifies a body in its assembly context
+    return ((body.nativeObject if body.nativeObject else body).entityToken, body.assemblyContext.name if body.assemblyContext else '')
+
+
+def vertexIndexAtFace(face, edge, topology = None):
+    '''
+    0 if the edge startVertex is on the face, 1 if only the endVertex is, -1 if neither.
+    Answered from topology if it's still current, otherwise by walking face.vertices
+    '''
+    if topology and topology.isCurrent:
+        try:
+            return topology.vertexIndexAtFace(face.tempId, edge.tempId)
+        except KeyError:
+            pass
+    faceVertices = face.vertices
+    if edge.startVertex in faceVertices:
+        return 0
+    if edge.endVertex in faceVertices:
+        return 1
+    return -1
+
 
 def getAngleBetweenFaces(edge):
     # Verify that the two faces are planar.
@@ -16,10 +365,8 @@ def getAngleBetweenFaces(edge):
         return 0
 
     # Get the normal of each face.
-    ret = face1.evaluator.getNormalAtPoint(face1.pointOnFace)
-    normal1 = ret[1]
-    ret = face2.evaluator.getNormalAtPoint(face2.pointOnFace)
-    normal2 = ret[1]
+    normal1 = getFaceNormal(face1)
+    normal2 = getFaceNormal(face2)
     # Get the angle between the normals.
     normalAngle = normal1.angleTo(normal2)
 
@@ -47,17 +394,365 @@ def getAngleBetweenFaces(edge):
 
     return angle
 
-def findExtent(face, edge):
+def isCornerEdge(edge, faceNormal, faceVertex):
+    '''
+    True if edge is a concave, straight, inside corner edge dropping down from a face
+    faceVertex - 0 if the edge startVertex is on the face, 1 if it's the endVertex (see vertexIndexAtFace)
+    '''
+    if edge.geometry.curveType != adsk.core.Curve3DTypes.Line3DCurveType:
+        return False
+    vector = edgeVector(edge, edge.startVertex if faceVertex == 0 else edge.endVertex)
+    faceNormal = dbGeom.Vector(*faceNormal.asArray())
+    if vector.isPerpendicularTo(faceNormal):
+        return False
+    if edge.faces.item(0).geometry.objectType != adsk.core.Plane.classType():
+        return False
+    if edge.faces.item(1).geometry.objectType != adsk.core.Plane.classType():
+        return False
+    if vector.dotProduct(faceNormal) >= 0:
+        return False
+    if getAngleBetweenFaces(edge) > math.pi:
+        return False
+    return True
+
+def classifyCornerEdges(faceNormal, candidates, vectorised = True, headless = False):
+    '''
+    candidates - list of (edge, faceVertex) tuples, faceVertex as per isCornerEdge
+    returns the list of candidate edges that are dogbone corner edges
+    headless - edges that fail are only logged (see reportError)
+    '''
+    return [edge for ((edge, faceVertex), corner) in zip(candidates, cornerEdgeMask(faceNormal, candidates, vectorised, headless)) if corner]
+
+
+def cornerEdgeMask(faceNormal, candidates, vectorised = True, headless = False):
+    '''
+    as classifyCornerEdges, but returns a list of booleans - True for each candidate that is a dogbone corner edge.
+    Candidates of several faces can be classified at once, as long as the faces share faceNormal
+    When numpy is available, the endpoints, adjacent face normals and coEdge orientations are gathered once
+    (each face is only evaluated once), and the isCornerEdge tests are done as array operations.
+    '''
+    mask = [False] * len(candidates)
+    if not vectorised or np is None:
+        for (index, (edge, faceVertex)) in enumerate(candidates):
+            try:
+                mask[index] = isCornerEdge(edge, faceNormal, faceVertex)
+            except:
+                reportError('Failed at edge', headless)
+        return mask
+
+    planeType = adsk.core.Plane.classType()
+    lineType = adsk.core.Curve3DTypes.Line3DCurveType
+    faceData = {}  # face tempId: (isPlanar, normal as tuple)
+
+    def getFaceData(face):
+        faceId = face.tempId
+        data = faceData.get(faceId)
+        if data is None:
+            isPlanar = face.geometry.objectType == planeType
+            data = faceData[faceId] = (isPlanar, getFaceNormal(face).asArray() if isPlanar else (0.0, 0.0, 0.0))
+        return (faceId, data)
+
+    (normalX, normalY, normalZ) = faceNormal.asArray()
+    indices = []
+    rows = []  # startPoint, endPoint, normal face 0, normal face 1, faceVertex, face0 coEdge isOpposedToEdge
+    for (index, (edge, faceVertex)) in enumerate(candidates):
+        try:
+            if edge.geometry.curveType != lineType:
+                continue
+            startPoint = edge.startVertex.geometry.asArray()
+            endPoint = edge.endVertex.geometry.asArray()
+            direction = -1 if faceVertex == 1 else 1
+            if direction * ((endPoint[0] - startPoint[0]) * normalX + (endPoint[1] - startPoint[1]) * normalY + (endPoint[2] - startPoint[2]) * normalZ) >= 0:
+                continue  # not dropping down from the face (isDownward below) - cheap enough to test before the faces are looked at
+            faces = edge.faces
+            (face0Id, (isPlanar0, normal0)) = getFaceData(faces.item(0))
+            (face1Id, (isPlanar1, normal1)) = getFaceData(faces.item(1))
+            if not (isPlanar0 and isPlanar1):
+                continue
+            coEdges = edge.coEdges
+            coEdge = coEdges.item(0) if coEdges.item(0).loop.face.tempId == face0Id else coEdges.item(1)
+            rows.append(startPoint + endPoint + normal0 + normal1
+                        + (faceVertex, coEdge.isOpposedToEdge))
+            indices.append(index)
+        except:
+            reportError('Failed at edge', headless)
+    if not indices:
+        return mask
+
+    data = np.array(rows, dtype=float)
+    (startPoints, endPoints, normals0, normals1) = (data[:, 0:3], data[:, 3:6], data[:, 6:9], data[:, 9:12])
+    fromEnd = data[:, 12] == 1
+    isOpposed = data[:, 13] != 0
+    normal = dbGeom.toArray(faceNormal.asArray())[0]
+
+    # edge vector pointing away from the face
+    vectors = np.where(fromEnd[:, None], startPoints - endPoints, endPoints - startPoints)
+    dots = dbGeom.dotRows(vectors, normal)
+    isPerpendicular = np.abs(dots) <= ANGLE_TOLERANCE * dbGeom.lengths(vectors) * np.linalg.norm(normal)
+    isDownward = dots < 0
+
+    # same convexity test as getAngleBetweenFaces - the angle is > pi when the face0 coEdge direction opposes normal0 x normal1
+    # (and the normals aren't parallel)
+    coEdgeVectors = np.where(isOpposed[:, None], endPoints - startPoints, startPoints - endPoints)
+    crosses = dbGeom.crossRows(normals0, normals1)
+    isConvex = (dbGeom.dotRows(coEdgeVectors, crosses) < 0) & (dbGeom.lengths(crosses) > ANGLE_TOLERANCE)
+
+    isCorner = ~isPerpendicular & isDownward & ~isConvex
+    logger.debug('{} of {} candidate edges classified as corner edges', int(isCorner.sum()), len(indices))
+    for (index, corner) in zip(indices, isCorner):
+        mask[index] = bool(corner)
+    return mask
+
+
+def candidateEdges(face, topology, loopWalk = True):
+    '''
+    generator of edges that might drop down from the face
+    loopWalk - walks the face loops, and at each face vertex only returns the edges that aren't part of the face - O(face edges)
+    otherwise - returns every edge of the body, as originally done - O(body edges)
+    Both produce the same dogbone edges once filtered, loopWalk = False is kept so the two can be compared
+    '''
+    if not loopWalk:
+        for edge in face.body.edges:
+            yield edge
+        return
+    faceId = face.tempId
+    visitedVertices = set()
+    for loop in face.loops:
+        for coEdge in loop.coEdges:
+            faceEdge = coEdge.edge
+            vertex = faceEdge.endVertex if coEdge.isOpposedToEdge else faceEdge.startVertex  # every loop vertex starts exactly one coEdge
+            if vertex.tempId in visitedVertices:
+                continue
+            visitedVertices.add(vertex.tempId)
+            for edge in vertex.edges:
+                if topology.isEdgeOfFace(faceId, edge.tempId):
+                    continue
+                yield edge
+
+
+def cornerCandidates(face, topology, loopWalk = True):
+    '''
+    returns the candidates (see classifyCornerEdges) for the edges that might drop down from face
+    '''
+    faceId = face.tempId
+    consideredEdges = set()  # edge tempIds - used for quick checking if an edge has already been considered
+    candidates = []
+    for edge in candidateEdges(face, topology, loopWalk):
+        if edge.isDegenerate:
+            continue
+        edgeTempId = edge.tempId
+        if edgeTempId in consideredEdges:
+            continue
+        # cheapest test first - only edges with a vertex on the face can drop down from it
+        faceVertex = topology.vertexIndexAtFace(faceId, edgeTempId)
+        if faceVertex < 0:
+            continue
+        consideredEdges.add(edgeTempId)
+        candidates.append((edge, faceVertex))
+    return candidates
+
+
+def findCornerEdges(face, topology = None, loopWalk = True, headless = False):
+    '''
+    returns the inside corner edges dropping down from face - the edges that get dogbones
+    '''
+    if topology is None:
+        topology = getTopologyIndex(face.body)
+    return classifyCornerEdges(getFaceNormal(face), cornerCandidates(face, topology, loopWalk), headless = headless)
+
+
+class NormalDirectionIndex(object):
+    '''
+    Items grouped by face normal direction. Directions are keyed by the rounded normal, so finding the group of a face
+    is a dict lookup however many directions (or faces) there are - only a miss is compared with the existing directions
+    (within ANGLE_TOLERANCE), as normals either side of a rounding boundary round differently.
+    '''
+    def __init__(self, digits = 6):
+        self.digits = digits
+        self.directions = {}  # rounded normal: (normal, [item, ...])
+        self.groups = []  # the same (normal, [item, ...]) tuples, in the order each direction was first seen
+
+    def key(self, normal):
+        return tuple(round(value, self.digits) + 0.0 for value in normal.asArray())  # + 0.0 - so -0.0 and 0.0 share a key
+
+    def find(self, normal):
+        '''
+        returns the (normal, items) group that normal belongs to, or None
+        normal - adsk.core.Vector3D or dbGeom.Vector, groups hold dbGeom.Vector normals
+        '''
+        normal = dbGeom.Vector(*normal.asArray())
+        key = self.key(normal)
+        group = self.directions.get(key)
+        if group is not None:
+            return group
+        for group in self.groups:
+            if normal.dotProduct(group[0]) > 1 - ANGLE_TOLERANCE:
+                self.directions[key] = group
+                return group
+        return None
+
+    def group(self, normal):
+        '''
+        returns the (normal, items) group that normal belongs to - a new, empty one if there isn't one yet
+        '''
+        group = self.find(normal)
+        if group is None:
+            normal = dbGeom.Vector(*normal.asArray())
+            group = self.directions[self.key(normal)] = (normal, [])
+            self.groups.append(group)
+        return group
+
+    def add(self, normal, item):
+        group = self.group(normal)
+        group[1].append(item)
+        return group
+
+
+class PlanarFaceIndex(object):
+    '''
+    The planar faces of one body (native or proxy - the index is in the same context), grouped by axis - faces facing
+    either way along a normal share a group - and sorted by their signed offset along it.
+    The top face in a direction is then the end of a list, and the distance between two parallel faces is two dict lookups,
+    instead of a plane and line intersection for every parallel face of the body.
+    Kept by faceGeometryCache (see FaceGeometryCache.planarFaceIndex), so it's shared by every lookup on the same body revision
+    '''
+    def __init__(self, body):
+        planeType = adsk.core.Plane.classType()
+        self.axes = NormalDirectionIndex()  # axis: [(offset, order, face), ...] sorted
+        self.faceOffsets = {}  # face tempId: (axis group, offset)
+        for (order, face) in enumerate(body.faces):
+            if face.geometry.objectType != planeType:
+                continue
+            normal = getFaceNormalVector(face)
+            group = self.axes.find(normal.scaledBy(-1)) or self.axes.group(normal)
+            offset = group[0].dotProduct(getGeomPlane(face).origin)
+            group[1].append((offset, order, face))
+            self.faceOffsets[face.tempId] = (group, offset)
+        for (axis, entries) in self.axes.groups:
+            entries.sort(key = lambda entry: entry[:2])
+        self.offsetLists = {id(group): [entry[0] for entry in group[1]] for group in self.axes.groups}  # for bisect
+
+    def isAlongAxis(self, face, group):
+        return getFaceNormalVector(face).dotProduct(group[0]) > 0
+
+    def topFace(self, face):
+        '''
+        returns the planar face furthest along face's normal - on a tie, the last one in body.faces order.
+        raises KeyError if face isn't one of the indexed planar faces
+        '''
+        (group, offset) = self.faceOffsets[face.tempId]
+        entries = group[1]
+        if self.isAlongAxis(face, group):
+            return entries[-1][2]
+        # facing against the axis - the top face has the lowest offset
+        return entries[bisect.bisect_right(self.offsetLists[id(group)], entries[0][0]) - 1][2]
+
+    def distanceBetween(self, fromFace, toFace):
+        '''
+        returns the signed distance from fromFace to toFace, along fromFace's normal - None unless both are indexed and parallel
+        '''
+        fromEntry = self.faceOffsets.get(fromFace.tempId)
+        toEntry = self.faceOffsets.get(toFace.tempId)
+        if fromEntry is None or toEntry is None or fromEntry[0] is not toEntry[0]:
+            return None
+        distance = toEntry[1] - fromEntry[1]
+        return distance if self.isAlongAxis(fromFace, fromEntry[0]) else -distance
+
+
+def findDogboneFaceGroups(body, loopWalk = True, direction = None, headless = False):
+    '''
+    returns [(normal, [(face, [corner edge, ...]), ...]), ...] - the planar faces of body that have corner edges dropping down
+    from them, grouped by normal direction. Most corner edges first - on a tie (e.g. through pockets, seen from the top
+    and the bottom) the normal closest to +Z comes first.
+    direction - only faces with this normal are looked at, the other directions aren't checked for corner edges at all
+    body - native or proxy; the faces and edges returned are in the same context
+    headless - edges that fail are only logged (see reportError)
+    '''
+    topology = getTopologyIndex(body)
+    planeType = adsk.core.Plane.classType()
+    index = NormalDirectionIndex()
+    for face in body.faces:
+        if face.geometry.objectType == planeType:
+            index.add(getFaceNormalVector(face), face)
+
+    groups = []
+    for group in ([index.find(direction)] if direction else index.groups):
+        if group is None:
+            continue
+        (normal, faces) = group
+        # all the faces of a direction share their normal, so their candidates are classified in one go
+        candidates = []
+        owners = []  # index into faces of each candidate
+        for (index, face) in enumerate(faces):
+            faceCandidates = cornerCandidates(face, topology, loopWalk)
+            candidates.extend(faceCandidates)
+            owners.extend([index] * len(faceCandidates))
+        faceEdges = defaultdict(list)
+        for ((edge, faceVertex), owner, corner) in zip(candidates, owners, cornerEdgeMask(normal, candidates, headless = headless)):
+            if corner:
+                faceEdges[owner].append(edge)
+        dogboneFaces = [(faces[index], faceEdges[index]) for index in sorted(faceEdges)]
+        edgeCount = sum(len(edges) for edges in faceEdges.values())
+        if dogboneFaces:
+            groups.append((edgeCount, normal, dogboneFaces))
+    groups.sort(key = lambda group: (-group[0], -group[1].z))
+    return [(normal, dogboneFaces) for (edgeCount, normal, dogboneFaces) in groups]
+
+
+def findDogboneFaces(body, loopWalk = True, direction = None, headless = False):
+    '''
+    returns [(face, [corner edge, ...]), ...] for a single direction of findDogboneFaceGroups - direction, or else the
+    one with the most corner edges - as a face selection in the dialog is limited to
+    '''
+    groups = findDogboneFaceGroups(body, loopWalk, direction, headless)
+    return groups[0][1] if groups else []
+
+
+def designBodies(design):
+    '''
+    returns every solid body of design - root component bodies, then occurrence bodies (proxies).
+    Dogbones are added to the component, so a component with several occurrences only has its bodies returned once
+    '''
+    seen = set()
+    bodies = []
+    candidates = list(design.rootComponent.bRepBodies)
+    for occurrence in design.rootComponent.allOccurrences:
+        candidates.extend(occurrence.bRepBodies)
+    for body in candidates:
+        key = (body.nativeObject if body.nativeObject else body).entityToken
+        if key in seen or not body.isSolid:
+            continue
+        seen.add(key)
+        bodies.append(body)
+    return bodies
+
+
+def findExtent(face, edge, topology = None):
     
 #    faceNormal = adsk.core.Vector3D.cast(face.evaluator.getNormalAtPoint(face.pointOnFace)[1])
     
-    if edge.startVertex in face.vertices:
+    if vertexIndexAtFace(face, edge, topology) == 0:
         endVertex = edge.endVertex
     else:
         endVertex = edge.startVertex
     return endVertex
 
-    
+
+def findExtentFace(face, edge, topology = None):
+    '''
+    returns the face at the far end of a corner edge that's parallel to face (typically the pocket floor), so that
+    dogbones dropping to the same floor can share one hole extent. Falls back to the far vertex (findExtent) if there isn't one
+    '''
+    endVertex = findExtent(face, edge, topology)
+    faceNormal = getFaceNormalVector(face)
+    for extentFace in endVertex.faces:
+        if extentFace.geometry.objectType != adsk.core.Plane.classType():
+            continue
+        if abs(faceNormal.dotProduct(getFaceNormalVector(extentFace))) > 1 - ANGLE_TOLERANCE:
+            return extentFace
+    return endVertex
+
+
 def correctedEdgeVector(edge, refVertex):
     if edge.startVertex.geometry.isEqualTo(refVertex.geometry):
         return edge.startVertex.geometry.vectorTo(edge.endVertex.geometry)
@@ -65,6 +760,16 @@ def correctedEdgeVector(edge, refVertex):
         return edge.endVertex.geometry.vectorTo(edge.startVertex.geometry)
     return False
 
+def edgeVector(edge, refVertex):
+    '''
+    as correctedEdgeVector, but a dbGeom.Vector - the edge direction away from refVertex, one of its vertices
+    '''
+    startPoint = dbGeom.Point.fromAdsk(edge.startVertex.geometry)
+    endPoint = dbGeom.Point.fromAdsk(edge.endVertex.geometry)
+    if edge.startVertex.tempId == refVertex.tempId:
+        return startPoint.vectorTo(endPoint)
+    return endPoint.vectorTo(startPoint)
+
 def correctedSketchEdgeVector(edge, refPoint):
     if edge.startSketchPoint.geometry.isEqualTo(refPoint.geometry):
         return edge.startSketchPoint.geometry.vectorTo(edge.endSketchPoint.geometry)
@@ -73,53 +778,127 @@ def correctedSketchEdgeVector(edge, refPoint):
     return False
     
 
-def isEdgeAssociatedWithFace(face, edge):
+def isEdgeAssociatedWithFace(face, edge, topology = None):
     
     # have to check both ends - not sure which way around the start and end vertices are
-    if edge.startVertex in face.vertices:
-        return True
-    if edge.endVertex in face.vertices:
-        return True
-    return False
+    return vertexIndexAtFace(face, edge, topology) >= 0
     
-def getCornerEdgesAtFace(face, edge):
+def getCornerEdgesAtFace(face, edge, topology = None):
     #not sure which end is which - so test edge ends for inclusion in face
-    if edge.startVertex in face.vertices:
+    if vertexIndexAtFace(face, edge, topology) == 0:
         startVertex = edge.startVertex
     else:
         startVertex = edge.endVertex 
     #edge has 2 adjacent faces - therefore the face that isn't from the 3 faces of startVertex, has to be the top face edges
 #    returnVal = [edge1 for edge1 in edge.startVertex.edges if edge1 in face.edges]
-    logger = logging.getLogger(__name__)
+    if topology and topology.isCurrent and face.tempId in topology.faceVertices:
+        faceId = face.tempId
+        isFaceEdge = lambda x: topology.isEdgeOfFace(faceId, x.tempId)
+    else:
+        isFaceEdge = lambda x: x in face.edges
     returnVal = []
     for edge1 in startVertex.edges:
-        if edge1 not in face.edges:
+        if not isFaceEdge(edge1):
             continue
-        logger.debug('edge {} added to adjacent edge list'.format(edge1.tempId))
+        logger.debug('edge {0.tempId} added to adjacent edge list', edge1)
         returnVal.append(edge1)
     if len(returnVal)!= 2:
         raise NameError('returnVal len != 2')
         
     return (returnVal[0], returnVal[1])
     
-def getVertexAtFace(face, edge):
-    if edge.startVertex in face.vertices:
+def getVertexAtFace(face, edge, topology = None):
+    if vertexIndexAtFace(face, edge, topology) == 0:
         return edge.startVertex
     else:
         return edge.endVertex
     return False
     
 def getFaceNormal(face):
-    return face.evaluator.getNormalAtPoint(face.pointOnFace)[1]
+    return faceGeometryCache.normal(face)
+
+def getFacePlane(face):
+    return faceGeometryCache.plane(face)
+
+def getFaceNormalVector(face):
+    return faceGeometryCache.normalVector(face)
+
+def getGeomPlane(face):
+    return faceGeometryCache.geomPlane(face)
     
     
+def bucketByTolerance(items, key, tolerance):
+    '''
+    sorts items by key and splits them into buckets - an item joins the current bucket while its key is within
+    tolerance of the first key in that bucket, so no bucket spans more than tolerance.
+    returns a list of (largest key, items) - O(n log n) rather than a filter over the whole list for every key
+    '''
+    buckets = []
+    for item in sorted(items, key = key):
+        value = key(item)
+        if not buckets or value - buckets[-1][0] > tolerance:
+            buckets.append([value, value, []])
+        buckets[-1][1] = value
+        buckets[-1][2].append(item)
+    return [(largest, bucketItems) for (first, largest, bucketItems) in buckets]
+
+
+def groupCoplanarFaces(items, tolerance, key = lambda item: item):
+    '''
+    groups planar faces (key(item) is the native face) that lie on the same plane and face the same way - 
+    within tolerance of the group's first face.
+    returns a list of lists of items, in the order each group was first seen
+    '''
+    groups = []
+    for item in items:
+        face = key(item)
+        normal = getFaceNormalVector(face)
+        origin = getGeomPlane(face).origin
+        for (groupNormal, groupOrigin, groupFaces) in groups:
+            if normal.dotProduct(groupNormal) < 1 - ANGLE_TOLERANCE:
+                continue
+            if abs(groupNormal.dotProduct(groupOrigin.vectorTo(origin))) > tolerance:
+                continue
+            groupFaces.append(item)
+            break
+        else:
+            groups.append((normal, origin, [item]))
+    return [groupFaces for (groupNormal, groupOrigin, groupFaces) in groups]
+
+
 def messageBox(*args):
     adsk.core.Application.get().userInterface.messageBox(*args)
 
 
+def reportError(message, headless = False):
+    '''
+    shows message with the traceback of the exception being handled - or, headless (a script is running, with nobody
+    to close a message box), only logs it
+    '''
+    if headless:
+        logger.exception(message)
+    else:
+        messageBox('{}:\n{}'.format(message, traceback.format_exc()))
+
+
 def getTopFace(selectedFace):
+    '''
+    returns (top face, refPoint) - the face of selectedFace's body furthest along its normal, from the body's PlanarFaceIndex
+    '''
+    try:
+        top = faceGeometryCache.planarFaceIndex(selectedFace.body).topFace(selectedFace)
+    except KeyError:
+        return scanTopFace(selectedFace)  # not a planar face
+    refPoint = top.nativeObject.pointOnFace if top.assemblyContext else top.pointOnFace
+    return (top, refPoint)
+
+
+def scanTopFace(selectedFace):
+    '''
+    getTopFace as originally done - a plane and line intersection for every parallel face of the body
+    '''
     normal = getFaceNormal(selectedFace)
-    refPlane = adsk.core.Plane.create(selectedFace.vertices.item(0).geometry, normal)
+    refPlane = getFacePlane(selectedFace)
     refLine = adsk.core.InfiniteLine3D.create(selectedFace.vertices.item(0).geometry, normal)
     refPoint = refPlane.intersectWithLine(refLine)
     faceList = []
@@ -127,7 +906,7 @@ def getTopFace(selectedFace):
     for face in body.faces:
         if not normal.isParallelTo(getFaceNormal(face)):
             continue
-        facePlane = adsk.core.Plane.create(face.vertices.item(0).geometry, normal)
+        facePlane = getFacePlane(face)
         intersectionPoint = facePlane.intersectWithLine(refLine)
 #        distanceToRefPoint = refPoint.distanceTo(intersectionPoint)
         directionVector = refPoint.vectorTo(intersectionPoint)
@@ -142,23 +921,85 @@ def getTopFace(selectedFace):
  
 
 def getTranslateVectorBetweenFaces(fromFace, toFace):
-#   returns absolute distance
-    logger = logging.getLogger(__name__)
+    '''
+    as translationBetweenFaces, as an adsk.core.Vector3D
+    '''
+    return adsk.core.Vector3D.create(*translationBetweenFaces(fromFace, toFace))
 
-    normal = getFaceNormal(fromFace)
-    if not normal.isParallelTo(getFaceNormal(fromFace)):
-        return False
 
-    fromFacePlane = adsk.core.Plane.create(fromFace.vertices.item(0).geometry, normal)
-    fromFaceLine = adsk.core.InfiniteLine3D.create(fromFace.vertices.item(0).geometry, normal)
-    fromFacePoint = fromFacePlane.intersectWithLine(fromFaceLine)
-    
-    toFacePlane = adsk.core.Plane.create(toFace.vertices.item(0).geometry, normal)
-    toFacePoint = toFacePlane.intersectWithLine(fromFaceLine)
-    translateVector = fromFacePoint.vectorTo(toFacePoint)
-    return translateVector
+def translationBetweenFaces(fromFace, toFace):
+    '''
+    returns the dbGeom.Vector, along fromFace's normal, from fromFace (its first vertex) to the plane of toFace
+    '''
+    normal = getFaceNormalVector(fromFace)
+    if bodyKey(fromFace.body) == bodyKey(toFace.body):
+        # same body, same context - the distance comes straight from the body's PlanarFaceIndex
+        distance = faceGeometryCache.planarFaceIndex(fromFace.body).distanceBetween(fromFace, toFace)
+        if distance is not None:
+            return normal.scaledBy(distance)
+
+    fromFacePoint = getGeomPlane(fromFace).origin
+    toFacePoint = getGeomPlane(toFace).intersectWithLine(fromFacePoint, normal)
+    return fromFacePoint.vectorTo(toFacePoint)
         
     
+class PhaseTimer(object):
+    '''
+    Wall time and number of runs per named phase, plus named counts - for the Benchmark option.
+        with timer.phase('hole features'):
+            holes.add(holeInput)
+        timer.count('holes', len(sketchPoints))
+    Phases may nest - each is timed inclusively. Disabled, phase() returns a shared do-nothing context,
+    so timing can stay around hot paths.
+    '''
+    def __init__(self, enabled = True):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.phases = {}  # name: [seconds, runs], in the order first timed
+        self.counts = {}
+
+    def phase(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return _TimedPhase(self.phases.setdefault(name, [0.0, 0]))
+
+    def count(self, name, increment = 1):
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + increment
+
+    def toData(self):
+        '''
+        returns the timings as JSON-able data
+        '''
+        return {'phases': [{'phase': name, 'seconds': seconds, 'runs': runs} for (name, (seconds, runs)) in self.phases.items()],
+                'counts': dict(self.counts)}
+
+    def report(self):
+        '''
+        returns the timings as text, one line per phase and count
+        '''
+        lines = ['{}: {:.03f} sec ({} run{})'.format(name, seconds, runs, '' if runs == 1 else 's') for (name, (seconds, runs)) in self.phases.items()]
+        lines.extend('{}: {}'.format(name, count) for (name, count) in self.counts.items())
+        return '\n'.join(lines)
+
+
+class _TimedPhase(object):
+    __slots__ = ('totals', 'startTime')
+
+    def __init__(self, totals):
+        self.totals = totals
+
+    def __enter__(self):
+        self.startTime = time.perf_counter()
+
+    def __exit__(self, excType, excValue, excTraceback):
+        self.totals[0] += time.perf_counter() - self.startTime
+        self.totals[1] += 1
+        return False
+
+
 class HandlerHelper(object):
     def __init__(self):
         # Note: we need to maintain a reference to each handler, otherwise the handlers will be GC'd and SWIG will be
@@ -168,16 +1009,12 @@ class HandlerHelper(object):
     def make_handler(self, handler_cls, notify_method, catch_exceptions=True):
         class _Handler(handler_cls):
             def notify(self, args):
-                self.logger = logging.getLogger(__name__)
                 if catch_exceptions:
                     try:
                         notify_method(args)
                     except:
                         messageBox('Failed:\n{}'.format(traceback.format_exc()))
-                        self.logger.exception('error termination')
-                        for handler in self.logger.handlers:
-                            handler.flush()
-                            handler.close()
+                        logger.exception('error termination')
                 else:
                     notify_method(args)
         h = _Handler()